@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Fake Gemini Model
+Drop-in GenerativeModel stand-in with scripted latency for benchmarks
+"""
+
+import json
+import random
+import re
+import time
+from typing import List
+
+VOCABULARY = """magnetic foldable silicone bamboo cordless rechargeable wireless smart
+compact portable spice rack drawer closet shelf lamp charger cable mop vacuum
+organizer blender kettle planter sprinkler mirror brush towel hook timer scale
+pantry garage balcony desk fridge sink shower counter garden bedroom laundry
+genius clever wild unreal budget viral tiny mighty sleek instant""".split()
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name: str = "gemini-pro", latency: float = 0.5,
+                 stream_chunks: int = 20):
+        """
+        Args:
+            model_name: Ignored, kept for signature compatibility
+            latency: Seconds each generate_content call takes end to end
+            stream_chunks: Chunks a streamed response is split into
+        """
+        self.model_name = model_name
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self._counter = 0
+    
+    def _ideas(self, count: int) -> List[dict]:
+        ideas = []
+        for _ in range(count):
+            self._counter += 1
+            # Distinct wording per idea so duplicate screening does not reject them
+            words = random.Random(self._counter).sample(VOCABULARY, 8)
+            ideas.append({
+                "hook": f"This {words[0]} {words[1]} fixes your {words[2]} {words[3]}",
+                "description": f"Unboxing, first use and result shots for the {words[0]} {words[1]}",
+                "caption": f"{words[4]} {words[5]} {words[6]} {words[7]} ✨",
+                "hashtags": ["#tiktokmademebuyit", "#amazonfind", "#lifehack", "#smarthome", "#musthave"],
+                "cta": "Follow for more finds!"
+            })
+        return ideas
+    
+    def _respond(self, prompt: str) -> str:
+        match = re.search(r"Generate (\d+) TikTok video ideas", prompt)
+        if match:
+            return json.dumps(self._ideas(int(match.group(1))), ensure_ascii=False)
+        script = {"shots": [{"duration": 3, "voiceover": "Look at this", "overlay": "WAIT"}] * 6}
+        idea_ids = re.findall(r"^idea_id: (\S+)$", prompt, re.MULTILINE)
+        if idea_ids:
+            return json.dumps([dict(script, idea_id=idea_id) for idea_id in idea_ids])
+        return json.dumps(script)
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self._respond(prompt)
+        
+        if not stream:
+            time.sleep(self.latency)
+            return FakeResponse(text)
+        
+        def chunks():
+            size = max(1, len(text) // self.stream_chunks)
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+            for piece in pieces:
+                time.sleep(self.latency / len(pieces))
+                yield FakeResponse(piece)
+        
+        return chunks()
+    
+    def count_tokens(self, contents):
+        """Rough count with the same shape as the SDK's CountTokensResponse"""
+        text = contents if isinstance(contents, str) else str(contents)
+        return type("CountTokensResponse", (), {"total_tokens": max(1, len(text) // 4)})()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Local TikTok API Stand-in
+Serves the OAuth, upload init, upload PUT and status endpoints for benchmarks
+"""
+
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Status sequence a publish ID walks through, one step per status fetch
+STATUS_STEPS = ["PROCESSING_UPLOAD", "PROCESSING_DOWNLOAD", "SEND_TO_USER_INBOX"]
+
+
+class FakeTikTokServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 max_requests_per_second: Optional[float] = None,
+                 retry_after: int = 1):
+        """
+        Initialize the stand-in
+        
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency: Seconds added to every response
+            error_rate: Fraction of requests answered with HTTP 500
+            max_requests_per_second: Above this rate requests get HTTP 429
+            retry_after: Retry-After seconds sent with 429 responses
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.retry_after = retry_after
+        
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "bytes_received": 0}
+        self.uploads: Dict[str, Dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "FakeTikTokServer":
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def _admit(self) -> Optional[int]:
+        """Decide the fate of a request: None to serve it, or an error status"""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.max_requests_per_second:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.max_requests_per_second:
+                    self.stats["throttled"] += 1
+                    return 429
+            if self.error_rate and random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+        return None
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _body(self) -> bytes:
+                length = int(self.headers.get("Content-Length", 0))
+                remaining, parts = length, []
+                while remaining:
+                    part = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not part:
+                        break
+                    parts.append(part)
+                    remaining -= len(part)
+                return b"".join(parts)
+            
+            def _send(self, status: int, payload: Optional[Dict] = None, headers: Optional[Dict] = None):
+                body = json.dumps(payload or {}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _handle(self, method: str):
+                body = self._body()
+                if server.latency:
+                    time.sleep(server.latency)
+                
+                failure = server._admit()
+                if failure == 429:
+                    self._send(429, {"error": {"code": "rate_limit_exceeded"}},
+                               {"Retry-After": server.retry_after})
+                    return
+                if failure:
+                    self._send(failure, {"error": {"code": "internal_error"}})
+                    return
+                
+                path = self.path.split("?")[0]
+                if method == "POST" and path == "/v2/oauth/token/":
+                    self._send(200, {"data": {
+                        "access_token": "fake-access-token",
+                        "refresh_token": "fake-refresh-token",
+                        "open_id": "fake-open-id",
+                        "expires_in": 86400,
+                        "refresh_expires_in": 31536000
+                    }})
+                elif method == "POST" and path.endswith("/video/init/"):
+                    self._init(json.loads(body or b"{}"))
+                elif method == "PUT" and path.startswith("/upload/"):
+                    self._put(path.rsplit("/", 1)[-1], body)
+                elif method == "POST" and path == "/v2/post/publish/status/fetch/":
+                    self._status(json.loads(body or b"{}").get("publish_id"))
+                else:
+                    self._send(404, {"error": {"code": "not_found"}})
+            
+            def _init(self, payload: Dict):
+                source = payload.get("source_info", {})
+                publish_id = f"v_pub_fake_{next(server._ids)}"
+                with server._lock:
+                    server.uploads[publish_id] = {"size": source.get("video_size", 0),
+                                                  "received": 0, "polls": 0}
+                self._send(200, {
+                    "data": {"publish_id": publish_id,
+                             "upload_url": f"{server.base_url}/upload/{publish_id}"},
+                    "error": {"code": "ok", "message": ""}
+                })
+            
+            def _put(self, publish_id: str, body: bytes):
+                with server._lock:
+                    upload = server.uploads.get(publish_id)
+                    if upload is not None:
+                        upload["received"] += len(body)
+                        server.stats["bytes_received"] += len(body)
+                if upload is None:
+                    self._send(404, {"error": {"code": "not_found"}})
+                    return
+                done = upload["received"] >= upload["size"]
+                self._send(201 if done else 206)
+            
+            def _status(self, publish_id: Optional[str]):
+                with server._lock:
+                    upload = server.uploads.get(publish_id)
+                    if upload is not None:
+                        step = min(upload["polls"], len(STATUS_STEPS) - 1)
+                        upload["polls"] += 1
+                if upload is None:
+                    self._send(404, {"error": {"code": "not_found"}})
+                    return
+                self._send(200, {"data": {"status": STATUS_STEPS[step]},
+                                 "error": {"code": "ok"}})
+            
+            def do_POST(self):
+                self._handle("POST")
+            
+            def do_PUT(self):
+                self._handle("PUT")
+        
+        return Handler
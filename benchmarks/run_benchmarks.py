@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmarks
+Measures upload throughput, stage latency, upload memory and agent timings
+against local stand-ins for TikTok and Gemini
+
+Usage:
+    python benchmarks/run_benchmarks.py [--uploads 40] [--workers 8] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from fake_tiktok import FakeTikTokServer  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 in milliseconds"""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+    
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+    
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def stage_of(method: str, url: str) -> str:
+    path = urlparse(url).path
+    if path.endswith("/video/init/"):
+        return "init"
+    if path.startswith("/upload/"):
+        return "put"
+    if path.endswith("/status/fetch/"):
+        return "status"
+    return f"{method.lower()} {path}"
+
+
+def make_uploader(server: FakeTikTokServer, workdir: str, **kwargs):
+    from tiktok_ratelimit import RateGovernor
+    from tiktok_uploader import TikTokUploader
+    
+    # TikTok's real quotas would turn a throughput run into a wait
+    kwargs.setdefault("governor", RateGovernor())
+    uploader = TikTokUploader("bench-key", "bench-secret", api_base=server.base_url,
+                              token_path=os.path.join(workdir, "tokens.json"),
+                              upload_index_path=None, preflight=False, **kwargs)
+    uploader.tokens.set_tokens({"access_token": "fake-access-token",
+                                "open_id": "fake-open-id", "expires_in": 86400})
+    
+    # Time every request by stage on the client side
+    timings = defaultdict(list)
+    send = uploader.session.request
+    
+    def timed_request(method, url, *args, **kw):
+        started = time.perf_counter()
+        try:
+            return send(method, url, *args, **kw)
+        finally:
+            timings[stage_of(method, url)].append(time.perf_counter() - started)
+    
+    uploader.session.request = timed_request
+    return uploader, timings
+
+
+def write_video(path: str, size: int):
+    """Write a file of the given size without holding it in memory"""
+    block = os.urandom(MB)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(MB, remaining)])
+            remaining -= MB
+
+
+def bench_uploads(count: int, size_mb: int, workers: int, latency: float, workdir: str) -> Dict:
+    """Batch upload throughput and per-stage latency"""
+    video = os.path.join(workdir, "batch.mp4")
+    write_video(video, size_mb * MB)
+    
+    with FakeTikTokServer(latency=latency) as server:
+        uploader, timings = make_uploader(server, workdir)
+        jobs = [{"video_path": video, "title": f"bench {i}"} for i in range(count)]
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            results = list(uploader.upload_batch(jobs, max_workers=workers))
+            elapsed = time.perf_counter() - started
+    
+    succeeded = sum(1 for r in results if r["result"])
+    return {
+        "uploads": count,
+        "succeeded": succeeded,
+        "seconds": round(elapsed, 3),
+        "uploads_per_sec": round(succeeded / elapsed, 2) if elapsed else 0.0,
+        "stages_ms": {stage: percentiles(values) for stage, values in timings.items()}
+    }
+
+
+def bench_throttled_uploads(count: int, workers: int, max_rps: float, workdir: str) -> Dict:
+    """Batch uploads against a stand-in that answers 429 above max_rps and fails 5% of calls"""
+    from tiktok_ratelimit import RateGovernor
+    
+    video = os.path.join(workdir, "throttled.mp4")
+    write_video(video, MB)
+    
+    with FakeTikTokServer(max_requests_per_second=max_rps, error_rate=0.05) as server:
+        # Budget a little under the server's limit; the governor adapts on 429s
+        per_minute = max_rps * 60 * 0.9
+        governor = RateGovernor({endpoint: (per_minute / 2, max_rps / 2)
+                                 for endpoint in ("upload_init", "upload_put")},
+                                base_delay=0.2)
+        uploader, _ = make_uploader(server, workdir, governor=governor)
+        jobs = [{"video_path": video, "title": f"throttled {i}"} for i in range(count)]
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            results = list(uploader.upload_batch(jobs, max_workers=workers, check_status=False))
+            elapsed = time.perf_counter() - started
+        stats = dict(server.stats)
+    
+    return {
+        "uploads": count,
+        "succeeded": sum(1 for r in results if r["result"]),
+        "seconds": round(elapsed, 3),
+        "requests": stats["requests"],
+        "throttled_429": stats["throttled"],
+        "server_errors": stats["errors"]
+    }
+
+
+def _large_upload_child(size_mb: int, workdir: str, queue):
+    video = os.path.join(workdir, "large.mp4")
+    write_video(video, size_mb * MB)
+    
+    with FakeTikTokServer() as server:
+        uploader, _ = make_uploader(server, workdir)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = uploader.upload_video(video, "large bench")
+        elapsed = time.perf_counter() - started
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    queue.put({"size_mb": size_mb, "ok": result is not None,
+               "seconds": round(elapsed, 3),
+               # ru_maxrss is in KiB on Linux
+               "baseline_rss_mb": round(before / 1024, 1),
+               "peak_rss_mb": round(after / 1024, 1)})
+
+
+def bench_large_upload(size_mb: int, workdir: str) -> Dict:
+    """Peak RSS of a single large upload, measured in a fresh process"""
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_large_upload_child, args=(size_mb, workdir, queue))
+    child.start()
+    result = queue.get()
+    child.join()
+    return result
+
+
+@contextlib.contextmanager
+def fake_gemini(latency: float):
+    from tiktok_agent import TikTokAIAgent
+    
+    original = TikTokAIAgent._create_model
+    TikTokAIAgent._create_model = lambda self: FakeGenerativeModel(self.model_name, latency)
+    try:
+        yield
+    finally:
+        TikTokAIAgent._create_model = original
+
+
+def bench_agent(num_ideas: int, latency: float, workdir: str) -> Dict:
+    """Idea generation (blocking and streamed) and parallel scripting times"""
+    from tiktok_agent import TikTokAIAgent
+    
+    with fake_gemini(latency), contextlib.redirect_stdout(io.StringIO()):
+        agent = TikTokAIAgent("bench-key", os.path.join(ROOT, "config.json"),
+                              requests_per_minute=6000, cache_path=None,
+                              history_path=None, store_path=None)
+        agent.research_trends()
+        
+        started = time.perf_counter()
+        ideas = agent.generate_content_ideas(num_ideas=num_ideas)
+        ideas_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        first_idea = None
+        for _ in agent.stream_content_ideas(num_ideas=num_ideas):
+            if first_idea is None:
+                first_idea = time.perf_counter() - started
+        stream_seconds = time.perf_counter() - started
+        
+        calls = agent.model.calls
+        started = time.perf_counter()
+        scripts = agent.create_video_scripts(ideas, max_workers=8)
+        scripts_seconds = time.perf_counter() - started
+        script_calls = agent.model.calls - calls
+        
+        # Streamed ideas and scripting overlapped, versus the two steps above back to back
+        agent.generate_posting_schedule(days=num_ideas, posts_per_day=1)
+        started = time.perf_counter()
+        piped = agent.run_pipeline(num_ideas=num_ideas, script_workers=8, progress_interval=None)
+        pipeline_seconds = time.perf_counter() - started
+    
+    return {
+        "ideas": len(ideas),
+        "generate_content_ideas_s": round(ideas_seconds, 3),
+        "stream_first_idea_s": round(first_idea or 0.0, 3),
+        "stream_all_ideas_s": round(stream_seconds, 3),
+        "scripts": len(scripts),
+        "create_video_scripts_s": round(scripts_seconds, 3),
+        "create_video_scripts_calls": script_calls,
+        "pipeline_ideas_to_scripts_s": round(pipeline_seconds, 3),
+        "pipeline_scripted": len(piped)
+    }
+
+
+def bench_main(latency: float, workdir: str) -> Dict:
+    """End-to-end time of tiktok_agent.main() with stand-ins"""
+    import tiktok_agent
+    
+    run_dir = os.path.join(workdir, "main_run")
+    os.makedirs(run_dir, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, "config.json"), run_dir)
+    
+    cwd, argv = os.getcwd(), sys.argv
+    os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+    try:
+        os.chdir(run_dir)
+        sys.argv = ["tiktok_agent.py"]
+        with fake_gemini(latency), contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            tiktok_agent.main()
+            elapsed = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+    return {"main_s": round(elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline TikTok agent benchmarks")
+    parser.add_argument("--uploads", type=int, default=40, help="videos in the batch upload run")
+    parser.add_argument("--upload-mb", type=int, default=6, help="size of each batch video")
+    parser.add_argument("--workers", type=int, default=8, help="batch upload workers")
+    parser.add_argument("--throttle-rps", type=float, default=20,
+                        help="stand-in request limit for the throttled upload run")
+    parser.add_argument("--large-mb", type=int, default=300, help="size of the large upload")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="stand-in TikTok latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake Gemini latency (s)")
+    parser.add_argument("--ideas", type=int, default=10, help="ideas to generate and script")
+    parser.add_argument("--skip-agent", action="store_true",
+                        help="skip benchmarks that need google-generativeai installed")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="tiktok_bench_")
+    results = {}
+    try:
+        results["batch_upload"] = bench_uploads(args.uploads, args.upload_mb, args.workers,
+                                                args.api_latency, workdir)
+        results["throttled_upload"] = bench_throttled_uploads(args.uploads, args.workers,
+                                                              args.throttle_rps, workdir)
+        results["large_upload"] = bench_large_upload(args.large_mb, workdir)
+        if not args.skip_agent:
+            results["agent"] = bench_agent(args.ideas, args.llm_latency, workdir)
+            results["main"] = bench_main(args.llm_latency, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print("=" * 60)
+    print("   TikTok AI Agent - Offline Benchmarks")
+    print("=" * 60)
+    for section, values in results.items():
+        print(f"\n[{section}]")
+        for key, value in values.items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
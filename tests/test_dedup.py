@@ -0,0 +1,58 @@
+from tiktok_dedup import IdeaDedupIndex
+
+
+def make_idea(idea_id, hook, caption="Link in bio for the full list"):
+    return {"id": idea_id, "hook": hook, "caption": caption}
+
+
+def test_exact_repeat_from_history_is_a_duplicate(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    first = IdeaDedupIndex(path)
+    saved = make_idea("idea_1_100", "This $12 gadget keeps herbs fresh for weeks")
+    assert first.check(saved) is None
+    first.record([saved])
+    
+    second = IdeaDedupIndex(path)
+    repeat = make_idea("idea_1_200", "This $12 gadget keeps herbs fresh for weeks")
+    assert second.check(repeat) == "idea_1_100"
+
+
+def test_punctuation_only_change_is_a_duplicate(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    first = IdeaDedupIndex(path)
+    first.record([make_idea("idea_1_100", "This $12 gadget keeps herbs fresh for weeks")])
+    
+    second = IdeaDedupIndex(path)
+    repeat = make_idea("idea_1_200", "This $12 gadget keeps herbs fresh... for weeks!!")
+    assert second.check(repeat) == "idea_1_100"
+
+
+def test_near_duplicate_is_caught(tmp_path):
+    index = IdeaDedupIndex(str(tmp_path / "history.jsonl"))
+    index.record([make_idea("idea_1_100", "This $12 gadget keeps herbs fresh for weeks")])
+    near = make_idea("idea_2_100", "This $12 gadget keeps your herbs fresh for weeks")
+    assert index.check(near) == "idea_1_100"
+
+
+def test_same_idea_screened_twice_before_saving_is_not_its_own_duplicate(tmp_path):
+    index = IdeaDedupIndex(str(tmp_path / "history.jsonl"))
+    idea = make_idea("idea_1_100", "Five fridge organizers that actually fit")
+    assert index.check(idea) is None
+    assert index.check(idea) is None
+    served_again = make_idea("idea_1_101", "Five fridge organizers that actually fit")
+    assert index.check(served_again) is None
+
+
+def test_unrelated_idea_passes(tmp_path):
+    index = IdeaDedupIndex(str(tmp_path / "history.jsonl"))
+    index.record([make_idea("idea_1_100", "This $12 gadget keeps herbs fresh for weeks")])
+    other = make_idea("idea_2_100", "Solar lanterns that survived a whole winter outside")
+    assert index.check(other) is None
+
+
+def test_unsaved_ideas_do_not_reach_the_history(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    index = IdeaDedupIndex(path)
+    assert index.check(make_idea("idea_1_100", "Five fridge organizers that actually fit")) is None
+    
+    assert len(IdeaDedupIndex(path)) == 0
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from tiktok_jobs import JobQueue, UploadWorker
+
+
+class FakeUploader:
+    def __init__(self, state=None):
+        self.state = state
+        self.uploads = []
+    
+    def check_upload_status(self, publish_id):
+        return {"status": self.state} if self.state else None
+    
+    def upload_video(self, video_path, title, on_init=None, cancel=None, claim_owner=None, **options):
+        self.uploads.append(video_path)
+        on_init("new-publish-id")
+        return {"publish_id": "new-publish-id", "status": "processing", "title": title}
+
+
+def crashed_after_init(queue):
+    """A job whose worker died after init: its lease has run out"""
+    job_id = queue.enqueue("clip.mp4", "title")
+    job = queue.claim("crashed-worker")[0]
+    queue.mark_initialized(job_id, "crashed-worker", "old-publish-id")
+    queue._conn.execute("UPDATE upload_jobs SET lease_expires = 0 WHERE job_id = ?", (job_id,))
+    return job["job_id"]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    jobs = JobQueue(str(tmp_path / "jobs.db"), max_attempts=3, retry_delay=60)
+    yield jobs
+    jobs.close()
+
+
+@pytest.mark.parametrize("state", [None, "PROCESSING_UPLOAD"])
+def test_unknown_status_is_checked_again_instead_of_reuploaded(queue, state):
+    job_id = crashed_after_init(queue)
+    uploader = FakeUploader(state)
+    
+    job = queue.claim("worker-b")[0]
+    assert UploadWorker(queue, uploader).process(job, "worker-b") is None
+    
+    assert uploader.uploads == []
+    stored = queue.get(job_id)
+    assert stored["status"] == "initialized"
+    assert stored["publish_id"] == "old-publish-id"
+    assert stored["lease_owner"] is None
+    assert stored["lease_expires"] > time.time()
+    assert queue.claim("worker-c") == []
+
+
+def test_failed_upload_is_uploaded_again(queue):
+    job_id = crashed_after_init(queue)
+    uploader = FakeUploader("FAILED")
+    
+    job = queue.claim("worker-b")[0]
+    result = UploadWorker(queue, uploader).process(job, "worker-b")
+    
+    assert uploader.uploads == ["clip.mp4"]
+    assert result["publish_id"] == "new-publish-id"
+    assert queue.get(job_id)["status"] == "done"
+
+
+@pytest.mark.parametrize("state", ["PROCESSING_DOWNLOAD", "SEND_TO_USER_INBOX", "PUBLISH_COMPLETE"])
+def test_landed_upload_completes_without_reuploading(queue, state):
+    job_id = crashed_after_init(queue)
+    uploader = FakeUploader(state)
+    
+    job = queue.claim("worker-b")[0]
+    result = UploadWorker(queue, uploader).process(job, "worker-b")
+    
+    assert uploader.uploads == []
+    assert result["resumed"] and result["publish_id"] == "old-publish-id"
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_job_that_keeps_crashing_its_worker_is_failed_at_max_attempts(queue):
+    job_id = queue.enqueue("clip.mp4", "title")
+    for attempt in range(queue.max_attempts):
+        assert queue.claim(f"worker-{attempt}")[0]["attempts"] == attempt + 1
+        queue._conn.execute("UPDATE upload_jobs SET lease_expires = 0 WHERE job_id = ?", (job_id,))
+    
+    assert queue.claim("worker-last") == []
+    stored = queue.get(job_id)
+    assert stored["status"] == "failed"
+    assert stored["lease_owner"] is None
+
+
+def test_enqueue_is_idempotent_per_slot(queue):
+    first = queue.enqueue("clip.mp4", "title", slot_id=7)
+    assert queue.enqueue("other.mp4", "title", slot_id=7) == first
+    assert queue.stats() == {"queued": 1}
@@ -0,0 +1,84 @@
+import struct
+
+from tiktok_mp4 import check_video, inspect_mp4
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def mvhd(timescale, duration):
+    return box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, timescale, duration) + bytes(80))
+
+
+def tkhd(width, height):
+    return box(b"tkhd", bytes(76) + struct.pack(">II", width << 16, height << 16))
+
+
+def hdlr(handler):
+    return box(b"hdlr", bytes(8) + handler + bytes(12) + b"\x00")
+
+
+def stsd(codec):
+    entry = struct.pack(">I4s", 16, codec) + bytes(8)
+    return box(b"stsd", struct.pack(">II", 0, 1) + entry)
+
+
+def trak(handler, codec, width=0, height=0, data_handler=None):
+    minf = (hdlr(data_handler) if data_handler else b"") + box(b"stbl", stsd(codec))
+    return box(b"trak", tkhd(width, height) + box(b"mdia", hdlr(handler) + box(b"minf", minf)))
+
+
+def write_movie(tmp_path, *tracks, name="clip.mp4", brand=b"isom", seconds=30):
+    data = box(b"ftyp", brand + bytes(4)) + box(b"moov", mvhd(1000, seconds * 1000) + b"".join(tracks))
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_reads_tracks_size_and_duration(tmp_path):
+    path = write_movie(tmp_path, trak(b"vide", b"avc1", 1080, 1920), trak(b"soun", b"mp4a"))
+    info = inspect_mp4(path)
+    assert info["error"] is None
+    assert info["brand"] == "isom"
+    assert info["duration"] == 30
+    assert (info["video_codec"], info["width"], info["height"]) == ("avc1", 1080, 1920)
+    assert info["audio_codec"] == "mp4a"
+    assert check_video(path, "15-60")["ok"]
+
+
+def test_quicktime_data_handler_does_not_hide_the_video_track(tmp_path):
+    path = write_movie(tmp_path, trak(b"vide", b"avc1", 1080, 1920, data_handler=b"alis"),
+                       trak(b"soun", b"mp4a", data_handler=b"url "),
+                       name="clip.mov", brand=b"qt  ")
+    info = check_video(path)
+    assert info["video_codec"] == "avc1"
+    assert info["audio_codec"] == "mp4a"
+    assert info["ok"], info["problems"]
+
+
+def test_rejects_out_of_range_files(tmp_path):
+    path = write_movie(tmp_path, trak(b"vide", b"mp4v", 320, 240), seconds=90)
+    problems = check_video(path, "15-60")["problems"]
+    assert "unsupported video codec 'mp4v'" in problems
+    assert any(problem.startswith("resolution 320x240") for problem in problems)
+    assert any(problem.startswith("duration 90.0s") for problem in problems)
+
+
+def test_audio_only_file_has_no_video_track(tmp_path):
+    path = write_movie(tmp_path, trak(b"soun", b"mp4a"))
+    assert check_video(path)["problems"] == ["no video track"]
+
+
+def test_broken_files_report_an_error(tmp_path):
+    missing_moov = tmp_path / "no_moov.mp4"
+    missing_moov.write_bytes(box(b"ftyp", b"isom" + bytes(4)) + box(b"mdat", bytes(16)))
+    assert inspect_mp4(str(missing_moov))["error"] == "missing 'moov' box"
+    
+    truncated = tmp_path / "truncated.mp4"
+    truncated.write_bytes(box(b"ftyp", b"isom" + bytes(4)) + struct.pack(">I4s", 4096, b"moov"))
+    assert "overruns" in inspect_mp4(str(truncated))["error"]
+    
+    not_video = tmp_path / "notes.mp4"
+    not_video.write_bytes(b"just some text, not a video")
+    assert not check_video(str(not_video))["ok"]
@@ -0,0 +1,82 @@
+import json
+import os
+from types import SimpleNamespace
+
+from tiktok_tokens import TokenBudget, estimate_tokens
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+def test_estimate_rounds_up_and_handles_empty_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
+
+
+def test_items_per_call_follows_the_response_budget():
+    budget = TokenBudget(response_budget=2048, max_items=8, headroom=1.0,
+                         item_tokens={"script": 500})
+    assert budget.items_per_call("script") == 4
+    
+    budget.response_budget = 100
+    assert budget.items_per_call("script") == 1
+
+
+def test_shards_split_evenly_and_cover_the_total():
+    budget = TokenBudget(response_budget=2048, max_items=8, headroom=1.0,
+                         item_tokens={"idea": 200})
+    shards = budget.shards(19, "idea")
+    assert sum(shards) == 19
+    assert max(shards) - min(shards) <= 1
+    assert max(shards) <= budget.items_per_call("idea")
+    assert budget.shards(0, "idea") == []
+
+
+def test_pack_respects_item_and_prompt_limits():
+    budget = TokenBudget(prompt_budget=100, response_budget=10000, max_items=3, headroom=1.0)
+    items = ["a" * 80] * 7  # 20 tokens each
+    batches = budget.pack(items, "script", render=str, overhead="x" * 80)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    
+    batches = budget.pack(["a" * 160] * 3, "script", render=str, overhead="x" * 80)
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+def test_oversized_item_gets_a_call_of_its_own():
+    budget = TokenBudget(prompt_budget=50, max_items=8)
+    batches = budget.pack(["a" * 40, "b" * 1000, "c" * 40], "script", render=str)
+    assert batches == [["a" * 40], ["b" * 1000], ["c" * 40]]
+
+
+def test_observe_moves_the_estimate_towards_real_responses():
+    budget = TokenBudget(item_tokens={"script": 400})
+    budget.observe("script", 2000, 2)
+    assert budget.item_tokens["script"] == 0.7 * 400 + 0.3 * 1000
+    budget.observe("script", 0, 2)
+    assert budget.item_tokens["script"] == 0.7 * 400 + 0.3 * 1000
+
+
+class PartialModel:
+    """Answers a packed prompt for the first idea only and fails single retries"""
+    
+    def count_tokens(self, text):
+        return SimpleNamespace(total_tokens=len(text) // 4)
+    
+    def generate_content(self, prompt):
+        if "for each of these" not in prompt:
+            raise ValueError("model unavailable")
+        return SimpleNamespace(text=json.dumps([{"idea_id": "idea_1", "hook": "h"}]))
+
+
+def test_failed_retry_of_a_missing_idea_only_fails_that_idea():
+    from tiktok_agent import TikTokAIAgent
+    
+    agent = TikTokAIAgent(None, CONFIG, cache_path=None, history_path=None,
+                          store_path=None, analytics_path=None)
+    agent.model = PartialModel()
+    ideas = [{"id": f"idea_{n}", "hook": f"hook {n}", "description": "d"} for n in (1, 2)]
+    
+    scripts = agent.create_video_scripts(ideas, max_workers=1)
+    
+    assert [script["idea_id"] for script in scripts] == ["idea_1", "idea_2"]
+    assert "script_text" in scripts[0] and "error" not in scripts[0]
+    assert scripts[1]["error"] == "model unavailable"
@@ -0,0 +1,78 @@
+import threading
+
+from tiktok_upload_index import UploadIndex, file_sha256, fingerprint
+from tiktok_uploader import TikTokUploader
+
+
+def make_video(tmp_path, name="clip.mp4", data=b"\x00\x00\x00\x18ftypmp42" + b"x" * 4096):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_claim_excludes_other_owners_until_released(tmp_path):
+    index = UploadIndex(str(tmp_path / "index.db"))
+    assert index.claim("key", "worker-a")
+    assert not index.claim("key", "worker-b")
+    assert index.claim("key", "worker-a")
+    
+    index.release("key", "worker-a")
+    assert index.claim("key", "worker-b")
+
+
+def test_default_owner_is_per_thread(tmp_path):
+    index = UploadIndex(str(tmp_path / "index.db"))
+    assert index.claim("key")
+    
+    results = []
+    thread = threading.Thread(target=lambda: results.append(index.claim("key")))
+    thread.start()
+    thread.join()
+    assert results == [False]
+
+
+def test_abandoned_claim_expires(tmp_path):
+    index = UploadIndex(str(tmp_path / "index.db"), claim_timeout=0)
+    assert index.claim("key", "crashed-worker")
+    assert index.claim("key", "worker-b")
+
+
+def test_find_matches_recorded_content_until_it_fails(tmp_path):
+    index = UploadIndex(str(tmp_path / "index.db"))
+    video = make_video(tmp_path)
+    size = len(open(video, "rb").read())
+    key = fingerprint(video, size)
+    assert index.find(video, size, key) is None
+    
+    index.record(file_sha256(video), key, size, {"publish_id": "p1", "title": "t"}, video)
+    assert index.find(video, size, key)["publish_id"] == "p1"
+    
+    index.update_status("p1", "FAILED")
+    assert index.find(video, size, key) is None
+
+
+def test_upload_checks_the_index_while_holding_the_claim(tmp_path):
+    uploader = TikTokUploader("key", "secret", token_path=str(tmp_path / "tokens.json"),
+                              upload_index_path=str(tmp_path / "index.db"), preflight=False)
+    uploader.tokens.set_tokens({"access_token": "token", "expires_in": 86400})
+    video = make_video(tmp_path)
+    size = len(open(video, "rb").read())
+    key = fingerprint(video, size)
+    index = uploader.upload_index
+    
+    # Another process finished the same content before this one claimed it
+    index.record(file_sha256(video), key, size, {"publish_id": "p1", "title": "t"}, video)
+    
+    held = []
+    find = index.find
+    
+    def checking_find(*args):
+        held.append(not UploadIndex(index.path).claim(key, "someone-else"))
+        return find(*args)
+    
+    index.find = checking_find
+    result = uploader.upload_video(video, "title", claim_owner="job-1")
+    
+    assert result["duplicate"] and result["publish_id"] == "p1"
+    assert held == [True]
+    assert index.claim(key, "someone-else")
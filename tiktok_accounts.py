@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Multi-Account Orchestration
+Runs each account's trends -> ideas -> schedule -> upload pipeline in its own process
+"""
+
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_CREDENTIALS = {
+    "gemini_api_key_env": "GEMINI_API_KEY",
+    "tiktok_client_key_env": "TIKTOK_CLIENT_KEY",
+    "tiktok_client_secret_env": "TIKTOK_CLIENT_SECRET"
+}
+
+
+def load_account_configs(directory: str) -> List[str]:
+    """Paths of every account config (*.json) in a directory"""
+    return sorted(glob.glob(os.path.join(directory, "*.json")))
+
+
+def account_output_dir(config: Dict, output_root: str) -> str:
+    """Per-account folder for tokens, caches, stores and calendars"""
+    username = config.get("account", {}).get("username", "default")
+    slug = re.sub(r"[^A-Za-z0-9_.-]", "", username) or "default"
+    path = os.path.join(output_root, slug)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def run_account(config_path: str, output_root: str = "accounts_output",
+                num_ideas: int = 5, days: int = 7, upload: bool = True) -> Dict:
+    """
+    Run one account's full daily pipeline; meant to run in a worker process
+    
+    Every account gets its own output directory, token file, response
+    cache, idea history, content store, analytics, upload index and
+    Gemini rate budget, so accounts share nothing at runtime.
+    
+    Returns:
+        Summary dict for the account
+    """
+    import json
+    from tiktok_agent import TikTokAIAgent
+    
+    started = time.monotonic()
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    
+    out = account_output_dir(config, output_root)
+    credentials = {**DEFAULT_CREDENTIALS, **config.get("credentials", {})}
+    limits = config.get("rate_limits", {})
+    summary = {"config": config_path, "account": config.get("account", {}).get("username"),
+               "output_dir": out, "uploads": 0}
+    
+    api_key = os.getenv(credentials["gemini_api_key_env"])
+    if not api_key:
+        raise RuntimeError(f"{credentials['gemini_api_key_env']} is not set")
+    
+    agent = TikTokAIAgent(api_key, config_path,
+                          requests_per_minute=limits.get("gemini_rpm", 60),
+                          cache_path=os.path.join(out, "llm_cache.db"),
+                          history_path=os.path.join(out, "idea_history.jsonl"),
+                          store_path=os.path.join(out, "content_store.db"),
+                          analytics_path=os.path.join(out, "analytics"))
+    
+    posts_per_day = config.get("content_strategy", {}).get("posts_per_day", 2)
+    agent.research_trends()
+    ideas = agent.generate_content_ideas(num_ideas=num_ideas)
+    agent.create_video_scripts(ideas, max_workers=limits.get("gemini_workers", 4))
+    agent.generate_posting_schedule(days=days, posts_per_day=posts_per_day)
+    agent.save_content_calendar(os.path.join(out, "content_calendar.json"))
+    summary["ideas"] = len(ideas)
+    summary["slots"] = len(agent.posting_schedule)
+    
+    if upload:
+        summary["uploads"] = _upload_due_slots(agent, credentials, limits, out)
+    
+    summary["seconds"] = round(time.monotonic() - started, 2)
+    return summary
+
+
+def _upload_due_slots(agent, credentials: Dict, limits: Dict, out: str) -> int:
+    """Upload every due slot that has a video attached; returns the number posted"""
+    client_key = os.getenv(credentials["tiktok_client_key_env"])
+    client_secret = os.getenv(credentials["tiktok_client_secret_env"])
+    if not client_key or not client_secret or agent.store is None:
+        return 0
+    
+    due = agent.store.due_slots()
+    if not due:
+        return 0
+    
+    from tiktok_uploader import TikTokUploader
+    uploader = TikTokUploader(client_key, client_secret,
+                              token_path=os.path.join(out, "tiktok_tokens.json"),
+                              upload_index_path=os.path.join(out, "upload_index.db"),
+                              video_length=agent.config.get("content_strategy", {}).get("video_length"))
+    if not uploader.load_tokens():
+        return 0
+    
+    jobs = []
+    for slot in due:
+        idea = agent.store.get_idea(slot["idea_id"]) if slot.get("idea_id") else None
+        title = f"{idea.get('caption', '')} {' '.join(idea.get('hashtags', []))}".strip() if idea else ""
+        jobs.append({"video_path": slot["video_path"], "title": title, "slot_id": slot["slot_id"]})
+        agent.store.update_slot_status(slot["slot_id"], "uploading")
+    # Keyed by slot: several due slots may share one video
+    slots_by_id = {slot["slot_id"]: slot for slot in due}
+    
+    posted = 0
+    for outcome in uploader.upload_batch(jobs, max_workers=limits.get("tiktok_upload_workers", 2)):
+        slot = slots_by_id[outcome["job"]["slot_id"]]
+        result = outcome["result"]
+        if result:
+            posted += 1
+            agent.track_event("posts")
+            agent.store.record_upload(result, idea_id=slot.get("idea_id"),
+                                      slot_id=slot["slot_id"], video_path=slot["video_path"])
+        agent.store.update_slot_status(slot["slot_id"], "posted" if result else "failed")
+    return posted
+
+
+def run_accounts(directory: str, output_root: str = "accounts_output",
+                 max_workers: Optional[int] = None, **kwargs) -> Iterator[Dict]:
+    """
+    Run every account in a directory in parallel worker processes
+    
+    At most max_workers (by default one per CPU) accounts run at a time,
+    each in a process of its own, so a worker that crashes only fails its
+    own account; that account's slots left "uploading" go back to
+    "scheduled" for the next run.
+    
+    Yields:
+        Each account's summary as soon as it finishes; a failing account
+        yields {"config": ..., "error": ...} without affecting the others
+    """
+    paths = load_account_configs(directory)
+    if not paths:
+        print(f"⚠️  No account configs found in {directory}")
+        return
+    
+    workers = min(max_workers or len(paths), len(paths), os.cpu_count() or 1)
+    print(f"\n👥 Running {len(paths)} accounts across {workers} processes...")
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_run_isolated, path, output_root, kwargs): path
+                   for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+                print(f"✅ {summary['account']}: {summary['ideas']} ideas, "
+                      f"{summary['slots']} slots, {summary['uploads']} uploads "
+                      f"in {summary['seconds']}s")
+            except Exception as e:
+                summary = {"config": path, "error": str(e) or type(e).__name__}
+                print(f"❌ {path}: {summary['error']}")
+                _reset_uploading(path, output_root)
+            yield summary
+
+
+def _run_isolated(config_path: str, output_root: str, kwargs: Dict) -> Dict:
+    """run_account in a single-use process, so its crash breaks no other account's pool"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run_account, config_path, output_root, **kwargs).result()
+
+
+def _reset_uploading(config_path: str, output_root: str):
+    """Put a failed account's in-flight slots back to "scheduled" """
+    import json
+    from tiktok_storage import ContentStore
+    
+    try:
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        store_path = os.path.join(account_output_dir(config, output_root), "content_store.db")
+        if not os.path.exists(store_path):
+            return
+        store = ContentStore(store_path)
+        try:
+            slots = store.slots_by_status("uploading", limit=100000)
+            for slot in slots:
+                store.update_slot_status(slot["slot_id"], "scheduled")
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"⚠️  Could not reset uploading slots for {config_path}: {e}")
+        return
+    if slots:
+        print(f"↩️  {len(slots)} slot(s) of {config_path} set back to scheduled")
@@ -4,67 +4,406 @@ TikTok AI Agent - Automated Content Generation and Management System
 Created for HotPickVault (@viralfindsnoww)
 """
 
+import argparse
 import os
 import json
-import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict
-import google.generativeai as genai
+from typing import Iterable, Iterator, List, Dict, Optional
+import tiktok_metrics as metrics
+from tiktok_analytics import AnalyticsStore
+from tiktok_cache import ResponseCache
+from tiktok_dedup import IdeaDedupIndex
+from tiktok_hashtags import HashtagIndex
+from tiktok_pipeline import Pipeline, Stage
+from tiktok_ratelimit import RateGovernor
+from tiktok_storage import ContentStore
+from tiktok_timing import PostingTimeOptimizer
+from tiktok_tokens import TokenBudget
+from tiktok_trends import TrendEngine, group_trends
+
+# Evergreen hashtags (January 2026), used until trend feeds provide live data
+DEFAULT_TRENDING = {
+    "general_viral": [
+        "#tiktokmademebuyit",
+        "#fyp",
+        "#viral",
+        "#trending",
+        "#2k26"
+    ],
+    "product_niche": [
+        "#amazonfind",
+        "#tikokshop",
+        "#productreview",
+        "#musthave",
+        "#viralproduct"
+    ],
+    "lifestyle": [
+        "#smarthome",
+        "#lifehack",
+        "#organization",
+        "#grwm",
+        "#homedecor"
+    ]
+}
+
+SCRIPT_SECTIONS = """1. Shot-by-shot breakdown (5-8 shots, each 2-5 seconds)
+2. Voiceover text for each shot
+3. On-screen text overlays
+4. Background music suggestion (trending sound)
+5. Visual suggestions for each shot
+"""
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Dict]:
+    """Yield each top-level JSON object from a stream of text chunks
+    
+    Objects are parsed as soon as their closing brace arrives. Anything
+    outside objects (array brackets, commas, markdown fences) is ignored,
+    and objects that fail to parse are skipped.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    buffer = []
+    
+    for chunk in chunks:
+        for char in chunk:
+            if depth:
+                buffer.append(char)
+            
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = depth > 0
+            elif char == "{":
+                if depth == 0:
+                    buffer = [char]
+                depth += 1
+            elif char == "}" and depth:
+                depth -= 1
+                if depth == 0:
+                    try:
+                        obj = json.loads("".join(buffer))
+                    except ValueError:
+                        continue
+                    if isinstance(obj, dict):
+                        yield obj
+
 
 class TikTokAIAgent:
-    def __init__(self, gemini_api_key: str, config_path: str = "config.json"):
-        """Initialize the TikTok AI Agent"""
+    def __init__(self, gemini_api_key: Optional[str], config_path: str = "config.json",
+                 requests_per_minute: int = 60,
+                 cache_path: Optional[str] = "llm_cache.db",
+                 use_cache: bool = True,
+                 history_path: Optional[str] = "idea_history.jsonl",
+                 store_path: Optional[str] = "content_store.db",
+                 governor: Optional[RateGovernor] = None,
+                 analytics_path: Optional[str] = "analytics"):
+        """Initialize the TikTok AI Agent
+        
+        Pass use_cache=False to bypass the response cache and force fresh
+        content; cache_path=None disables it entirely. history_path=None
+        turns off near-duplicate screening against past ideas, and
+        store_path=None keeps content in memory only. Gemini calls go through
+        governor (by default one limited to requests_per_minute, with a
+        burst of config rate_limits.gemini_burst or a minute's quota), which
+        retries 429/5xx responses with backoff instead of dropping the work.
+        Pipeline events and video metrics are rolled up under analytics_path
+        unless config automation.analytics_tracking is false.
+        
+        The Gemini SDK is only imported, and the model only built, on the
+        first call that needs it, so non-LLM tasks start fast and may pass
+        gemini_api_key=None.
+        """
         self.gemini_api_key = gemini_api_key
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model_name = 'gemini-pro'
+        self._model = None
+        self._model_lock = threading.Lock()
         
         # Load configuration
         with open(config_path, 'r') as f:
             self.config = json.load(f)
         
-        self.trending_hashtags = []
+        account = self.config.get("account", {})
+        self.username = account.get("username", "@viralfindsnoww")
+        self.display_name = account.get("display_name", "HotPickVault")
+        
+        self.trending_hashtags = {}
+        self.new_trends = 0
+        self.hashtag_index = None
         self.content_ideas = []
         self.posting_schedule = []
+        
+        # Per-call token limits used to shard idea requests and pack scripts
+        self.tokens = TokenBudget.from_config(self.config)
+        
+        # Shared by every Gemini call so parallel batches stay within quota; the
+        # burst defaults to a full minute of quota so workers are not serialized
+        burst = self.config.get("rate_limits", {}).get("gemini_burst", requests_per_minute)
+        self.governor = governor or RateGovernor({"gemini_generate": (requests_per_minute, burst)})
+        
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.use_cache = use_cache
+        
+        self.history_path = history_path
+        self._idea_index = None
+        self._timing = None
+        self._trend_engine = None
+        self._analytics = None
+        tracking = self.config.get("automation", {}).get("analytics_tracking", True)
+        self.analytics_path = analytics_path if tracking else None
+        self.store = ContentStore(store_path) if store_path else None
+    
+    @property
+    def model(self):
+        """Gemini model, created on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._create_model()
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def _create_model(self):
+        import google.generativeai as genai
+        
+        if not self.gemini_api_key:
+            raise RuntimeError("GEMINI_API_KEY is required for content generation")
+        genai.configure(api_key=self.gemini_api_key)
+        return genai.GenerativeModel(self.model_name)
+    
+    @property
+    def idea_index(self) -> Optional[IdeaDedupIndex]:
+        """Near-duplicate history index, loaded from disk on first use"""
+        if self._idea_index is None and self.history_path:
+            self._idea_index = IdeaDedupIndex(self.history_path)
+        return self._idea_index
     
+    @property
+    def timing(self) -> PostingTimeOptimizer:
+        """Hour-of-week engagement scores behind generate_posting_schedule"""
+        if self._timing is None:
+            path = os.path.join(self.analytics_path, "timing.json") if self.analytics_path else None
+            self._timing = PostingTimeOptimizer.from_config(self.config, path=path)
+        return self._timing
+    
+    def refresh_timing(self, lookback_days: int = 28) -> int:
+        """
+        Feed recent uploads' view counts from analytics into self.timing
+        
+        Each upload is bucketed by when it was posted; a video seen on an
+        earlier run has its reading replaced, not counted again. The bucket
+        totals are saved next to the analytics so they carry across runs.
+        
+        Returns:
+            Number of uploads with metrics that were folded in
+        """
+        if self.store is None or self.analytics is None:
+            return 0
+        since = (datetime.now() - timedelta(days=lookback_days)).isoformat()
+        records = []
+        for upload in self.store.uploads_since(since, limit=10000):
+            totals = self.analytics.video_totals(upload["publish_id"])
+            if totals and upload.get("uploaded_at"):
+                records.append({"publish_id": upload["publish_id"],
+                                "posted_at": datetime.fromisoformat(upload["uploaded_at"]).astimezone(),
+                                "views": totals["views"]})
+        if records:
+            self.timing.ingest(records)
+            self.timing.save()
+        return len(records)
+    
+    @property
+    def trend_engine(self) -> TrendEngine:
+        """Sliding-window hashtag counts, kept across research_trends calls"""
+        if self._trend_engine is None:
+            window_minutes = self.config.get("trends", {}).get("window_minutes", 60)
+            self._trend_engine = TrendEngine(window_seconds=int(window_minutes * 60))
+        return self._trend_engine
+    
+    @property
+    def analytics(self) -> Optional[AnalyticsStore]:
+        """Columnar metrics log and its hourly/daily rollups, opened on first use"""
+        if self._analytics is None and self.analytics_path:
+            with self._model_lock:
+                if self._analytics is None:
+                    self._analytics = AnalyticsStore(self.analytics_path)
+        return self._analytics
+    
+    def track_event(self, kind: str, count: int = 1):
+        """Count a pipeline event (ideas, scripts, posts) in today's rollup"""
+        if count and self.analytics is not None:
+            self.analytics.record_event(kind, count)
+    
+    def load_from_store(self):
+        """Reload today's ideas and upcoming slots from the content store"""
+        if self.store is None:
+            return
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.content_ideas = self.store.ideas_since(today)
+        self.posting_schedule = self.store.upcoming_slots()
+    
+    @metrics.timed("research_trends")
     def research_trends(self) -> Dict:
-        """Research current trending topics on TikTok"""
+        """Research current trending topics from the configured trend feeds
+        
+        Feeds listed under config["trends"]["sources"] (JSONL/CSV globs) are
+        tailed into the sliding-window trend engine; without any data the
+        built-in evergreen list is used.
+        """
         print("\n🔍 Researching trending topics...")
         
-        # Top trending hashtags for January 2026
-        trending_data = {
-            "general_viral": [
-                "#tiktokmademebuyit",
-                "#fyp",
-                "#viral",
-                "#trending",
-                "#2k26"
-            ],
-            "product_niche": [
-                "#amazonfind",
-                "#tikokshop",
-                "#productreview",
-                "#musthave",
-                "#viralproduct"
-            ],
-            "lifestyle": [
-                "#smarthome",
-                "#lifehack",
-                "#organization",
-                "#grwm",
-                "#homedecor"
-            ]
-        }
+        trend_config = self.config.get("trends", {})
+        weights = None
+        trending_data = {}
+        self.new_trends = 0
+        if trend_config.get("sources"):
+            consumed = self.trend_engine.ingest_files(trend_config["sources"])
+            print(f"📈 Ingested {consumed} new hashtag observations")
+            trends = self.trend_engine.trends(top_k=trend_config.get("top_k", 30))
+            trending_data, weights = group_trends(trends)
+            self.new_trends = sum(1 for trend in trends if not trend["previous_count"])
+        
+        if not trending_data:
+            trending_data = {category: list(tags) for category, tags in DEFAULT_TRENDING.items()}
+            weights = None
         
         self.trending_hashtags = trending_data
+        self.hashtag_index = HashtagIndex(trending_data, weights=weights)
         print(f"✅ Found {sum(len(v) for v in trending_data.values())} trending hashtags")
         return trending_data
     
-    def generate_content_ideas(self, num_ideas: int = 5) -> List[Dict]:
-        """Generate video content ideas using Gemini AI"""
+    @metrics.timed("generate_content_ideas")
+    def generate_content_ideas(self, num_ideas: int = 5, max_rounds: int = 3) -> List[Dict]:
+        """Generate video content ideas using Gemini AI
+        
+        Requests larger than one response can hold are split into several
+        calls sized by the token budget. Ideas that near-duplicate past ones
+        are rejected and replacements are requested, for up to max_rounds
+        rounds of calls.
+        """
         print(f"\n💡 Generating {num_ideas} content ideas...")
         
-        prompt = f"""You are a TikTok content strategist for a viral products account called HotPickVault.
+        try:
+            ideas = []
+            rejected_hooks = []
+            
+            for _ in range(max_rounds):
+                missing = num_ideas - len(ideas)
+                if missing <= 0:
+                    break
+                
+                for count in self.tokens.shards(missing, "idea"):
+                    # Later shards see earlier hooks, so they do not repeat them
+                    avoid = rejected_hooks + [idea["hook"] for idea in ideas]
+                    ideas_text = self._generate(self._ideas_prompt(count, avoid))
+                    
+                    received = 0
+                    for raw in iter_json_objects([ideas_text]):
+                        received += 1
+                        idea = self._build_idea(raw, len(ideas) + 1)
+                        if not idea:
+                            continue
+                        if self._is_duplicate(idea):
+                            rejected_hooks.append(idea["hook"])
+                            continue
+                        ideas.append(idea)
+                        if len(ideas) == num_ideas:
+                            break
+                    self.tokens.observe("idea", self.tokens.count(ideas_text), received)
+                    if len(ideas) == num_ideas:
+                        break
+            
+            if rejected_hooks:
+                print(f"♻️  Rejected {len(rejected_hooks)} near-duplicate ideas")
+            
+            self.content_ideas = ideas
+            self.track_event("ideas", len(ideas))
+            print(f"✅ Generated {len(ideas)} content ideas")
+            return ideas
+            
+        except Exception as e:
+            print(f"❌ Error generating content: {e}")
+            return []
+    
+    def stream_content_ideas(self, num_ideas: int = 5) -> Iterator[Dict]:
+        """Yield content ideas one by one as Gemini streams them
+        
+        Each idea is yielded as soon as its closing brace arrives, so callers
+        can start scripting idea 1 while the rest are still being generated.
+        Malformed items are skipped.
+        """
+        print(f"\n💡 Streaming {num_ideas} content ideas...")
+        
+        ideas = []
+        
+        try:
+            # Oversized requests stream as consecutive calls within the token budget
+            for count in self.tokens.shards(num_ideas, "idea"):
+                prompt = self._ideas_prompt(count, [idea["hook"] for idea in ideas])
+                cached = None
+                if self.cache is not None and self.use_cache:
+                    cached = self.cache.get(self.model_name, prompt)
+                
+                if cached is not None:
+                    chunks = [cached]
+                else:
+                    self.tokens.calibrate(self.model.count_tokens, prompt)
+                    response = self.governor.call("gemini_generate", self.model.generate_content,
+                                                  prompt, stream=True)
+                    chunks = self._stream_text(response, prompt)
+                
+                for raw in iter_json_objects(chunks):
+                    idea = self._build_idea(raw, len(ideas) + 1)
+                    if not idea or self._is_duplicate(idea):
+                        continue
+                    ideas.append(idea)
+                    yield idea
+                    if len(ideas) == num_ideas:
+                        break
+                if len(ideas) == num_ideas:
+                    break
+                    
+        except Exception as e:
+            print(f"❌ Error streaming content: {e}")
+        
+        self.content_ideas = ideas
+        self.track_event("ideas", len(ideas))
+        print(f"✅ Streamed {len(ideas)} content ideas")
+    
+    def _stream_text(self, response, prompt: str) -> Iterator[str]:
+        """Pass through streamed text chunks, caching the full text once complete"""
+        parts = []
+        for chunk in response:
+            text = chunk.text
+            parts.append(text)
+            yield text
+        
+        if self.cache is not None:
+            self.cache.set(self.model_name, prompt, "".join(parts))
+    
+    def _is_duplicate(self, idea: Dict) -> bool:
+        """Screen an idea against the history index and this run's ideas"""
+        if self.idea_index is None:
+            return False
+        return self.idea_index.check(idea) is not None
+    
+    def _ideas_prompt(self, num_ideas: int, avoid_hooks: Optional[List[str]] = None) -> str:
+        """Build the idea generation prompt
+        
+        Hooks to avoid are listed, newest first, only while they fit the prompt budget.
+        """
+        prompt = f"""You are a TikTok content strategist for a viral products account called {self.display_name}.
 
 Generate {num_ideas} TikTok video ideas that will go viral. Each idea should:
 - Feature trending products, gadgets, or life hacks
@@ -82,190 +421,515 @@ For each idea, provide:
 
 Format as JSON array with fields: hook, description, caption, hashtags, cta
 """
+        if not avoid_hooks:
+            return prompt
         
-        try:
-            response = self.model.generate_content(prompt)
-            # Parse response and extract ideas
-            ideas_text = response.text
-            
-            # For demo, create structured ideas
-            ideas = []
-            for i in range(num_ideas):
-                idea = {
-                    "id": f"idea_{i+1}_{int(time.time())}",
-                    "hook": f"Hook for idea {i+1}",
-                    "description": "Video description",
-                    "caption": "Video caption",
-                    "hashtags": self._select_hashtags(),
-                    "cta": "Follow for more!",
-                    "generated_at": datetime.now().isoformat(),
-                    "status": "pending"
-                }
-                ideas.append(idea)
-            
-            self.content_ideas = ideas
-            print(f"✅ Generated {len(ideas)} content ideas")
-            return ideas
-            
-        except Exception as e:
-            print(f"❌ Error generating content: {e}")
-            return []
+        room = self.tokens.prompt_budget - self.tokens.count(prompt) - 20
+        listed = []
+        for hook in reversed(avoid_hooks):
+            room -= self.tokens.count(hook) + 1
+            if room < 0:
+                break
+            listed.append(f"- {hook}")
+        listed = "\n".join(reversed(listed))
+        return f"{prompt}\nThese hooks were already used. Do not repeat or paraphrase them:\n{listed}\n"
     
-    def _select_hashtags(self, count: int = 5) -> List[str]:
-        """Select relevant hashtags from trending lists"""
-        all_tags = []
-        for category in self.trending_hashtags.values():
-            all_tags.extend(category)
+    def _build_idea(self, raw: Dict, number: int) -> Optional[Dict]:
+        """Turn one parsed model object into an idea, or None if it is unusable"""
+        hook = raw.get("hook")
+        if not isinstance(hook, str) or not hook.strip():
+            return None
+        
+        hashtags = raw.get("hashtags")
+        if isinstance(hashtags, str):
+            hashtags = hashtags.split()
+        if not isinstance(hashtags, list) or not all(isinstance(t, str) for t in hashtags):
+            hashtags = self._select_hashtags()
+        
+        return {
+            "id": f"idea_{number}_{int(time.time())}",
+            "hook": hook.strip(),
+            "description": str(raw.get("description", "")),
+            "caption": str(raw.get("caption", "")),
+            "hashtags": hashtags,
+            "cta": str(raw.get("cta") or "Follow for more!"),
+            "generated_at": datetime.now().isoformat(),
+            "status": "pending"
+        }
+    
+    def _generate(self, prompt: str) -> str:
+        """Return Gemini's text for a prompt, served from the cache when possible"""
+        use_cache = self.cache is not None and self.use_cache
+        if use_cache:
+            cached = self.cache.get(self.model_name, prompt)
+            metrics.inc("tiktok_llm_cache_total", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+        
+        self.tokens.calibrate(self.model.count_tokens, prompt)
+        response = self.governor.call("gemini_generate", self._call_model, prompt)
+        text = response.text
+        
+        if metrics.is_enabled():
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                metrics.inc("tiktok_gemini_tokens_total", getattr(usage, "prompt_token_count", 0), kind="prompt")
+                metrics.inc("tiktok_gemini_tokens_total", getattr(usage, "candidates_token_count", 0), kind="response")
         
-        import random
-        return random.sample(all_tags, min(count, len(all_tags)))
+        # Fresh runs still refresh the cache for the next normal run
+        if self.cache is not None:
+            self.cache.set(self.model_name, prompt, text)
+        return text
+    
+    def _call_model(self, prompt: str):
+        with metrics.stage("gemini_generate"):
+            return self.model.generate_content(prompt)
+    
+    def _select_hashtags(self, count: int = 5) -> List[str]:
+        """Select relevant hashtags from trending lists, weighted by trend strength"""
+        if self.hashtag_index is None:
+            self.hashtag_index = HashtagIndex(self.trending_hashtags)
+        return self.hashtag_index.sample(count)
     
     def create_video_script(self, idea: Dict) -> Dict:
         """Generate detailed script for a video idea"""
         print(f"\n📝 Creating script for: {idea['id']}")
         
+        try:
+            script = self._generate_script(idea)
+            print(f"✅ Script created")
+            return script
+            
+        except Exception as e:
+            print(f"❌ Error creating script: {e}")
+            return {}
+    
+    def create_video_scripts(self, ideas: List[Dict], max_workers: int = 8) -> List[Dict]:
+        """Generate scripts for many ideas concurrently
+        
+        Ideas are packed several to a call, as many as the token budget
+        allows, and the calls run on a thread pool capped at max_workers
+        sharing the agent's rate limiter. Results keep the order of ideas; a
+        failed idea gets {"idea_id": ..., "error": ...} instead of a script.
+        """
+        batches = self.tokens.pack(ideas, "script", self._script_brief, overhead=SCRIPT_SECTIONS)
+        print(f"\n📝 Creating {len(ideas)} scripts in {len(batches)} calls "
+              f"({max_workers} in parallel)...")
+        
+        def run(batch: List[Dict]) -> List[Dict]:
+            try:
+                return self._generate_scripts(batch)
+            except Exception as e:
+                return [{"idea_id": idea.get('id'), "error": str(e)} for idea in batch]
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            scripts = [script for batch in executor.map(run, batches) for script in batch]
+        
+        failed = sum(1 for script in scripts if "error" in script)
+        print(f"✅ Created {len(scripts) - failed} scripts ({failed} failed)")
+        return scripts
+    
+    @metrics.timed("create_video_script")
+    def _generate_script(self, idea: Dict) -> Dict:
+        """Ask Gemini for one idea's script; raises on failure"""
         prompt = f"""Create a detailed TikTok video script for this idea:
 
 Hook: {idea['hook']}
 Description: {idea['description']}
 
 Provide:
-1. Shot-by-shot breakdown (5-8 shots, each 2-5 seconds)
-2. Voiceover text for each shot
-3. On-screen text overlays
-4. Background music suggestion (trending sound)
-5. Visual suggestions for each shot
-
+{SCRIPT_SECTIONS}
 Format as structured JSON.
 """
+        text = self._generate(prompt)
+        self.tokens.observe("script", self.tokens.count(text), 1)
+        return self._save_script(idea, text)
+    
+    @staticmethod
+    def _script_brief(idea: Dict) -> str:
+        """One idea's part of a packed script prompt"""
+        return f"""idea_id: {idea['id']}
+Hook: {idea['hook']}
+Description: {idea['description']}
+"""
+    
+    @metrics.timed("create_video_scripts_packed")
+    def _generate_scripts(self, ideas: List[Dict]) -> List[Dict]:
+        """Script several ideas with one call, split back per idea_id
         
-        try:
-            response = self.model.generate_content(prompt)
-            script = {
-                "idea_id": idea['id'],
-                "script_text": response.text,
-                "created_at": datetime.now().isoformat()
-            }
-            
-            print(f"✅ Script created")
-            return script
-            
-        except Exception as e:
-            print(f"❌ Error creating script: {e}")
-            return {}
+        Ideas missing from the response (e.g. a cut-off answer) are retried
+        on their own; a retry that fails becomes an error entry for that
+        idea only.
+        """
+        if len(ideas) == 1:
+            return [self._generate_script(ideas[0])]
+        
+        briefs = "\n".join(self._script_brief(idea) for idea in ideas)
+        prompt = f"""Create a detailed TikTok video script for each of these {len(ideas)} ideas:
+
+{briefs}
+For each idea, provide:
+{SCRIPT_SECTIONS}
+Format as a JSON array with one object per idea. Each object must include
+"idea_id" copied exactly from the idea, plus its script as structured JSON.
+"""
+        text = self._generate(prompt)
+        
+        by_id = {}
+        for raw in iter_json_objects([text]):
+            idea_id = raw.get("idea_id")
+            if isinstance(idea_id, str):
+                by_id[idea_id] = raw
+        
+        scripts = []
+        for idea in ideas:
+            raw = by_id.get(idea["id"])
+            if raw is None:
+                metrics.inc("tiktok_packed_script_misses_total")
+                try:
+                    scripts.append(self._generate_script(idea))
+                except Exception as e:
+                    scripts.append({"idea_id": idea['id'], "error": str(e)})
+            else:
+                scripts.append(self._save_script(idea, json.dumps(raw, ensure_ascii=False)))
+        self.tokens.observe("script", self.tokens.count(text), len(by_id))
+        return scripts
     
-    def generate_posting_schedule(self, days: int = 7, posts_per_day: int = 2) -> List[Dict]:
-        """Generate optimal posting schedule"""
-        print(f"\n📅 Generating {days}-day posting schedule ({posts_per_day} posts/day)...")
+    def _save_script(self, idea: Dict, script_text: str) -> Dict:
+        script = {
+            "idea_id": idea['id'],
+            "script_text": script_text,
+            "created_at": datetime.now().isoformat()
+        }
+        if self.store is not None:
+            self.store.add_script(script)
+        self.track_event("scripts")
+        return script
+    
+    def run_pipeline(self, num_ideas: int = 5, uploader=None,
+                     video_dir: Optional[str] = None,
+                     script_workers: int = 4, upload_workers: int = 2,
+                     progress_interval: Optional[float] = 5.0) -> List[Dict]:
+        """Stream ideas through scripting, slot assignment and upload concurrently
         
-        # Optimal posting times for TikTok (EST)
-        optimal_times = [
-            {"hour": 9, "minute": 0, "label": "Morning (9 AM)"},
-            {"hour": 12, "minute": 0, "label": "Lunch (12 PM)"},
-            {"hour": 17, "minute": 0, "label": "Evening (5 PM)"},
-            {"hour": 21, "minute": 0, "label": "Night (9 PM)"}
-        ]
+        Each stage has its own workers and a bounded input queue, so scripting
+        starts with the first streamed idea and uploads overlap later scripts.
+        An idea gets the next free schedule slot; when video_dir holds
+        "<idea_id>.mp4" and an uploader is given, the video is uploaded too.
         
-        schedule = []
-        start_date = datetime.now()
+        Returns:
+            One dict per idea with idea, script, slot and (if posted) upload
+        """
+        print(f"\n🏭 Running pipeline for {num_ideas} ideas...")
+        free_slots = iter([slot for slot in self.posting_schedule if not slot.get("idea_id")])
+        slot_lock = threading.Lock()
         
-        for day in range(days):
-            post_date = start_date + timedelta(days=day)
-            
-            for post_num in range(posts_per_day):
-                time_slot = optimal_times[post_num % len(optimal_times)]
-                
-                scheduled_time = post_date.replace(
-                    hour=time_slot['hour'],
-                    minute=time_slot['minute'],
-                    second=0
-                )
-                
-                schedule_entry = {
-                    "scheduled_time": scheduled_time.isoformat(),
-                    "time_label": time_slot['label'],
-                    "status": "scheduled",
-                    "idea_id": None  # To be assigned
-                }
-                schedule.append(schedule_entry)
+        def script(idea: Dict) -> Dict:
+            return {"idea": idea, "script": self._generate_script(idea)}
+        
+        def prepare(item: Dict) -> Dict:
+            idea = item["idea"]
+            with slot_lock:
+                slot = next(free_slots, None)
+            if video_dir:
+                path = os.path.join(video_dir, f"{idea['id']}.mp4")
+                if os.path.exists(path):
+                    item["video_path"] = path
+            if slot is not None:
+                slot["idea_id"] = idea["id"]
+                if item.get("video_path"):
+                    slot["video_path"] = item["video_path"]
+                if self.store is not None and slot.get("slot_id") is not None:
+                    self.store.assign_slot(slot["slot_id"], idea["id"], item.get("video_path"))
+            item["slot"] = slot
+            return item
+        
+        stages = [Stage("script", script, workers=script_workers),
+                  Stage("prepare", prepare)]
+        if uploader is not None:
+            stages.append(Stage("upload", lambda item: self._upload_item(uploader, item),
+                                workers=upload_workers))
+        
+        pipeline = Pipeline(stages, progress_interval=progress_interval)
+        results = list(pipeline.run(self.stream_content_ideas(num_ideas)))
+        
+        failed = sum(stage.failed for stage in pipeline.stages)
+        posted = sum(1 for item in results if item.get("upload"))
+        print(f"✅ Pipeline finished: {len(results)} scripted, {posted} uploaded, {failed} failed")
+        return results
+    
+    def _upload_item(self, uploader, item: Dict) -> Dict:
+        """Upload stage: post the idea's video if one was found"""
+        if not item.get("video_path"):
+            return item
+        idea, slot = item["idea"], item.get("slot") or {}
+        title = f"{idea.get('caption', '')} {' '.join(idea.get('hashtags', []))}".strip()
+        result = uploader.upload_video(item["video_path"], title)
+        if result is None:
+            raise RuntimeError(f"upload failed for {item['video_path']}")
+        
+        item["upload"] = result
+        if slot:
+            slot["status"] = "posted"
+        if self.store is not None:
+            self.store.record_upload(result, idea_id=idea["id"], slot_id=slot.get("slot_id"),
+                                     video_path=item["video_path"])
+            if slot.get("slot_id") is not None:
+                self.store.update_slot_status(slot["slot_id"], "posted")
+        self.track_event("posts")
+        return item
+    
+    @metrics.timed("generate_posting_schedule")
+    def generate_posting_schedule(self, days: int = 7, posts_per_day: int = 2,
+                                  start_date: Optional[datetime] = None) -> List[Dict]:
+        """Generate optimal posting schedule, starting today unless start_date is given
+        
+        Slots come from the hour-of-week scores in self.timing, in the
+        account's timezone, after refresh_timing() folds in the views of
+        recent uploads.
+        """
+        print(f"\n📅 Generating {days}-day posting schedule ({posts_per_day} posts/day)...")
+        
+        self.refresh_timing()
+        schedule = self.timing.best_slots(days, posts_per_day, start_date)
         
         self.posting_schedule = schedule
         print(f"✅ Created schedule with {len(schedule)} posts")
         return schedule
     
-    def save_content_calendar(self, filename: str = "content_calendar.json"):
-        """Save generated content and schedule to file"""
-        calendar = {
-            "generated_at": datetime.now().isoformat(),
-            "account": "@viralfindsnoww",
-            "trending_hashtags": self.trending_hashtags,
-            "content_ideas": self.content_ideas,
-            "posting_schedule": self.posting_schedule
-        }
+    def save_content_calendar(self, filename: str = "content_calendar.json",
+                              snapshot: bool = True):
+        """Save generated content and schedule
         
-        with open(filename, 'w') as f:
-            json.dump(calendar, f, indent=2)
+        New ideas and slots are inserted into the content store; the JSON
+        file is only written when snapshot is True. Ideas enter the
+        duplicate-screening history only once saved, so a run that fails
+        before this point does not block its ideas.
+        """
+        if self.store is not None:
+            self.store.add_ideas(self.content_ideas)
+            self.store.add_slots(self.posting_schedule)
+            print(f"\n💾 Content store updated ({self.store.path})")
         
-        print(f"\n💾 Content calendar saved to {filename}")
+        if snapshot:
+            calendar = {
+                "generated_at": datetime.now().isoformat(),
+                "account": self.username,
+                "trending_hashtags": self.trending_hashtags,
+                "content_ideas": self.content_ideas,
+                "posting_schedule": self.posting_schedule
+            }
+            
+            with open(filename, 'w') as f:
+                json.dump(calendar, f, indent=2)
+            
+            print(f"\n💾 Content calendar saved to {filename}")
+        
+        if self.store is not None or snapshot:
+            self._record_ideas()
+    
+    def _record_ideas(self):
+        if self.idea_index is not None:
+            self.idea_index.record(self.content_ideas)
     
     def generate_daily_report(self) -> str:
-        """Generate a daily performance report"""
+        """Generate a daily performance report from today's analytics rollup"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        rollup = self.analytics.day(today) if self.analytics is not None else None
+        events = rollup["events"] if rollup else {}
+        
+        slots_today = [slot for slot in self.posting_schedule
+                       if slot.get("scheduled_time", "").startswith(today)]
+        ready = sum(1 for slot in self.posting_schedule
+                    if slot.get("video_path") and slot.get("status", "scheduled") == "scheduled")
+        views = rollup["views"] if rollup else 0
+        engagement = (rollup["likes"] + rollup["shares"] + rollup["comments"]) / views if views else 0.0
+        watch = rollup["watch_seconds"] / views if views else 0.0
+        
+        def row(text: str) -> str:
+            return f"║ {text:<57}║"
+        
         report = f"""
 ╔══════════════════════════════════════════════════════════╗
-║        TikTok AI Agent - Daily Report                     ║
-║        Account: @viralfindsnoww (HotPickVault)           ║
+║        TikTok AI Agent - Daily Report                    ║
+{row(f"       Account: {self.username} ({self.display_name})")}
 ╠══════════════════════════════════════════════════════════╣
-║ Date: {datetime.now().strftime('%B %d, %Y')}                                   ║
+{row(f"Date: {datetime.now().strftime('%B %d, %Y')}")}
 ╠══════════════════════════════════════════════════════════╣
 ║ CONTENT GENERATION:                                      ║
-║  • Ideas Generated: {len(self.content_ideas):2d}                                 ║
-║  • Scripts Created: 0                                    ║
-║  • Ready to Post: 0                                      ║
+{row(f" • Ideas Generated: {events.get('ideas', len(self.content_ideas))}")}
+{row(f" • Scripts Created: {events.get('scripts', 0)}")}
+{row(f" • Ready to Post: {ready}")}
 ╠══════════════════════════════════════════════════════════╣
 ║ POSTING SCHEDULE:                                        ║
-║  • Posts Scheduled: {len(self.posting_schedule):2d}                                 ║
-║  • Posts Today: 2                                        ║
-║  • Next Post: {self.posting_schedule[0]['time_label'] if self.posting_schedule else 'N/A'}                         ║
+{row(f" • Posts Scheduled: {len(self.posting_schedule)}")}
+{row(f" • Posts Today: {events.get('posts', 0)} of {len(slots_today)}")}
+{row(f" • Next Post: {self.posting_schedule[0]['time_label'] if self.posting_schedule else 'N/A'}")}
+╠══════════════════════════════════════════════════════════╣
+║ PERFORMANCE (today):                                     ║
+{row(f" • Views: {views:,}")}
+{row(f" • Likes: {rollup['likes'] if rollup else 0:,}  Shares: {rollup['shares'] if rollup else 0:,}")}
+{row(f" • Engagement Rate: {engagement:.1%}")}
+{row(f" • Avg Watch Time: {watch:.1f}s per view")}
 ╠══════════════════════════════════════════════════════════╣
 ║ TRENDING TOPICS:                                         ║
-║  • Monitored Hashtags: {sum(len(v) for v in self.trending_hashtags.values()):2d}                          ║
-║  • New Trends Found: 3                                   ║
+{row(f" • Monitored Hashtags: {sum(len(v) for v in self.trending_hashtags.values())}")}
+{row(f" • New Trends Found: {self.new_trends}")}
 ╚══════════════════════════════════════════════════════════╝
         """
         
         return report
 
+def _make_uploader(agent: TikTokAIAgent):
+    """TikTok uploader from environment credentials and saved tokens, or None"""
+    from tiktok_uploader import TikTokUploader
+    
+    client_key = os.getenv('TIKTOK_CLIENT_KEY')
+    client_secret = os.getenv('TIKTOK_CLIENT_SECRET')
+    if not client_key or not client_secret:
+        print("\n❌ Error: TIKTOK_CLIENT_KEY and TIKTOK_CLIENT_SECRET must be set to upload")
+        return None
+    
+    video_length = agent.config.get("content_strategy", {}).get("video_length")
+    uploader = TikTokUploader(client_key, client_secret, video_length=video_length)
+    if not uploader.load_tokens():
+        return None
+    return uploader
+
+def run_daemon(agent: TikTokAIAgent, jobs_path: Optional[str] = None):
+    """Run the scheduler daemon that posts queued slots at their scheduled time"""
+    from tiktok_jobs import JobQueue
+    from tiktok_poller import StatusPoller
+    from tiktok_scheduler import SchedulerDaemon
+    
+    uploader = _make_uploader(agent)
+    if uploader is None:
+        return
+    
+    poller = StatusPoller(uploader, store=agent.store)
+    poller.start()
+    
+    # Without a Gemini key the daemon only posts; background generation is off
+    pregen_days = 7 if agent.gemini_api_key else 0
+    if not pregen_days:
+        print("⚠️  GEMINI_API_KEY not set: posting scheduled slots without generating new ones")
+    
+    jobs = JobQueue(jobs_path) if jobs_path else None
+    daemon = SchedulerDaemon(uploader, agent=agent, store=agent.store, poller=poller, jobs=jobs,
+                             pregen_days=pregen_days)
+    daemon.load_from_store()
+    
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        poller.stop()
+
+def run_worker(agent: TikTokAIAgent, jobs_path: str):
+    """Claim and upload jobs from a shared queue until interrupted"""
+    from tiktok_jobs import JobQueue, UploadWorker
+    from tiktok_poller import StatusPoller
+    
+    uploader = _make_uploader(agent)
+    if uploader is None:
+        return
+    
+    poller = StatusPoller(uploader, store=agent.store)
+    poller.start()
+    
+    jobs = JobQueue(jobs_path)
+    worker = UploadWorker(jobs, uploader, agent=agent, store=agent.store, poller=poller)
+    print(f"\n👷 Upload worker waiting for jobs in {jobs_path} {jobs.stats()}")
+    
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+    finally:
+        poller.stop()
+        jobs.close()
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="TikTok AI Agent")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and post scheduled videos at their slot times")
+    parser.add_argument("--jobs", metavar="DB",
+                        help="with --daemon, queue due slots in this job database for workers")
+    parser.add_argument("--worker", metavar="DB",
+                        help="upload jobs claimed from this job database (run one per process/host)")
+    parser.add_argument("--accounts", metavar="DIR",
+                        help="run every account config in DIR in parallel processes")
+    parser.add_argument("--upload", action="store_true",
+                        help="upload rendered videos as their ideas come out of the pipeline")
+    parser.add_argument("--videos", metavar="DIR",
+                        help="folder of rendered videos named <idea_id>.mp4")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="write Prometheus-format stage metrics to PATH on exit")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument("--metrics-log", metavar="PATH",
+                        help="append a JSON line per metric observation to PATH")
+    args = parser.parse_args()
+    
+    if args.metrics_file or args.metrics_port or args.metrics_log:
+        metrics.enable(json_log_path=args.metrics_log)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+    
+    try:
+        _run(args)
+    finally:
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
+
+def _run(args):
+    """Run the mode selected on the command line"""
+    if args.accounts:
+        from tiktok_accounts import run_accounts
+        results = list(run_accounts(args.accounts))
+        failed = sum(1 for r in results if "error" in r)
+        print(f"\n✨ {len(results) - failed}/{len(results)} accounts completed\n")
+        return
+    
+    # Get API key from environment; upload-only modes never build the model
+    api_key = os.getenv('GEMINI_API_KEY')
+    
+    # Initialize agent
+    agent = TikTokAIAgent(api_key)
+    
     print("="*60)
     print("   TikTok AI Agent - Content Automation System")
-    print("   Account: @viralfindsnoww (HotPickVault)")
+    print(f"   Account: {agent.username} ({agent.display_name})")
     print("="*60)
     
-    # Get API key from environment
-    api_key = os.getenv('GEMINI_API_KEY')
+    if args.worker:
+        run_worker(agent, args.worker)
+        return
+    
+    if args.daemon:
+        run_daemon(agent, jobs_path=args.jobs)
+        return
+    
     if not api_key:
         print("\n❌ Error: GEMINI_API_KEY environment variable not set")
         print("Please set it using: export GEMINI_API_KEY='your-key-here'")
         return
     
-    # Initialize agent
-    agent = TikTokAIAgent(api_key)
-    
     # Execute daily workflow
     print("\n🚀 Starting daily content generation workflow...\n")
     
     # Step 1: Research trends
     agent.research_trends()
-    time.sleep(1)
     
-    # Step 2: Generate content ideas
-    ideas = agent.generate_content_ideas(num_ideas=5)
-    time.sleep(1)
+    # Step 2: Create posting schedule (slots are filled as ideas are scripted)
+    agent.generate_posting_schedule(days=7, posts_per_day=2)
+    agent.save_content_calendar(snapshot=False)
     
-    # Step 3: Create posting schedule
-    schedule = agent.generate_posting_schedule(days=7, posts_per_day=2)
-    time.sleep(1)
+    # Step 3: Ideas -> scripts -> slots -> uploads, all stages overlapping
+    uploader = _make_uploader(agent) if args.upload else None
+    agent.run_pipeline(num_ideas=5, uploader=uploader, video_dir=args.videos)
     
     # Step 4: Save everything
     agent.save_content_calendar()
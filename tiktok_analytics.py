@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Analytics Store
+Append-only columnar log of per-video metrics and pipeline events with
+incrementally maintained hourly and daily rollups, so reports never rescan
+raw history
+"""
+
+import atexit
+import contextlib
+import csv
+import functools
+import json
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: one process per directory
+    fcntl = None
+
+# Raw metric columns: one packed binary file per column, one value per row
+COLUMNS = (
+    ("timestamp", "d"),
+    ("video", "q"),
+    ("views", "q"),
+    ("likes", "q"),
+    ("shares", "q"),
+    ("comments", "q"),
+    ("watch_seconds", "d")
+)
+METRICS = ("views", "likes", "shares", "comments", "watch_seconds")
+
+# Rollups are rewritten at most this often. They are only a checkpoint: raw
+# metric rows and event lines past it are replayed on open (and by every
+# process sharing the directory before it writes), so a crash loses nothing.
+FLUSH_INTERVAL = 5.0
+
+
+@functools.lru_cache(maxsize=65536)
+def _bucket_keys(quarter_hour: int):
+    """Local (day, hour) keys for a 15-minute slot; every UTC offset is a multiple of 15 min"""
+    moment = datetime.fromtimestamp(quarter_hour * 900)
+    return moment.strftime("%Y-%m-%d"), moment.strftime("%Y-%m-%dT%H")
+
+
+def _empty_bucket() -> Dict:
+    bucket = {name: 0 for name in METRICS}
+    bucket["samples"] = 0
+    bucket["events"] = {}
+    return bucket
+
+
+def _complete_lines(path: str, offset: int):
+    """
+    Newline-terminated lines after offset, and the offset past the last one
+    
+    Called with the directory lock held, so an unterminated tail can only be
+    a torn append from a crashed writer; it is cut off.
+    """
+    try:
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(offset + end)
+    except FileNotFoundError:
+        return [], offset
+    lines = data[:end].decode("utf-8").splitlines()
+    return lines, offset + end
+
+
+class AnalyticsStore:
+    def __init__(self, directory: str = "analytics"):
+        """
+        Open (or create) the analytics store
+        
+        Several processes may share one directory: appends and rollup writes
+        happen under a file lock, and each process replays the raw rows the
+        others appended before it writes, so no process overwrites another's
+        counts.
+        
+        Args:
+            directory: Folder holding the column files, video ids, event log and rollups
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._rollup_path = os.path.join(directory, "rollups.json")
+        self._videos_path = os.path.join(directory, "videos.txt")
+        self._events_path = os.path.join(directory, "events.log")
+        self._lock_file = open(os.path.join(directory, ".lock"), "a")
+        
+        self.video_ids: List[str] = []
+        self._video_index: Dict[str, int] = {}
+        self._videos_offset = 0
+        
+        self.daily: Dict[str, Dict] = {}
+        self.hourly: Dict[str, Dict] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self.rows = 0
+        self._events_offset = 0
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        
+        self._files = {name: open(self._column_path(name), "ab") for name, _ in COLUMNS}
+        with self._locked():
+            self._load_rollups()
+            self._sync()
+            if self._dirty:
+                self._write_rollups()
+        atexit.register(self.close)
+    
+    @contextlib.contextmanager
+    def _locked(self):
+        """Thread lock plus an exclusive lock on the directory across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+    
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.col")
+    
+    def _add_video_id(self, publish_id: str) -> int:
+        self._video_index[publish_id] = len(self.video_ids)
+        self.video_ids.append(publish_id)
+        return self._video_index[publish_id]
+    
+    def _load_rollups(self):
+        try:
+            with open(self._rollup_path, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.daily = state.get("daily", {})
+        self.hourly = state.get("hourly", {})
+        self.totals = state.get("totals", {})
+        self.rows = state.get("rows", 0)
+        self._events_offset = state.get("events_offset", 0)
+    
+    def _column_rows(self) -> int:
+        """Complete rows on disk (a torn append leaves some columns longer)"""
+        return min(os.path.getsize(self._column_path(name)) // array(code).itemsize
+                   for name, code in COLUMNS)
+    
+    def _sync(self):
+        """
+        Fold everything appended since this process last looked into the rollups
+        
+        Called with the directory lock held. Picks up video ids, metric rows
+        and events written by other processes (or before a crash), and drops
+        values past the last complete row so appends stay aligned.
+        """
+        lines, self._videos_offset = _complete_lines(self._videos_path, self._videos_offset)
+        for line in lines:
+            self._add_video_id(line)
+        
+        complete = self._column_rows()
+        for name, code in COLUMNS:
+            if os.path.getsize(self._column_path(name)) > complete * array(code).itemsize:
+                self._files[name].truncate(complete * array(code).itemsize)
+        
+        if complete > self.rows:
+            columns = {}
+            for name, code in COLUMNS:
+                values = array(code)
+                with open(self._column_path(name), "rb") as f:
+                    f.seek(self.rows * values.itemsize)
+                    values.fromfile(f, complete - self.rows)
+                columns[name] = values
+            for i in range(complete - self.rows):
+                self._apply(columns["timestamp"][i], self.video_ids[columns["video"][i]],
+                            {name: columns[name][i] for name in METRICS})
+            self.rows = complete
+            self._dirty = True
+        
+        lines, self._events_offset = _complete_lines(self._events_path, self._events_offset)
+        for line in lines:
+            try:
+                timestamp, kind, count = line.split("\t")
+                self._apply_event(float(timestamp), kind, int(count))
+            except ValueError:
+                continue
+            self._dirty = True
+    
+    def _buckets(self, timestamp: float):
+        day_key, hour_key = _bucket_keys(int(timestamp // 900))
+        day = self.daily.get(day_key)
+        if day is None:
+            day = self.daily[day_key] = _empty_bucket()
+        hour = self.hourly.get(hour_key)
+        if hour is None:
+            hour = self.hourly[hour_key] = _empty_bucket()
+        return day, hour
+    
+    def _apply(self, timestamp: float, publish_id: str, deltas: Dict[str, float]):
+        for bucket in self._buckets(timestamp):
+            for name in METRICS:
+                bucket[name] += deltas[name]
+            bucket["samples"] += 1
+        video = self.totals.setdefault(publish_id, {name: 0 for name in METRICS})
+        for name in METRICS:
+            video[name] += deltas[name]
+    
+    def _apply_event(self, timestamp: float, kind: str, count: int):
+        for bucket in self._buckets(timestamp):
+            bucket["events"][kind] = bucket["events"].get(kind, 0) + count
+    
+    def record_many(self, samples: Iterable[Dict], cumulative: bool = True) -> int:
+        """
+        Append metric samples and fold them into the rollups
+        
+        Args:
+            samples: Dicts with publish_id, optional timestamp (epoch or ISO,
+                     default now) and any of views, likes, shares, comments,
+                     watch_seconds
+            cumulative: Samples are lifetime totals per video (as TikTok
+                        reports them); only the growth since the previous
+                        sample is counted. False treats them as increments.
+        
+        Returns:
+            Number of samples stored
+        """
+        parsed = []
+        for sample in samples:
+            timestamp = sample.get("timestamp")
+            if timestamp is None:
+                timestamp = time.time()
+            elif not isinstance(timestamp, (int, float)):
+                timestamp = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).timestamp()
+            values = {name: float(sample.get(name) or 0) if name == "watch_seconds" else int(sample.get(name) or 0)
+                      for name in METRICS}
+            parsed.append((str(sample["publish_id"]), float(timestamp), values))
+        if not parsed:
+            return 0
+        
+        with self._locked():
+            # Deltas must be taken against every process's latest totals
+            self._sync()
+            columns = {name: array(code) for name, code in COLUMNS}
+            new_ids = []
+            for publish_id, timestamp, values in parsed:
+                index = self._video_index.get(publish_id)
+                if index is None:
+                    index = self._add_video_id(publish_id)
+                    new_ids.append(publish_id)
+                
+                previous = self.totals.get(publish_id) if cumulative else None
+                deltas = {}
+                for name in METRICS:
+                    deltas[name] = max(0, values[name] - previous[name]) if previous else values[name]
+                
+                columns["timestamp"].append(timestamp)
+                columns["video"].append(index)
+                for name in METRICS:
+                    columns[name].append(deltas[name])
+                self._apply(timestamp, publish_id, deltas)
+            
+            if new_ids:
+                data = "".join(f"{publish_id}\n" for publish_id in new_ids).encode("utf-8")
+                with open(self._videos_path, "ab") as f:
+                    f.write(data)
+                self._videos_offset += len(data)
+            for name, _ in COLUMNS:
+                columns[name].tofile(self._files[name])
+                self._files[name].flush()
+            self.rows += len(parsed)
+            self._dirty = True
+            self._maybe_write_rollups()
+        return len(parsed)
+    
+    def record(self, publish_id: str, timestamp=None, cumulative: bool = True, **metrics) -> int:
+        """Store one metrics sample for a video; see record_many"""
+        return self.record_many([dict(metrics, publish_id=publish_id, timestamp=timestamp)],
+                                cumulative=cumulative)
+    
+    def import_file(self, path: str, cumulative: bool = True) -> int:
+        """Load a JSONL or CSV metrics export (columns as in record_many)"""
+        with open(path, "r", newline="") as f:
+            if path.lower().endswith(".csv"):
+                samples = list(csv.DictReader(f))
+            else:
+                samples = [json.loads(line) for line in f if line.strip()]
+        return self.record_many(samples, cumulative=cumulative)
+    
+    def record_event(self, kind: str, count: int = 1, timestamp: Optional[float] = None):
+        """Count a pipeline event (ideas, scripts, posts...) in the current hour and day
+        
+        Events are appended to events.log before they reach the rollups, so
+        they survive a crash like metric rows do.
+        """
+        kind = " ".join(kind.split())
+        timestamp = timestamp or time.time()
+        line = f"{timestamp}\t{kind}\t{int(count)}\n".encode("utf-8")
+        with self._locked():
+            self._sync()
+            with open(self._events_path, "ab") as f:
+                f.write(line)
+            self._events_offset += len(line)
+            self._apply_event(timestamp, kind, int(count))
+            self._dirty = True
+            self._maybe_write_rollups()
+    
+    def day(self, date: Optional[str] = None) -> Dict:
+        """Rollup for one day ("YYYY-MM-DD", default today)"""
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        with self._locked():
+            self._sync()
+            bucket = self.daily.get(date)
+            return json.loads(json.dumps(bucket)) if bucket else _empty_bucket()
+    
+    def hour(self, hour: str) -> Dict:
+        """Rollup for one hour ("YYYY-MM-DDTHH")"""
+        with self._locked():
+            self._sync()
+            bucket = self.hourly.get(hour)
+            return json.loads(json.dumps(bucket)) if bucket else _empty_bucket()
+    
+    def days(self, start: str, end: str) -> List[Dict]:
+        """Daily rollups from start to end inclusive, oldest first"""
+        with self._locked():
+            self._sync()
+            return [dict(self.daily[key], date=key) for key in sorted(self.daily)
+                    if start <= key <= end]
+    
+    def video_totals(self, publish_id: str) -> Optional[Dict]:
+        with self._locked():
+            self._sync()
+            totals = self.totals.get(publish_id)
+            return dict(totals) if totals else None
+    
+    def column(self, name: str) -> array:
+        """Load one raw column for ad-hoc analysis"""
+        code = dict(COLUMNS)[name]
+        values = array(code)
+        with open(self._column_path(name), "rb") as f:
+            values.fromfile(f, min(self.rows, os.path.getsize(self._column_path(name)) // values.itemsize))
+        return values
+    
+    def _maybe_write_rollups(self):
+        if self._dirty and time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self._write_rollups()
+    
+    def _write_rollups(self):
+        """Checkpoint the rollups; called with the directory lock held after _sync"""
+        state = {"rows": self.rows, "events_offset": self._events_offset,
+                 "daily": self.daily, "hourly": self.hourly, "totals": self.totals}
+        tmp_path = f"{self._rollup_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self._rollup_path)
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+    
+    def flush(self, force: bool = False):
+        """Persist the rollups if they changed (at most every FLUSH_INTERVAL seconds)"""
+        with self._locked():
+            # Fold in other processes' rows first, so this checkpoint covers them too
+            self._sync()
+            if force and self._dirty:
+                self._write_rollups()
+            else:
+                self._maybe_write_rollups()
+    
+    def close(self):
+        if not self._files:
+            return
+        if self._dirty:
+            self.flush(force=True)
+        for handle in self._files.values():
+            handle.close()
+        self._files = {}
+        self._lock_file.close()
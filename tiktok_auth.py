@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+TikTok Token Lifecycle
+In-memory token cache with proactive refresh, plus a local OAuth callback listener
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class TokenManager:
+    def __init__(self, client_key: str, client_secret: str, token_url: str,
+                 session, token_path: str = "tiktok_tokens.json",
+                 refresh_margin: int = 10 * 60, governor=None,
+                 retry_delay: float = 30, max_retry_delay: float = 15 * 60):
+        """
+        Initialize the token manager
+        
+        Args:
+            client_key: TikTok App Client Key
+            client_secret: TikTok App Client Secret
+            token_url: OAuth token endpoint
+            session: requests session used for refresh calls
+            token_path: File the tokens are persisted to
+            refresh_margin: Seconds before expiry at which tokens are refreshed
+                            (at most half the token's lifetime)
+            governor: Optional RateGovernor the refresh call is sent through
+            retry_delay: Seconds before a failed refresh is retried (doubles per failure)
+            max_retry_delay: Cap on the delay between refresh retries
+        """
+        self.client_key = client_key
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.session = session
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+        self.governor = governor
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        
+        # Set after a failed refresh: no caller retries before _retry_at
+        self.refresh_error: Optional[str] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        
+        self._tokens: Dict = {}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+    
+    @property
+    def open_id(self) -> Optional[str]:
+        return self._tokens.get("open_id")
+    
+    @property
+    def has_tokens(self) -> bool:
+        return bool(self._tokens.get("access_token"))
+    
+    def load(self) -> bool:
+        """Load persisted tokens into memory; returns True if any were found"""
+        try:
+            with open(self.token_path, "r") as f:
+                token_data = json.load(f)
+        except FileNotFoundError:
+            return False
+        
+        # Files written before expiry tracking only have the relative lifetime
+        if "expires_at" not in token_data and "expires_in" in token_data:
+            saved_at = token_data.get("saved_at", 0)
+            token_data["expires_at"] = saved_at + token_data["expires_in"]
+        
+        self._tokens = token_data
+        return self.has_tokens
+    
+    def set_tokens(self, token_data: Dict):
+        """Store a fresh token response in memory and on disk"""
+        now = time.time()
+        token_data = dict(token_data)
+        token_data["saved_at"] = now
+        if "expires_in" in token_data:
+            token_data["expires_at"] = now + token_data["expires_in"]
+        if "refresh_expires_in" in token_data:
+            token_data["refresh_expires_at"] = now + token_data["refresh_expires_in"]
+        
+        self._tokens = token_data
+        with open(self.token_path, "w") as f:
+            json.dump(token_data, f, indent=2)
+    
+    def _refresh_at(self) -> Optional[float]:
+        """When the token is due for refresh; short-lived tokens refresh at half-life"""
+        expires_at = self._tokens.get("expires_at")
+        if expires_at is None:
+            return None
+        saved_at = self._tokens.get("saved_at")
+        if saved_at is None:
+            return expires_at - self.refresh_margin
+        return expires_at - min(self.refresh_margin, max(0, expires_at - saved_at) / 2)
+    
+    def _needs_refresh(self) -> bool:
+        refresh_at = self._refresh_at()
+        return refresh_at is not None and time.time() >= refresh_at
+    
+    def _expired(self) -> bool:
+        expires_at = self._tokens.get("expires_at")
+        return expires_at is not None and time.time() >= expires_at
+    
+    def get_access_token(self) -> Optional[str]:
+        """
+        Return a valid access token, refreshing it first if it is about to expire
+        
+        Concurrent callers that hit an expiring token wait on a single
+        refresh request instead of each sending their own. After a failed
+        refresh nobody retries until the backoff has passed; meanwhile an
+        already expired token is not handed out (None is returned and
+        refresh_error says why).
+        """
+        if not self._needs_refresh():
+            return self._tokens.get("access_token")
+        
+        if time.time() >= self._retry_at:
+            with self._refresh_lock:
+                # Another thread may have refreshed (or failed to) while we waited
+                if self._needs_refresh() and time.time() >= self._retry_at:
+                    self.refresh()
+        
+        if self._expired():
+            return None
+        return self._tokens.get("access_token")
+    
+    def refresh(self) -> bool:
+        """Exchange the refresh token for a new access token"""
+        refresh_token = self._tokens.get("refresh_token")
+        if not refresh_token:
+            self._refresh_failed("no refresh token")
+            return False
+        
+        data = {
+            "client_key": self.client_key,
+            "client_secret": self.client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token
+        }
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Cache-Control": "no-cache"
+        }
+        
+        try:
+            if self.governor is not None:
+                response = self.governor.call("oauth_token", self._post, data, headers,
+                                              host=urlparse(self.token_url).netloc)
+            else:
+                response = self._post(data, headers)
+            token_data = response.json()
+            token_data = token_data.get("data", token_data)
+            
+            if not token_data.get("access_token"):
+                self._refresh_failed(str(token_data))
+                return False
+            
+            self.set_tokens(token_data)
+            self.refresh_error = None
+            self._failures = 0
+            self._retry_at = 0.0
+            print("🔄 Access token refreshed")
+            return True
+            
+        except Exception as e:
+            self._refresh_failed(str(e))
+            return False
+    
+    def _refresh_failed(self, error: str):
+        self._failures += 1
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self._failures - 1))
+        self._retry_at = time.time() + delay
+        self.refresh_error = error
+        print(f"❌ Token refresh failed: {error} (retrying in {delay:.0f}s)")
+    
+    def _post(self, data: Dict, headers: Dict):
+        response = self.session.post(self.token_url, data=data, headers=headers)
+        response.raise_for_status()
+        return response
+    
+    def start_auto_refresh(self):
+        """Refresh in the background ahead of expiry so callers never wait on it"""
+        if self._refresher is not None:
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._refresher.start()
+    
+    def stop_auto_refresh(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+    
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            refresh_at = self._refresh_at()
+            if refresh_at is None:
+                delay = 60
+            else:
+                # Never earlier than the backoff after a failed refresh allows
+                delay = max(refresh_at, self._retry_at) - time.time()
+            
+            if delay > 0:
+                if self._stop.wait(min(delay, 60 * 60)):
+                    return
+                continue
+            
+            with self._refresh_lock:
+                if self._needs_refresh() and not self.refresh():
+                    # Back off instead of hammering the token endpoint
+                    if self._stop.wait(max(60, self._retry_at - time.time())):
+                        return
+
+
+class OAuthCallbackServer:
+    def __init__(self, redirect_uri: str, expected_state: Optional[str] = None):
+        """
+        Local HTTP listener that captures the OAuth redirect
+        
+        Args:
+            redirect_uri: Registered redirect URI, e.g. http://localhost:8000/callback
+            expected_state: OAuth state the callback must carry
+        """
+        parsed = urlparse(redirect_uri)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/"
+        self.expected_state = expected_state
+        
+        self.code = None
+        self.error = None
+        self._received = threading.Event()
+        self._server = HTTPServer((self.host, self.port), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    def _handler_class(self):
+        listener = self
+        
+        class CallbackHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != listener.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                query = parse_qs(url.query)
+                state = query.get("state", [None])[0]
+                if listener.expected_state and state != listener.expected_state:
+                    listener.error = "state mismatch"
+                elif "code" in query:
+                    listener.code = query["code"][0]
+                else:
+                    listener.error = query.get("error", ["no code in callback"])[0]
+                
+                message = ("Authorization complete. You can close this window."
+                           if listener.code else f"Authorization failed: {listener.error}")
+                body = message.encode("utf-8")
+                self.send_response(200 if listener.code else 400)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                listener._received.set()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return CallbackHandler
+    
+    def start(self):
+        self._thread.start()
+    
+    def wait_for_code(self, timeout: float = 300) -> Optional[str]:
+        """Block until the redirect arrives (or timeout) and return the code"""
+        self._received.wait(timeout)
+        self.stop()
+        return self.code
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
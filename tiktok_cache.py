@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+Persists Gemini responses on disk so identical prompts skip the API call
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    def __init__(self, path: str = "llm_cache.db",
+                 ttl_seconds: int = 24 * 60 * 60,
+                 max_entries: int = 5000):
+        """
+        Initialize the SQLite-backed response cache
+        
+        Args:
+            path: SQLite database file
+            ttl_seconds: Default lifetime of a cached response
+            max_entries: Least recently used entries beyond this are evicted
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """Cache key: model name plus a SHA-256 of the prompt"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+    
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """Return the cached response, or None on a miss or expired entry"""
+        key = self.make_key(model_name, prompt)
+        now = time.time()
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+    
+    def set(self, model_name: str, prompt: str, response: str,
+            ttl_seconds: Optional[int] = None):
+        """Store a response and evict least recently used entries over the limit"""
+        key = self.make_key(model_name, prompt)
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now + ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones over max_entries"""
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+    
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
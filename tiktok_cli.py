@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+TikTok AI Agent CLI
+Single entry point with one subcommand per task; heavy SDKs load only when a command needs them
+
+Usage:
+    python tiktok_cli.py ideas [-n 5] [--stream] [--fresh]
+    python tiktok_cli.py script [IDEA_ID ...]
+    python tiktok_cli.py schedule [--days 7] [--posts-per-day 2]
+    python tiktok_cli.py check VIDEO_OR_DIR [...]
+    python tiktok_cli.py upload VIDEO --title TITLE
+    python tiktok_cli.py enqueue VIDEO --title TITLE [--jobs-db upload_jobs.db]
+    python tiktok_cli.py worker [--jobs-db upload_jobs.db] [--max-jobs N]
+    python tiktok_cli.py status PUBLISH_ID
+    python tiktok_cli.py report
+    python tiktok_cli.py analytics [--import metrics.csv] [--days 7]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+def _agent(args, needs_gemini: bool = False):
+    from tiktok_agent import TikTokAIAgent
+    
+    api_key = os.getenv('GEMINI_API_KEY')
+    if needs_gemini and not api_key:
+        print("\n❌ Error: GEMINI_API_KEY environment variable not set")
+        print("Please set it using: export GEMINI_API_KEY='your-key-here'")
+        sys.exit(1)
+    return TikTokAIAgent(api_key, args.config, store_path=args.store,
+                         use_cache=not getattr(args, "fresh", False))
+
+
+def _video_length(args):
+    try:
+        with open(args.config, 'r') as f:
+            return json.load(f).get("content_strategy", {}).get("video_length")
+    except (OSError, ValueError):
+        return None
+
+
+def _uploader(args):
+    from tiktok_uploader import TikTokUploader
+    
+    client_key = os.getenv('TIKTOK_CLIENT_KEY')
+    client_secret = os.getenv('TIKTOK_CLIENT_SECRET')
+    if not client_key or not client_secret:
+        print("\n❌ Missing TikTok API credentials!")
+        print("export TIKTOK_CLIENT_KEY='your-client-key'")
+        print("export TIKTOK_CLIENT_SECRET='your-client-secret'")
+        sys.exit(1)
+    
+    uploader = TikTokUploader(client_key, client_secret, token_path=args.tokens,
+                              video_length=_video_length(args))
+    if not uploader.load_tokens() and not uploader.authorize():
+        print("❌ Authorization failed. Exiting.")
+        sys.exit(1)
+    return uploader
+
+
+def cmd_ideas(args):
+    agent = _agent(args, needs_gemini=True)
+    agent.research_trends()
+    if args.stream:
+        for idea in agent.stream_content_ideas(num_ideas=args.num):
+            print(f"   • {idea['hook']}")
+    else:
+        for idea in agent.generate_content_ideas(num_ideas=args.num):
+            print(f"   • {idea['hook']}")
+    agent.save_content_calendar(snapshot=False)
+
+
+def cmd_script(args):
+    agent = _agent(args, needs_gemini=True)
+    if agent.store is None:
+        print("❌ The script command needs a content store")
+        sys.exit(1)
+    
+    if args.idea_ids:
+        ideas = [idea for idea in map(agent.store.get_idea, args.idea_ids) if idea]
+    else:
+        ideas = agent.store.ideas_without_scripts(limit=args.limit)
+    if not ideas:
+        print("⚠️  No ideas to script")
+        return
+    
+    agent.research_trends()
+    for script in agent.create_video_scripts(ideas, max_workers=args.workers):
+        if "error" in script:
+            print(f"   ❌ {script['idea_id']}: {script['error']}")
+
+
+def cmd_schedule(args):
+    agent = _agent(args)
+    posts_per_day = args.posts_per_day or agent.config.get("content_strategy", {}).get("posts_per_day", 2)
+    schedule = agent.generate_posting_schedule(days=args.days, posts_per_day=posts_per_day)
+    for slot in schedule:
+        print(f"   • {slot['scheduled_time']}  {slot['time_label']}")
+    agent.save_content_calendar(snapshot=False)
+
+
+def cmd_check(args):
+    from tiktok_mp4 import check_video, scan_directory
+    
+    video_length = args.video_length or _video_length(args)
+    failed = 0
+    for path in args.paths:
+        if os.path.isdir(path):
+            reports = scan_directory(path, video_length, max_workers=args.workers)
+        else:
+            reports = [check_video(path, video_length)]
+        for report in reports:
+            name = os.path.basename(report["path"])
+            if report["ok"]:
+                print(f"✅ {name}: {report['duration']:.1f}s "
+                      f"{report['width']}x{report['height']} {report['video_codec']}")
+            else:
+                failed += 1
+                print(f"❌ {name}: {'; '.join(report['problems'])}")
+    if failed:
+        sys.exit(1)
+
+
+def cmd_upload(args):
+    uploader = _uploader(args)
+    result = uploader.upload_video(args.video, args.title, description=args.description,
+                                   privacy_level=args.privacy)
+    if result is None:
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+
+def cmd_enqueue(args):
+    from tiktok_jobs import JobQueue
+    
+    jobs = JobQueue(args.jobs_db)
+    options = {"description": args.description, "privacy_level": args.privacy}
+    job_id = jobs.enqueue(args.video, args.title, key=args.key, options=options)
+    print(f"📥 Upload job {job_id} queued in {args.jobs_db} {jobs.stats()}")
+    jobs.close()
+
+
+def cmd_worker(args):
+    from tiktok_jobs import JobQueue, UploadWorker
+    
+    uploader = _uploader(args)
+    jobs = JobQueue(args.jobs_db, lease_seconds=args.lease)
+    worker = UploadWorker(jobs, uploader)
+    try:
+        handled = worker.run(max_jobs=args.max_jobs)
+        print(f"👷 Handled {handled} upload jobs {jobs.stats()}")
+    except KeyboardInterrupt:
+        worker.stop()
+    finally:
+        jobs.close()
+
+
+def cmd_status(args):
+    uploader = _uploader(args)
+    status = uploader.check_upload_status(args.publish_id)
+    if status is None:
+        sys.exit(1)
+    print(json.dumps(status, indent=2))
+
+
+def cmd_report(args):
+    agent = _agent(args)
+    agent.research_trends()
+    agent.load_from_store()
+    print(agent.generate_daily_report())
+
+
+def cmd_analytics(args):
+    from datetime import datetime, timedelta
+    from tiktok_analytics import AnalyticsStore
+    
+    analytics = AnalyticsStore(args.analytics_dir)
+    if args.import_path:
+        count = analytics.import_file(args.import_path, cumulative=not args.increments)
+        print(f"📥 Imported {count} metric samples from {args.import_path}")
+    
+    end = datetime.now()
+    start = end - timedelta(days=args.days - 1)
+    for day in analytics.days(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")):
+        events = day["events"]
+        print(f"{day['date']}  views {day['views']:>9,}  likes {day['likes']:>7,}  "
+              f"shares {day['shares']:>6,}  posts {events.get('posts', 0):>2}  "
+              f"scripts {events.get('scripts', 0):>2}")
+    analytics.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tiktok_cli.py", description="TikTok AI Agent")
+    parser.add_argument("--config", default="config.json", help="account config file")
+    parser.add_argument("--store", default="content_store.db", help="content store database")
+    parser.add_argument("--tokens", default="tiktok_tokens.json", help="TikTok token file")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="write Prometheus-format stage metrics to PATH on exit")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    
+    ideas = subcommands.add_parser("ideas", help="generate content ideas with Gemini")
+    ideas.add_argument("-n", "--num", type=int, default=5, help="number of ideas")
+    ideas.add_argument("--stream", action="store_true", help="print ideas as they stream in")
+    ideas.add_argument("--fresh", action="store_true", help="bypass the response cache")
+    ideas.set_defaults(func=cmd_ideas)
+    
+    script = subcommands.add_parser("script", help="write scripts for stored ideas")
+    script.add_argument("idea_ids", nargs="*", help="ideas to script (default: all pending)")
+    script.add_argument("--limit", type=int, default=20, help="max pending ideas to script")
+    script.add_argument("--workers", type=int, default=8, help="parallel Gemini calls")
+    script.add_argument("--fresh", action="store_true", help="bypass the response cache")
+    script.set_defaults(func=cmd_script)
+    
+    schedule = subcommands.add_parser("schedule", help="plan posting slots")
+    schedule.add_argument("--days", type=int, default=7)
+    schedule.add_argument("--posts-per-day", type=int)
+    schedule.set_defaults(func=cmd_schedule)
+    
+    check = subcommands.add_parser("check", help="pre-flight check videos before upload")
+    check.add_argument("paths", nargs="+", help="video files or directories of videos")
+    check.add_argument("--video-length", help='allowed duration range, e.g. "15-60" '
+                                              '(default: from config)')
+    check.add_argument("--workers", type=int, default=8, help="files inspected in parallel")
+    check.set_defaults(func=cmd_check)
+    
+    upload = subcommands.add_parser("upload", help="upload a video to TikTok")
+    upload.add_argument("video", help="path to the MP4 file")
+    upload.add_argument("--title", required=True, help="caption with hashtags")
+    upload.add_argument("--description", default="")
+    upload.add_argument("--privacy", default="PUBLIC_TO_EVERYONE")
+    upload.set_defaults(func=cmd_upload)
+    
+    enqueue = subcommands.add_parser("enqueue", help="queue a video for upload workers")
+    enqueue.add_argument("video", help="path to the MP4 file")
+    enqueue.add_argument("--title", required=True, help="caption with hashtags")
+    enqueue.add_argument("--description", default="")
+    enqueue.add_argument("--privacy", default="PUBLIC_TO_EVERYONE")
+    enqueue.add_argument("--key", help="idempotency key (default: the video path)")
+    enqueue.add_argument("--jobs-db", default="upload_jobs.db")
+    enqueue.set_defaults(func=cmd_enqueue)
+    
+    worker = subcommands.add_parser("worker", help="claim and upload queued jobs")
+    worker.add_argument("--jobs-db", default="upload_jobs.db")
+    worker.add_argument("--max-jobs", type=int, help="exit after this many jobs")
+    worker.add_argument("--lease", type=float, default=300, help="lease length in seconds")
+    worker.set_defaults(func=cmd_worker)
+    
+    status = subcommands.add_parser("status", help="check an upload's publish status")
+    status.add_argument("publish_id")
+    status.set_defaults(func=cmd_status)
+    
+    report = subcommands.add_parser("report", help="print the daily report")
+    report.set_defaults(func=cmd_report)
+    
+    analytics = subcommands.add_parser("analytics", help="import video metrics and show daily rollups")
+    analytics.add_argument("--import", dest="import_path", metavar="FILE",
+                           help="CSV/JSONL export with publish_id, timestamp, views, likes, ...")
+    analytics.add_argument("--increments", action="store_true",
+                           help="imported values are increments, not lifetime totals")
+    analytics.add_argument("--days", type=int, default=7, help="days of rollups to show")
+    analytics.add_argument("--analytics-dir", default="analytics")
+    analytics.set_defaults(func=cmd_analytics)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    if args.metrics_file:
+        import tiktok_metrics as metrics
+        metrics.enable()
+    try:
+        args.func(args)
+    finally:
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Idea Deduplication Index
+MinHash/LSH index over past ideas so near-duplicate hooks are caught early
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# History entries from other signature schemes are not comparable and are skipped
+SIGNATURE_VERSION = 2
+
+
+class IdeaDedupIndex:
+    def __init__(self, path: str = "idea_history.jsonl",
+                 num_perm: int = 64, bands: int = 16,
+                 threshold: float = 0.6, shingle_size: int = 5):
+        """
+        Initialize the dedup index, loading any history saved at path
+        
+        Args:
+            path: Append-only JSONL file holding past idea signatures
+            num_perm: MinHash permutations per signature
+            bands: LSH bands (num_perm must divide evenly)
+            threshold: Estimated Jaccard similarity at which ideas count as duplicates
+            shingle_size: Character shingle length over the normalized text
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        
+        self._signatures: Dict[str, List[int]] = {}
+        self._known_hashes = set()
+        # Screened but not yet recorded ideas: id -> (signature, content hash)
+        self._pending: Dict[str, tuple] = {}
+        self._buckets: List[Dict[tuple, List[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self._load()
+    
+    def __len__(self) -> int:
+        return len(self._signatures)
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                signature = entry.get("sig")
+                if entry.get("v") != SIGNATURE_VERSION:
+                    continue
+                if entry.get("id") and isinstance(signature, list) and len(signature) == self.num_perm:
+                    self._insert(entry["id"], signature, entry.get("hash"))
+    
+    @staticmethod
+    def idea_text(idea: Dict) -> str:
+        """Text that identifies an idea: its hook plus caption"""
+        return f"{idea.get('hook', '')} {idea.get('caption', '')}"
+    
+    @classmethod
+    def content_hash(cls, idea: Dict) -> str:
+        """Exact-content key, so an idea screened twice before it is saved is not its own duplicate"""
+        normalized = " ".join(re.findall(r"[a-z0-9]+", cls.idea_text(idea).lower()))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+    
+    def _shingles(self, text: str) -> set:
+        normalized = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+        size = self.shingle_size
+        if len(normalized) <= size:
+            return {normalized}
+        return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+    
+    def signature(self, text: str) -> List[int]:
+        """MinHash signature of a piece of text
+        
+        One SHAKE-128 digest per shingle supplies all num_perm 32-bit hash
+        values at once, and the per-position minimum is taken in C by
+        zip/min, which keeps a signature well under a millisecond.
+        """
+        width = 4 * self.num_perm
+        rows = [array("I", hashlib.shake_128(s.encode("utf-8")).digest(width))
+                for s in self._shingles(text)]
+        return list(map(min, zip(*rows)))
+    
+    def _band_keys(self, signature: List[int]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+    
+    def _insert(self, idea_id: str, signature: List[int], content_hash: Optional[str] = None):
+        self._signatures[idea_id] = signature
+        if content_hash:
+            self._known_hashes.add(content_hash)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(idea_id)
+    
+    def _similarity(self, a: List[int], b: List[int]) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+    
+    def find_duplicate(self, idea: Dict, signature: Optional[List[int]] = None,
+                       content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        Look for a recorded or screened idea that is a near duplicate
+        
+        Only ideas sharing at least one LSH band are compared, so the cost
+        does not grow with the size of the history. Matches against the same
+        idea ID, or against identical content screened earlier in this run
+        but not yet recorded, are ignored; identical content already in the
+        history is a duplicate.
+        
+        Returns:
+            ID of the matching idea, or None
+        """
+        if signature is None:
+            signature = self.signature(self.idea_text(idea))
+        if content_hash is None:
+            content_hash = self.content_hash(idea)
+        
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(key, ()))
+            
+            for candidate in candidates:
+                if candidate == idea.get("id"):
+                    continue
+                pending = self._pending.get(candidate)
+                if pending is not None and pending[1] == content_hash:
+                    continue
+                if self._similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    return candidate
+        return None
+    
+    def check(self, idea: Dict) -> Optional[str]:
+        """
+        Screen an idea, returning the ID of the idea it duplicates
+        
+        A unique idea is held in memory so later ideas in the same run are
+        screened against it, but it only reaches the history file once
+        record() is called for it.
+        """
+        signature = self.signature(self.idea_text(idea))
+        content_hash = self.content_hash(idea)
+        duplicate = self.find_duplicate(idea, signature, content_hash)
+        if duplicate is None:
+            with self._lock:
+                if idea["id"] not in self._signatures and content_hash not in self._known_hashes:
+                    self._insert(idea["id"], signature, content_hash)
+                    self._pending[idea["id"]] = (signature, content_hash)
+        return duplicate
+    
+    def record(self, ideas: Iterable[Dict]):
+        """Persist accepted ideas to the history; unscreened ones are signed here"""
+        lines = []
+        with self._lock:
+            for idea in ideas:
+                idea_id = idea["id"]
+                if idea_id in self._pending:
+                    signature, content_hash = self._pending.pop(idea_id)
+                elif idea_id in self._signatures:
+                    continue
+                else:
+                    content_hash = self.content_hash(idea)
+                    if content_hash in self._known_hashes:
+                        continue
+                    signature = self.signature(self.idea_text(idea))
+                    self._insert(idea_id, signature, content_hash)
+                lines.append(json.dumps({"v": SIGNATURE_VERSION, "id": idea_id,
+                                         "sig": signature, "hash": content_hash}) + "\n")
+            if lines:
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+    
+    def add(self, idea: Dict):
+        """Record one idea in the index and persist it"""
+        self.record([idea])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Hashtag Index
+Weighted hashtag sampling with per-category quotas, built once per trend refresh
+"""
+
+import math
+import random
+from typing import Dict, Iterable, List, Optional
+
+# Categories whose tags are broad reach tags (#fyp, #viral...); a post
+# never needs more than one of them.
+DEFAULT_QUOTAS = {"general_viral": 1}
+
+
+class HashtagIndex:
+    def __init__(self, trending: Dict[str, List[str]],
+                 weights: Optional[Dict[str, float]] = None,
+                 quotas: Optional[Dict[str, int]] = None,
+                 rank_decay: float = 0.85):
+        """
+        Build the index
+        
+        Args:
+            trending: Category name -> hashtags, most trending first
+            weights: Explicit trend weight per tag; tags without one are
+                     weighted by their rank within their category
+            quotas: Max tags per category in one draw (defaults to one generic tag)
+            rank_decay: Weight multiplier per rank step when weights are missing
+        """
+        weights = weights or {}
+        self.quotas = dict(DEFAULT_QUOTAS if quotas is None else quotas)
+        
+        self.tags: List[str] = []
+        self.weights: List[float] = []
+        self.categories: List[frozenset] = []
+        positions: Dict[str, int] = {}
+        
+        for category, tags in trending.items():
+            for rank, tag in enumerate(tags):
+                if tag in positions:
+                    i = positions[tag]
+                    self.categories[i] = self.categories[i] | {category}
+                    continue
+                positions[tag] = len(self.tags)
+                self.tags.append(tag)
+                self.weights.append(float(weights.get(tag, rank_decay ** rank)))
+                self.categories.append(frozenset([category]))
+        
+        self._positions = positions
+        self._build_alias_table()
+    
+    def __len__(self) -> int:
+        return len(self.tags)
+    
+    def _build_alias_table(self):
+        """Vose's alias method: one uniform draw picks a tag in O(1)"""
+        n = len(self.weights)
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+        total = sum(self.weights)
+        if not n or total <= 0:
+            return
+        
+        scaled = [w * n / total for w in self.weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self._prob[i] = 1.0
+    
+    def _draw(self, rng: random.Random) -> int:
+        i = rng.randrange(len(self.tags))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+    
+    def sample(self, count: int = 5,
+               exclude: Optional[Iterable[str]] = None,
+               quotas: Optional[Dict[str, int]] = None,
+               rng: Optional[random.Random] = None) -> List[str]:
+        """
+        Draw up to count distinct tags, weighted by trend strength
+        
+        Args:
+            count: Number of tags wanted
+            exclude: Tags that must not be picked
+            quotas: Per-category caps for this draw (defaults to the index quotas)
+            rng: Random source (defaults to the random module)
+        """
+        rng = rng or random
+        quotas = self.quotas if quotas is None else quotas
+        excluded = {self._positions[t] for t in (exclude or ()) if t in self._positions}
+        
+        chosen: List[int] = []
+        taken = set(excluded)
+        used: Dict[str, int] = {}
+        
+        # Alias draws with rejection are O(1) each; if quotas or exclusions
+        # reject too often, finish with one exact weighted pass.
+        attempts = 0
+        while len(chosen) < count and len(taken) < len(self.tags) and attempts < 4 * count:
+            attempts += 1
+            i = self._draw(rng)
+            if i in taken:
+                continue
+            if self._accept(i, quotas, used):
+                chosen.append(i)
+            taken.add(i)
+        
+        if len(chosen) < count:
+            chosen.extend(self._weighted_fill(count - len(chosen), taken, quotas, used, rng))
+        
+        return [self.tags[i] for i in chosen]
+    
+    def sample_many(self, n: int, count: int = 5,
+                    exclude: Optional[Iterable[str]] = None,
+                    quotas: Optional[Dict[str, int]] = None,
+                    rng: Optional[random.Random] = None) -> List[List[str]]:
+        """Draw tag sets for n ideas in one call"""
+        rng = rng or random
+        exclude = list(exclude or ())
+        return [self.sample(count, exclude, quotas, rng) for _ in range(n)]
+    
+    def _accept(self, i: int, quotas: Dict[str, int], used: Dict[str, int]) -> bool:
+        """Take tag i if none of its categories is at quota"""
+        for category in self.categories[i]:
+            if category in quotas and used.get(category, 0) >= quotas[category]:
+                return False
+        for category in self.categories[i]:
+            used[category] = used.get(category, 0) + 1
+        return True
+    
+    def _weighted_fill(self, needed: int, taken: set, quotas: Dict[str, int],
+                       used: Dict[str, int], rng: random.Random) -> List[int]:
+        """Weighted sampling without replacement via exponential keys (Efraimidis-Spirakis)"""
+        keyed = []
+        for i, weight in enumerate(self.weights):
+            if i in taken or weight <= 0:
+                continue
+            keyed.append((math.log(1.0 - rng.random()) / weight, i))
+        keyed.sort(reverse=True)
+        
+        picked = []
+        for _, i in keyed:
+            if len(picked) == needed:
+                break
+            if self._accept(i, quotas, used):
+                picked.append(i)
+        return picked
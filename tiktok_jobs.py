@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Upload Job Queue
+Durable SQLite (WAL) queue of uploads that workers in any number of
+processes claim with time-limited leases, so a crashed run resumes cleanly
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_key TEXT NOT NULL UNIQUE,
+    video_path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    idea_id TEXT,
+    slot_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    publish_id TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON upload_jobs (available_at)
+    WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_leases ON upload_jobs (lease_expires)
+    WHERE status IN ('leased', 'initialized');
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON upload_jobs (status);
+"""
+
+# Job states: queued -> leased -> initialized (publish_id known) -> done | failed
+ACTIVE_STATES = ("leased", "initialized")
+
+# TikTok publish states meaning an earlier attempt's bytes all arrived
+LANDED_STATES = ("PROCESSING_DOWNLOAD", "SEND_TO_USER_INBOX", "PUBLISH_COMPLETE")
+
+
+def default_owner() -> str:
+    """Lease owner name unique to this host, process and thread"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class JobQueue:
+    def __init__(self, path: str = "upload_jobs.db", lease_seconds: float = 300,
+                 max_attempts: int = 5, retry_delay: float = 60):
+        """
+        Open (or create) the queue
+        
+        Args:
+            path: SQLite database shared by every worker process
+            lease_seconds: How long a claim lasts without a heartbeat
+            max_attempts: Claims per job before it is marked failed
+            retry_delay: Seconds before a failed attempt is retried (doubles per attempt)
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+    
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+    
+    def enqueue(self, video_path: str, title: str, key: Optional[str] = None,
+                options: Optional[Dict] = None, idea_id: Optional[str] = None,
+                slot_id: Optional[int] = None, available_at: Optional[float] = None) -> int:
+        """
+        Add an upload job; enqueueing the same key again is a no-op
+        
+        Args:
+            video_path: File to upload
+            title: Caption with hashtags
+            key: Idempotency key (defaults to the slot, else the video path)
+            options: Extra upload_video() keyword arguments
+            idea_id: Idea the video belongs to
+            slot_id: Schedule slot the upload fills
+            available_at: Epoch seconds before which the job is not claimed
+        
+        Returns:
+            The job's ID (the existing one if the key was already queued)
+        """
+        key = key or (f"slot:{slot_id}" if slot_id is not None else f"video:{os.path.abspath(video_path)}")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO upload_jobs "
+                "(job_key, video_path, title, options, idea_id, slot_id, available_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, video_path, title, json.dumps(options or {}), idea_id, slot_id,
+                 available_at or now, now, now))
+            row = self._conn.execute("SELECT job_id FROM upload_jobs WHERE job_key = ?",
+                                     (key,)).fetchone()
+        return row["job_id"]
+    
+    def claim(self, owner: str, limit: int = 1) -> List[Dict]:
+        """
+        Lease up to limit jobs: ready queued jobs first, then jobs whose
+        previous lease expired (a worker died mid-upload)
+        
+        The select and update run in one IMMEDIATE transaction, so two
+        workers never lease the same job. A job whose lease expired after
+        max_attempts claims (its worker keeps crashing) is marked failed
+        instead of being leased again.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id FROM upload_jobs "
+                    "WHERE status = 'queued' AND available_at <= ? "
+                    "ORDER BY available_at LIMIT ?", (now, limit)).fetchall()
+                job_ids = [row["job_id"] for row in rows]
+                if len(job_ids) < limit:
+                    rows = self._conn.execute(
+                        "SELECT job_id, attempts FROM upload_jobs "
+                        "WHERE status IN ('leased', 'initialized') AND lease_expires < ? "
+                        "ORDER BY lease_expires LIMIT ?", (now, limit - len(job_ids))).fetchall()
+                    for row in rows:
+                        if row["attempts"] < self.max_attempts:
+                            job_ids.append(row["job_id"])
+                            continue
+                        self._conn.execute(
+                            "UPDATE upload_jobs SET status = 'failed', error = ?, "
+                            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                            "WHERE job_id = ?",
+                            (f"lease expired after {row['attempts']} attempts", now, row["job_id"]))
+                
+                claimed = []
+                for job_id in job_ids:
+                    # Expired 'initialized' jobs keep their state and publish_id so
+                    # the next worker checks that upload before starting another
+                    row = self._conn.execute(
+                        "UPDATE upload_jobs SET "
+                        "status = CASE status WHEN 'queued' THEN 'leased' ELSE status END, "
+                        "lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE job_id = ? RETURNING *",
+                        (owner, now + self.lease_seconds, now, job_id)).fetchone()
+                    claimed.append(self._job(row))
+                self._conn.execute("COMMIT")
+                return claimed
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def _update_leased(self, job_id: int, owner: str, sql: str, params=()) -> bool:
+        """Run an UPDATE only while owner still holds the job's lease"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE upload_jobs SET {sql}, updated_at = ? "
+                f"WHERE job_id = ? AND lease_owner = ? AND status IN ('leased', 'initialized')",
+                (*params, time.time(), job_id, owner))
+        return cursor.rowcount == 1
+    
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """Extend the lease; False means it was lost to another worker"""
+        return self._update_leased(job_id, owner, "lease_expires = ?",
+                                   (time.time() + self.lease_seconds,))
+    
+    def mark_initialized(self, job_id: int, owner: str, publish_id: str) -> bool:
+        """Record the publish_id as soon as init succeeds, before any bytes are sent"""
+        return self._update_leased(job_id, owner, "status = 'initialized', publish_id = ?",
+                                   (publish_id,))
+    
+    def complete(self, job_id: int, owner: str, result: Dict) -> bool:
+        return self._update_leased(
+            job_id, owner,
+            "status = 'done', publish_id = ?, result = ?, error = NULL, "
+            "lease_owner = NULL, lease_expires = NULL",
+            (result.get("publish_id"), json.dumps(result)))
+    
+    def fail(self, job_id: int, owner: str, error: str, attempts: int, retry: bool = True) -> bool:
+        """
+        Give up the lease after a failed attempt
+        
+        The job is requeued with exponential backoff until max_attempts,
+        then marked failed. A failed attempt forgets its publish_id, since
+        that upload will never complete.
+        """
+        if retry and attempts < self.max_attempts:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            return self._update_leased(
+                job_id, owner,
+                "status = 'queued', publish_id = NULL, error = ?, available_at = ?, "
+                "lease_owner = NULL, lease_expires = NULL",
+                (error, time.time() + delay))
+        return self._update_leased(
+            job_id, owner,
+            "status = 'failed', error = ?, lease_owner = NULL, lease_expires = NULL",
+            (error,))
+    
+    def recheck(self, job_id: int, owner: str, error: str, attempts: int) -> bool:
+        """
+        Give up the lease on an initialized job whose upload's fate is unknown
+        
+        The job keeps its state and publish_id, so whoever claims it after
+        the backoff checks that upload again rather than starting another.
+        """
+        if attempts >= self.max_attempts:
+            return self.fail(job_id, owner, error, attempts, retry=False)
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        return self._update_leased(job_id, owner,
+                                   "error = ?, lease_owner = NULL, lease_expires = ?",
+                                   (error, time.time() + delay))
+    
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM upload_jobs WHERE job_id = ?",
+                                     (job_id,)).fetchone()
+        return self._job(row) if row else None
+    
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM upload_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class UploadWorker:
+    def __init__(self, jobs: JobQueue, uploader, owner: Optional[str] = None,
+                 agent=None, store=None, poller=None, poll_interval: float = 2.0):
+        """
+        Claims jobs and uploads them, heartbeating while each upload runs
+        
+        Args:
+            jobs: Queue shared with other workers (any process or host on the same file)
+            uploader: TikTokUploader used for the uploads
+            owner: Lease owner name (defaults to host:pid:thread)
+            agent: TikTokAIAgent whose analytics count each post (optional)
+            store: ContentStore updated with results (optional)
+            poller: StatusPoller that follows each upload to completion (optional)
+            poll_interval: Seconds to wait when no job is ready
+        """
+        self.jobs = jobs
+        self.uploader = uploader
+        self.owner = owner
+        self.agent = agent
+        self.store = store
+        self.poller = poller
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def run(self, max_jobs: Optional[int] = None) -> int:
+        """Process jobs until stopped (or max_jobs were handled); returns jobs handled"""
+        owner = self.owner or default_owner()
+        handled = 0
+        while not self._stop.is_set() and (max_jobs is None or handled < max_jobs):
+            claimed = self.jobs.claim(owner)
+            if not claimed:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(claimed[0], owner)
+            handled += 1
+        return handled
+    
+    def process(self, job: Dict, owner: str) -> Optional[Dict]:
+        """Run one leased job to completion; returns the upload result or None"""
+        job_id = job["job_id"]
+        
+        # A previous worker died after init: only re-upload once TikTok says that
+        # attempt FAILED; an unknown or in-progress status is checked again later
+        if job["status"] == "initialized" and job.get("publish_id"):
+            status = self.uploader.check_upload_status(job["publish_id"])
+            state = (status or {}).get("status")
+            if state in LANDED_STATES:
+                result = self._resume(job, state)
+                self.jobs.complete(job_id, owner, result)
+                self._record(job, result)
+                return result
+            if state != "FAILED":
+                print(f"⏳ Upload job {job_id}: status of {job['publish_id']} is "
+                      f"{state or 'unknown'}, checking again later")
+                self.jobs.recheck(job_id, owner, f"publish status {state or 'unknown'}",
+                                  job["attempts"])
+                return None
+        
+        # Set by the heartbeat (or a refused mark_initialized) once another
+        # worker owns the job; the upload stops before its next chunk
+        lost = threading.Event()
+        
+        def on_init(publish_id: str):
+            if not self.jobs.mark_initialized(job_id, owner, publish_id):
+                lost.set()
+                raise RuntimeError(f"lease on upload job {job_id} was lost")
+        
+        beating = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, owner, beating, lost),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            # The upload index claim is named after the job, not the worker, so
+            # whoever holds the job's lease can take over a crashed worker's claim
+            result = self.uploader.upload_video(
+                job["video_path"], job["title"], on_init=on_init, cancel=lost,
+                claim_owner=f"upload-job:{job_id}", **job["options"])
+        except Exception as e:
+            result = None
+            error = str(e)
+        else:
+            error = "upload_video returned no result"
+        finally:
+            beating.set()
+            heartbeat.join()
+        
+        if result is None:
+            if lost.is_set():
+                print(f"⚠️  Upload job {job_id} abandoned: its lease passed to another worker")
+                return None
+            print(f"⚠️  Upload job {job_id} failed (attempt {job['attempts']}): {error}")
+            self.jobs.fail(job_id, owner, error, job["attempts"])
+            return None
+        
+        if not self.jobs.complete(job_id, owner, result):
+            print(f"⚠️  Lease on upload job {job_id} was lost before it completed")
+        self._record(job, result)
+        return result
+    
+    def _resume(self, job: Dict, state: str) -> Dict:
+        """Result for an earlier attempt whose bytes all reached TikTok"""
+        print(f"♻️  Upload job {job['job_id']} already reached TikTok "
+              f"({job['publish_id']}: {state}), not re-uploading")
+        return {
+            "publish_id": job["publish_id"],
+            "status": state,
+            "title": job["title"],
+            "resumed": True
+        }
+    
+    def _heartbeat(self, job_id: int, owner: str, done: threading.Event, lost: threading.Event):
+        """Extend the lease until done; sets lost (cancelling the upload) if it was taken"""
+        interval = self.jobs.lease_seconds / 3
+        while not done.wait(interval):
+            if not self.jobs.heartbeat(job_id, owner):
+                print(f"⚠️  Lost lease on upload job {job_id}, cancelling the upload")
+                lost.set()
+                return
+    
+    def _record(self, job: Dict, result: Dict):
+        if self.agent is not None and not result.get("duplicate"):
+            self.agent.track_event("posts")
+        if self.poller is not None and not result.get("duplicate"):
+            self.poller.track(result["publish_id"])
+        if self.store is None:
+            return
+        self.store.record_upload(result, idea_id=job.get("idea_id"), slot_id=job.get("slot_id"),
+                                 video_path=job["video_path"])
+        if job.get("slot_id") is not None:
+            self.store.update_slot_status(job["slot_id"], "posted")
+        if job.get("idea_id"):
+            self.store.update_idea_status(job["idea_id"], "posted")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Metrics and Tracing
+Latency histograms, counters and optional JSON event logs for each pipeline stage
+
+Everything is off until enable() is called; disabled calls return before
+touching a lock or the clock.
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_enabled = False
+_json_log = None
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_histograms: Dict[Tuple[str, Tuple], list] = {}  # key -> [bucket counts..., sum, count]
+
+
+def enable(json_log_path: Optional[str] = None):
+    """Start recording; with json_log_path every observation is also appended as a JSON line"""
+    global _enabled, _json_log
+    _enabled = True
+    if json_log_path:
+        with _lock:
+            if _json_log is not None:
+                _json_log.close()
+            _json_log = open(json_log_path, "a", buffering=1)
+
+
+def disable():
+    global _enabled, _json_log
+    _enabled = False
+    with _lock:
+        if _json_log is not None:
+            _json_log.close()
+            _json_log = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _key(name: str, labels: Dict) -> Tuple[str, Tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def _log(event: Dict):
+    if _json_log is None:
+        return
+    event["ts"] = time.time()
+    line = json.dumps(event) + "\n"
+    # Held so lines from worker threads never interleave and disable()
+    # cannot close the file mid-write
+    with _lock:
+        if _json_log is not None:
+            _json_log.write(line)
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add to a counter"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _log({"metric": name, "value": value, **labels})
+
+
+def observe(name: str, seconds: float, **labels):
+    """Record one latency sample"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(LATENCY_BUCKETS):
+            histogram[index] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+    _log({"metric": name, "seconds": round(seconds, 6), **labels})
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        observe("tiktok_stage_seconds", time.perf_counter() - self.started, stage=self.name)
+        if exc_type is not None:
+            inc("tiktok_stage_errors_total", stage=self.name)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing a block as one stage"""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as one stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _format_labels(labels: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(values)) for key, values in _histograms.items())
+    
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    
+    for (name, labels), values in histograms:
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values):
+            cumulative += count
+            bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        inf_labels = _format_labels(labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{inf_labels} {values[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+    
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    """Write the current metrics to a file (e.g. for node_exporter's textfile collector)"""
+    with open(path, "w") as f:
+        f.write(render_prometheus())
+
+
+def serve(port: int = 9464, host: str = "127.0.0.1"):
+    """Expose /metrics over HTTP on a background thread"""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = HTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+MP4 Pre-flight Inspector
+Reads duration, resolution and codecs from MP4 box headers so bad files are
+rejected locally before any upload round trip
+"""
+
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Boxes whose payload is just more boxes
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"mvex", b"edts"}
+
+# Sample entry types TikTok accepts for the video track
+SUPPORTED_VIDEO_CODECS = {"avc1", "avc3", "hvc1", "hev1", "vp08", "vp09"}
+
+# TikTok rejects videos under 360 px or over 4096 px on either side
+MIN_DIMENSION = 360
+MAX_DIMENSION = 4096
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v")
+
+
+def parse_video_length(spec: str) -> Tuple[float, float]:
+    """Parse a config range such as "15-60" into (min_seconds, max_seconds)"""
+    low, _, high = str(spec).partition("-")
+    low_seconds = float(low)
+    return low_seconds, float(high) if high else low_seconds
+
+
+def _iter_boxes(buf, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, box_end) for each box between start and end"""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise ValueError(f"truncated '{box_type.decode('latin-1')}' header")
+            size = struct.unpack_from(">Q", buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError(f"box '{box_type.decode('latin-1')}' at offset {offset} "
+                             f"overruns its parent")
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _read_mvhd(buf, start: int) -> Tuple[int, int]:
+    version = buf[start]
+    if version == 1:
+        return struct.unpack_from(">IQ", buf, start + 20)
+    return struct.unpack_from(">II", buf, start + 12)
+
+
+def _read_tkhd(buf, start: int) -> Tuple[float, float]:
+    # Width and height are 16.16 fixed point after the matrix
+    offset = start + (88 if buf[start] == 1 else 76)
+    width, height = struct.unpack_from(">II", buf, offset)
+    return width / 65536.0, height / 65536.0
+
+
+def _read_trak(buf, start: int, end: int) -> Dict:
+    """
+    Collect handler type, sample entry codec and display size for one track
+    
+    Only the hdlr directly inside mdia names the track type; QuickTime files
+    also carry a data-handler hdlr ('alis', 'url ') inside minf.
+    """
+    track = {"handler": None, "codec": None, "width": 0.0, "height": 0.0}
+    stack = [(start, end, b"trak")]
+    while stack:
+        box_start, box_end, parent = stack.pop()
+        for box_type, payload, child_end in _iter_boxes(buf, box_start, box_end):
+            if box_type in CONTAINER_BOXES:
+                stack.append((payload, child_end, box_type))
+            elif box_type == b"tkhd":
+                track["width"], track["height"] = _read_tkhd(buf, payload)
+            elif box_type == b"hdlr" and parent == b"mdia":
+                track["handler"] = bytes(buf[payload + 8:payload + 12]).decode("latin-1")
+            elif box_type == b"stsd" and child_end - payload >= 16:
+                track["codec"] = bytes(buf[payload + 12:payload + 16]).decode("latin-1")
+    return track
+
+
+def _read_moov(buf, start: int, end: int, info: Dict):
+    fragment_duration = 0
+    for box_type, payload, box_end in _iter_boxes(buf, start, end):
+        if box_type == b"mvhd":
+            timescale, duration = _read_mvhd(buf, payload)
+            if timescale:
+                info["duration"] = duration / timescale
+                info["timescale"] = timescale
+        elif box_type == b"trak":
+            track = _read_trak(buf, payload, box_end)
+            if track["handler"] == "vide" and info["video_codec"] is None:
+                info["video_codec"] = track["codec"]
+                info["width"] = int(track["width"])
+                info["height"] = int(track["height"])
+            elif track["handler"] == "soun" and info["audio_codec"] is None:
+                info["audio_codec"] = track["codec"]
+        elif box_type == b"mvex":
+            for child, child_payload, _ in _iter_boxes(buf, payload, box_end):
+                if child == b"mehd":
+                    fmt = ">Q" if buf[child_payload] == 1 else ">I"
+                    fragment_duration = struct.unpack_from(fmt, buf, child_payload + 4)[0]
+    
+    # Fragmented files leave mvhd at zero and carry the length in mehd
+    if not info["duration"] and fragment_duration and info.get("timescale"):
+        info["duration"] = fragment_duration / info["timescale"]
+
+
+def inspect_mp4(video_path: str) -> Dict:
+    """
+    Read container metadata from box headers without decoding any media
+    
+    Args:
+        video_path: Path to an MP4/MOV file
+    
+    Returns:
+        Dict with size, brand, duration (seconds), width, height, video_codec,
+        audio_codec, and an error message when the file could not be parsed
+    """
+    info = {
+        "path": video_path,
+        "size": 0,
+        "brand": None,
+        "duration": 0.0,
+        "width": 0,
+        "height": 0,
+        "video_codec": None,
+        "audio_codec": None,
+        "error": None
+    }
+    
+    try:
+        with open(video_path, "rb") as f:
+            info["size"] = os.fstat(f.fileno()).st_size
+            if info["size"] < 8:
+                info["error"] = "file is too small to be an MP4"
+                return info
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                seen_moov = False
+                for box_type, payload, box_end in _iter_boxes(buf, 0, len(buf)):
+                    if box_type == b"ftyp":
+                        info["brand"] = bytes(buf[payload:payload + 4]).decode("latin-1")
+                    elif box_type == b"moov":
+                        _read_moov(buf, payload, box_end, info)
+                        seen_moov = True
+                if info["brand"] is None:
+                    info["error"] = "missing 'ftyp' box, not an MP4 file"
+                elif not seen_moov:
+                    info["error"] = "missing 'moov' box"
+    except (ValueError, struct.error) as e:
+        info["error"] = str(e) if info["brand"] else "not an MP4 file"
+    except OSError as e:
+        info["error"] = str(e)
+    
+    info.pop("timescale", None)
+    return info
+
+
+def check_video(video_path: str, video_length: Optional[str] = None) -> Dict:
+    """
+    Inspect a video and validate it against TikTok and account limits
+    
+    Args:
+        video_path: Path to the video file
+        video_length: Allowed duration range in seconds, e.g. "15-60"
+    
+    Returns:
+        The inspect_mp4() dict plus "problems" (list of reasons) and "ok"
+    """
+    info = inspect_mp4(video_path)
+    problems: List[str] = []
+    
+    if info["error"]:
+        problems.append(info["error"])
+    else:
+        if info["video_codec"] is None:
+            problems.append("no video track")
+        elif info["video_codec"] not in SUPPORTED_VIDEO_CODECS:
+            problems.append(f"unsupported video codec '{info['video_codec']}'")
+        
+        if info["video_codec"] is not None:
+            short_side = min(info["width"], info["height"])
+            long_side = max(info["width"], info["height"])
+            if short_side < MIN_DIMENSION or long_side > MAX_DIMENSION:
+                problems.append(f"resolution {info['width']}x{info['height']} outside "
+                                f"{MIN_DIMENSION}-{MAX_DIMENSION} px")
+        
+        if video_length:
+            low, high = parse_video_length(video_length)
+            if not low <= info["duration"] <= high:
+                problems.append(f"duration {info['duration']:.1f}s outside {video_length}s")
+    
+    info["problems"] = problems
+    info["ok"] = not problems
+    return info
+
+
+def find_videos(directory: str) -> List[str]:
+    """Video files directly inside directory, sorted by name"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+    )
+
+
+def scan_directory(directory: str, video_length: Optional[str] = None,
+                   max_workers: int = 8) -> Iterator[Dict]:
+    """
+    Check every video in a directory in parallel
+    
+    Args:
+        directory: Folder of candidate videos
+        video_length: Allowed duration range, e.g. "15-60"
+        max_workers: Files inspected concurrently
+    
+    Yields:
+        check_video() results in file name order
+    """
+    paths = find_videos(directory)
+    if not paths:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        yield from executor.map(lambda path: check_video(path, video_length), paths)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Stage Pipeline
+Runs work items through stages connected by bounded queues, so slow stages
+hold back fast ones instead of piling results up in memory
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import tiktok_metrics as metrics
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, workers: int = 1, queue_size: Optional[int] = None):
+        """
+        One pipeline step
+        
+        Args:
+            name: Label used in progress lines and metrics
+            fn: Called with each item; its return value goes to the next
+                stage, and returning None drops the item
+            workers: Threads running fn concurrently
+            queue_size: Items allowed to wait for this stage (default 2 per worker)
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or 2 * self.workers
+        
+        self.received = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.active = 0
+        self.busy_seconds = 0.0
+        self.errors: List[Dict] = []
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], progress_interval: Optional[float] = 5.0):
+        """
+        Connect stages with bounded queues
+        
+        Args:
+            stages: Steps in order; each gets its own worker threads
+            progress_interval: Seconds between progress lines (None for quiet)
+        """
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.progress_interval = progress_interval
+        self.produced = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _feed(self, source: Iterable, target: queue.Queue, stage: Stage):
+        try:
+            for item in source:
+                if not self._put(target, item):
+                    return
+                with self._lock:
+                    self.produced += 1
+        except Exception as e:
+            print(f"❌ Pipeline source failed: {e}")
+        finally:
+            for _ in range(stage.workers):
+                self._put(target, _DONE)
+    
+    def _work(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue,
+              finished: List[int], downstream_workers: int):
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            
+            with self._lock:
+                stage.received += 1
+                stage.active += 1
+            started = time.perf_counter()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    stage.failed += 1
+                    stage.errors.append({"stage": stage.name, "item": item, "error": str(e)})
+                metrics.inc("tiktok_pipeline_items_total", stage=stage.name, result="failed")
+            else:
+                with self._lock:
+                    if result is None:
+                        stage.dropped += 1
+                    else:
+                        stage.completed += 1
+                metrics.inc("tiktok_pipeline_items_total", stage=stage.name,
+                            result="dropped" if result is None else "ok")
+            finally:
+                with self._lock:
+                    stage.active -= 1
+                    stage.busy_seconds += time.perf_counter() - started
+            
+            if result is not None and not self._put(outbox, result):
+                return
+        
+        # The last worker of a stage closes the next queue
+        with self._lock:
+            finished[0] += 1
+            last = finished[0] == stage.workers
+        if last:
+            for _ in range(downstream_workers):
+                self._put(outbox, _DONE)
+    
+    def progress_line(self) -> str:
+        with self._lock:
+            parts = [f"source {self.produced}"]
+            for stage in self.stages:
+                part = f"{stage.name} {stage.completed}/{stage.received}"
+                if stage.active:
+                    part += f" ({stage.active} active)"
+                if stage.failed:
+                    part += f" [{stage.failed} failed]"
+                parts.append(part)
+        return " | ".join(parts)
+    
+    def run(self, source: Iterable) -> Iterator:
+        """
+        Push every item from source through the stages
+        
+        The source is consumed on its own thread and only as fast as the
+        first stage accepts items, so a generator source is throttled by the
+        slowest stage downstream.
+        
+        Yields:
+            Results of the last stage as they complete
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        output: queue.Queue = queue.Queue(maxsize=self.stages[-1].queue_size)
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], self.stages[0]),
+                                    daemon=True)]
+        
+        for i, stage in enumerate(self.stages):
+            is_last = i == len(self.stages) - 1
+            outbox = output if is_last else queues[i + 1]
+            downstream = 1 if is_last else self.stages[i + 1].workers
+            finished = [0]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(stage, queues[i], outbox, finished, downstream),
+                    daemon=True))
+        
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        
+        last_report = started
+        try:
+            while True:
+                try:
+                    item = output.get(timeout=0.2)
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    break
+                if item is not None:
+                    yield item
+                now = time.perf_counter()
+                if self.progress_interval and now - last_report >= self.progress_interval:
+                    print(f"📊 {self.progress_line()}")
+                    last_report = now
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=1.0)
+        
+        elapsed = time.perf_counter() - started
+        if self.progress_interval is not None:
+            print(f"📊 {self.progress_line()}  ({elapsed:.1f}s)")
+    
+    def summary(self) -> Dict[str, Dict]:
+        """Per-stage counts and busy time, e.g. to spot the bottleneck stage"""
+        with self._lock:
+            return {
+                stage.name: {
+                    "received": stage.received,
+                    "completed": stage.completed,
+                    "dropped": stage.dropped,
+                    "failed": stage.failed,
+                    "workers": stage.workers,
+                    "busy_seconds": round(stage.busy_seconds, 3)
+                }
+                for stage in self.stages
+            }
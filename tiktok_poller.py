@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Upload Status Poller
+Tracks in-flight publish IDs and polls them with state-aware backoff
+"""
+
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# States after which TikTok will not change the post any further
+TERMINAL_STATES = {"PUBLISH_COMPLETE", "SEND_TO_USER_INBOX", "FAILED"}
+
+# (first interval, growth factor, max interval) in seconds per reported state.
+# Polls are frequent right after upload and thin out once TikTok is processing.
+BACKOFF = {
+    None: (2.0, 1.5, 15.0),
+    "PROCESSING_UPLOAD": (3.0, 1.5, 30.0),
+    "PROCESSING_DOWNLOAD": (10.0, 2.0, 120.0),
+}
+DEFAULT_BACKOFF = (10.0, 2.0, 300.0)
+
+
+class StatusPoller:
+    def __init__(self, uploader,
+                 on_terminal: Optional[Callable[[str, Dict], None]] = None,
+                 store=None,
+                 max_workers: int = 4,
+                 timeout_seconds: float = 2 * 60 * 60):
+        """
+        Initialize the poller
+        
+        Args:
+            uploader: TikTokUploader whose session and token are used for polling
+            on_terminal: Called with (publish_id, status data) once a post
+                         completes or fails; data is {"status": "TIMEOUT"}
+                         when a post never settles
+            store: ContentStore whose uploads table is kept up to date (optional)
+            max_workers: Status requests allowed in flight at the same time
+            timeout_seconds: Stop tracking a publish ID after this long
+        """
+        self.uploader = uploader
+        self.on_terminal = on_terminal
+        self.store = store
+        self.timeout_seconds = timeout_seconds
+        
+        self._tracked: Dict[str, Dict] = {}
+        self._queue = []  # heap of (next poll time, publish_id)
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._tracked)
+    
+    def track(self, publish_id: str):
+        """Start polling a publish ID returned by upload_video()"""
+        now = time.monotonic()
+        with self._condition:
+            if publish_id in self._tracked:
+                return
+            self._tracked[publish_id] = {"state": None, "interval": None,
+                                         "started": now, "polls": 0}
+            heapq.heappush(self._queue, (now + BACKOFF[None][0], publish_id))
+            self._condition.notify()
+    
+    def start(self):
+        """Run the poll loop on a background thread"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if not self._queue:
+                        self._condition.wait()
+                        continue
+                    delay = self._queue[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(timeout=delay)
+                
+                if not self._running:
+                    return
+                
+                # Everything due right now is polled in one sweep
+                due = []
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    due.append(heapq.heappop(self._queue)[1])
+            
+            for publish_id in due:
+                self._executor.submit(self._poll, publish_id)
+    
+    def _poll(self, publish_id: str):
+        data = self.uploader.check_upload_status(publish_id)
+        state = data.get("status") if data else None
+        
+        with self._condition:
+            entry = self._tracked.get(publish_id)
+            if entry is None:
+                return
+            entry["polls"] += 1
+            
+            finished = state in TERMINAL_STATES
+            timed_out = time.monotonic() - entry["started"] > self.timeout_seconds
+            if finished or timed_out:
+                del self._tracked[publish_id]
+            else:
+                delay = self._next_interval(entry, state)
+                heapq.heappush(self._queue, (time.monotonic() + delay, publish_id))
+                self._condition.notify()
+        
+        if finished:
+            self._finish(publish_id, data)
+        elif timed_out:
+            self._finish(publish_id, {"status": "TIMEOUT"})
+    
+    @staticmethod
+    def _next_interval(entry: Dict, state: Optional[str]) -> float:
+        """Grow the interval while the state holds, reset it when the state changes"""
+        first, factor, ceiling = BACKOFF.get(state, DEFAULT_BACKOFF)
+        if entry["state"] != state or entry["interval"] is None:
+            interval = first
+        else:
+            interval = min(entry["interval"] * factor, ceiling)
+        entry["state"] = state
+        entry["interval"] = interval
+        # Jitter keeps uploads that started together from polling in lockstep
+        return interval * random.uniform(0.8, 1.2)
+    
+    def _finish(self, publish_id: str, data: Dict):
+        status = data.get("status")
+        icon = "❌" if status in ("FAILED", "TIMEOUT") else "✅"
+        print(f"{icon} {publish_id}: {status}")
+        
+        if self.store is not None:
+            self.store.update_upload_status(publish_id, status)
+        if self.on_terminal is not None:
+            try:
+                self.on_terminal(publish_id, data)
+            except Exception as e:
+                print(f"❌ Status callback failed for {publish_id}: {e}")
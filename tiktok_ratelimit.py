@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting Helpers
+Keeps outbound API calls under their requests-per-minute quotas
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import tiktok_metrics as metrics
+
+# HTTP statuses worth retrying: throttling and transient server trouble
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Content Posting API quotas per user token: (requests per minute, burst)
+TIKTOK_RATE_LIMITS = {
+    "oauth_token": (60, 5),
+    "upload_init": (6, 6),
+    "status_fetch": (30, 5)
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        """
+        Thread-safe token bucket
+        
+        Args:
+            rate_per_minute: Tokens added per minute (the sustained quota)
+            capacity: Largest burst allowed (defaults to one second of quota, min 1)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.max_rate = self.rate
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested tokens are available, then take them"""
+        while True:
+            with self._lock:
+                self._refill()
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0:
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def throttle(self, pause_seconds: float = 0.0):
+        """
+        React to a 429: stop handing out tokens for pause_seconds, halve the rate
+        and drop any saved burst so every waiting thread slows down together
+        """
+        with self._lock:
+            self._refill()
+            self.paused_until = max(self.paused_until, time.monotonic() + pause_seconds)
+            self.rate = max(self.max_rate / 8, self.rate / 2)
+            self.tokens = 0.0
+    
+    def recover(self):
+        """Step the rate back toward the configured quota after a success"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Per-host breaker that fails fast after repeated transient failures
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before one trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+    
+    def allow(self) -> bool:
+        """Whether a call may go out now; half-open lets a single trial through"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status behind a requests error (error.response) or Google API error (error.code)"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    return status
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Decide whether a failed call is worth retrying
+    
+    Works for requests exceptions (HTTP status on error.response) and Google
+    API errors (HTTP status on error.code, e.g. ResourceExhausted is 429).
+    
+    Returns:
+        Seconds the server asked us to wait (0.0 when it gave no hint),
+        or None when the error is permanent
+    """
+    status = error_status(error)
+    if status is None:
+        # No HTTP status at all: connection resets, timeouts, DNS failures
+        return 0.0 if isinstance(error, (OSError, TimeoutError)) else None
+    if status not in RETRY_STATUSES:
+        return None
+    
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", None) or {}
+    header = header.get("Retry-After")
+    if header is None:
+        return 0.0
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateGovernor:
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Shared gatekeeper for every outbound call: per-endpoint token buckets,
+        Retry-After-aware jittered retries and a circuit breaker per host
+        
+        Args:
+            limits: Endpoint name -> (requests per minute, burst); others are unmetered
+            max_attempts: Tries per call, including the first
+            base_delay: Backoff seed in seconds (doubled per attempt, full jitter)
+            max_delay: Cap on any single wait
+            failure_threshold: Consecutive failures that open a host's circuit
+            reset_timeout: Seconds an open circuit waits before a trial call
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        for endpoint, (rate_per_minute, burst) in (limits or {}).items():
+            self.limit(endpoint, rate_per_minute, burst)
+    
+    def limit(self, endpoint: str, rate_per_minute: float, capacity: float = None):
+        """Set (or replace) the quota for an endpoint"""
+        with self._lock:
+            self._buckets[endpoint] = TokenBucket(rate_per_minute, capacity)
+    
+    def bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        return self._buckets.get(endpoint)
+    
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+    
+    def backoff(self, attempt: int, hint: float = 0.0) -> float:
+        """Wait before retry number attempt; honours the server's hint plus jitter"""
+        if hint:
+            return min(self.max_delay, hint) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    
+    def call(self, endpoint: str, fn: Callable, *args, host: Optional[str] = None,
+             attempts: Optional[int] = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) under the endpoint's quota, retrying transient errors
+        
+        Args:
+            endpoint: Quota and metrics name, e.g. "upload_init"
+            fn: The call to make; it must raise on failure
+            host: Circuit breaker key (defaults to the endpoint name)
+            attempts: Override max_attempts for this call
+        
+        Returns:
+            Whatever fn returns
+        
+        Raises:
+            CircuitOpenError if the host's circuit is open, otherwise the last
+            error once retries are exhausted or the error is permanent
+        """
+        bucket = self._buckets.get(endpoint)
+        breaker = self.breaker(host or endpoint)
+        attempts = attempts or self.max_attempts
+        
+        for attempt in range(1, attempts + 1):
+            if not breaker.allow():
+                metrics.inc("tiktok_circuit_rejections_total", stage=endpoint)
+                raise CircuitOpenError(f"circuit open for {host or endpoint}")
+            if bucket is not None:
+                bucket.acquire()
+            
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                hint = retry_after(e)
+                if hint is None:
+                    # Permanent errors say nothing about the host's health
+                    breaker.record_success()
+                    raise
+                if error_status(e) == 429:
+                    # The host is healthy but over quota: slow every caller down
+                    breaker.record_success()
+                    if bucket is not None:
+                        bucket.throttle(hint)
+                else:
+                    breaker.record_failure()
+                if attempt == attempts:
+                    raise
+                
+                delay = self.backoff(attempt - 1, hint)
+                metrics.inc("tiktok_retries_total", stage=endpoint)
+                print(f"⚠️  {endpoint} failed (attempt {attempt}/{attempts}): {e}. "
+                      f"Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+            
+            breaker.record_success()
+            if bucket is not None:
+                bucket.recover()
+            return result
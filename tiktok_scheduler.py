@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Posting Scheduler Daemon
+Sleeps until each scheduled slot is due and hands its video to the uploader
+"""
+
+import functools
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+
+class SchedulerDaemon:
+    def __init__(self, uploader, agent=None, store=None, poller=None, jobs=None,
+                 max_workers: int = 2,
+                 pregen_days: int = 7,
+                 pregen_interval: float = 24 * 60 * 60,
+                 grace_seconds: float = 60 * 60,
+                 reload_interval: float = 60):
+        """
+        Initialize the scheduler
+        
+        Args:
+            uploader: TikTokUploader used to publish due slots
+            agent: TikTokAIAgent for background idea/script generation (optional)
+            store: ContentStore holding slots and upload results (optional)
+            poller: StatusPoller that follows each upload to completion (optional)
+            jobs: JobQueue that due slots are handed to instead of uploading
+                  in-process; UploadWorkers anywhere then claim them (optional)
+            max_workers: Uploads allowed to run at the same time
+            pregen_days: Days of schedule the background generator keeps ahead
+                         (0 turns background generation off)
+            pregen_interval: Seconds between background generation runs
+            grace_seconds: How late a slot may still be posted before it is marked missed
+            reload_interval: Seconds between checks of the store for slots that
+                             other processes (e.g. tiktok_cli.py schedule) added
+        """
+        self.uploader = uploader
+        self.agent = agent
+        self.store = store
+        self.poller = poller
+        self.jobs = jobs
+        self.pregen_days = pregen_days
+        self.pregen_interval = pregen_interval
+        self.grace_seconds = grace_seconds
+        self.reload_interval = reload_interval
+        self._scheduled_through = None  # last day covered by background generation
+        
+        self._queue = []  # heap of (due timestamp, sequence, slot)
+        self._queued_ids = set()  # slot_ids ever queued, so store reloads skip them
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._queue)
+    
+    def add_slot(self, slot: Dict):
+        """Queue a schedule entry; safe to call while the daemon is running"""
+        due = datetime.fromisoformat(slot["scheduled_time"]).timestamp()
+        slot_id = slot.get("slot_id")
+        with self._condition:
+            if slot_id is not None:
+                if slot_id in self._queued_ids:
+                    return
+                self._queued_ids.add(slot_id)
+            heapq.heappush(self._queue, (due, next(self._sequence), slot))
+            # Only wake the loop when the new slot is the next one due
+            if self._queue[0][2] is slot:
+                self._condition.notify()
+    
+    def add_slots(self, slots: List[Dict]):
+        for slot in slots:
+            if slot.get("status", "scheduled") == "scheduled":
+                self.add_slot(slot)
+    
+    def load_from_store(self, limit: int = 100000):
+        """Queue every slot still marked scheduled in the content store and not queued yet"""
+        if self.store is not None:
+            self.add_slots(self.store.slots_by_status("scheduled", limit=limit))
+    
+    def run(self):
+        """Dispatch slots at their scheduled time until stop() is called"""
+        self._running = True
+        self._stopped.clear()
+        print(f"\n⏰ Scheduler running with {len(self)} queued posts")
+        
+        if self.agent is not None and self.pregen_days > 0:
+            threading.Thread(target=self._pregenerate_loop, daemon=True).start()
+        if self.store is not None:
+            threading.Thread(target=self._reload_loop, daemon=True).start()
+        
+        try:
+            while True:
+                with self._condition:
+                    while self._running:
+                        if not self._queue:
+                            self._condition.wait()
+                            continue
+                        delay = self._queue[0][0] - datetime.now().timestamp()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(timeout=delay)
+                    
+                    if not self._running:
+                        break
+                    _, _, slot = heapq.heappop(self._queue)
+                
+                future = self._executor.submit(self._dispatch, slot)
+                future.add_done_callback(functools.partial(self._dispatch_done, slot))
+        finally:
+            self._stopped.set()
+            self._executor.shutdown(wait=True)
+            print("🛑 Scheduler stopped")
+    
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+    
+    def _dispatch(self, slot: Dict):
+        """Upload the video assigned to a due slot"""
+        slot_id = slot.get("slot_id")
+        
+        # Videos are usually attached after the slot was queued
+        if self.store is not None and slot_id is not None:
+            slot = self.store.get_slot(slot_id) or slot
+        
+        late = datetime.now().timestamp() - datetime.fromisoformat(slot["scheduled_time"]).timestamp()
+        if late > self.grace_seconds:
+            print(f"⚠️  Slot {slot['scheduled_time']} was missed by {late / 60:.0f} min, skipping")
+            self._set_slot_status(slot, "missed")
+            return
+        video_path = slot.get("video_path")
+        
+        if not video_path:
+            print(f"⚠️  Slot {slot['scheduled_time']} has no video assigned, skipping")
+            self._set_slot_status(slot, "missing_video")
+            return
+        
+        idea = self._idea_for(slot)
+        title = self._title_for(idea)
+        
+        if self.jobs is not None:
+            # Keyed by slot, so a restarted scheduler never queues a slot twice
+            job_id = self.jobs.enqueue(video_path, title, idea_id=slot.get("idea_id"), slot_id=slot_id)
+            print(f"📥 Slot {slot['scheduled_time']} queued as upload job {job_id}")
+            self._set_slot_status(slot, "queued")
+            return
+        
+        self._set_slot_status(slot, "uploading")
+        result = self.uploader.upload_video(video_path, title)
+        
+        if result is None:
+            self._set_slot_status(slot, "failed")
+            return
+        
+        self._set_slot_status(slot, "posted")
+        if self.agent is not None:
+            self.agent.track_event("posts")
+        if self.store is not None:
+            self.store.record_upload(result, idea_id=slot.get("idea_id"),
+                                     slot_id=slot_id, video_path=video_path)
+            if slot.get("idea_id"):
+                self.store.update_idea_status(slot["idea_id"], "posted")
+        if self.poller is not None:
+            self.poller.track(result["publish_id"])
+    
+    def _dispatch_done(self, slot: Dict, future: Future):
+        """Report a dispatch that raised; its slot would otherwise stay 'uploading'"""
+        error = future.exception()
+        if error is None:
+            return
+        print(f"❌ Posting slot {slot.get('scheduled_time')} failed: {error}")
+        try:
+            self._set_slot_status(slot, "failed")
+        except Exception as e:
+            print(f"❌ Could not mark slot {slot.get('scheduled_time')} failed: {e}")
+    
+    def _set_slot_status(self, slot: Dict, status: str):
+        slot["status"] = status
+        if self.store is not None and slot.get("slot_id") is not None:
+            self.store.update_slot_status(slot["slot_id"], status)
+    
+    def _idea_for(self, slot: Dict) -> Optional[Dict]:
+        if not slot.get("idea_id") or self.store is None:
+            return None
+        return self.store.get_idea(slot["idea_id"])
+    
+    @staticmethod
+    def _title_for(idea: Optional[Dict]) -> str:
+        if not idea:
+            return ""
+        return f"{idea.get('caption', '')} {' '.join(idea.get('hashtags', []))}".strip()
+    
+    def _reload_loop(self):
+        """Pick up slots written to the store after the daemon started"""
+        while not self._stopped.wait(self.reload_interval):
+            try:
+                self.load_from_store()
+            except Exception as e:
+                print(f"❌ Reloading slots from the store failed: {e}")
+    
+    def _pregenerate_loop(self):
+        """Keep the following days' ideas, scripts and slots generated"""
+        while not self._stopped.is_set():
+            try:
+                self._pregenerate()
+            except Exception as e:
+                print(f"❌ Background generation failed: {e}")
+            if self._stopped.wait(self.pregen_interval):
+                break
+    
+    def _pregenerate(self):
+        agent = self.agent
+        posts_per_day = agent.config.get("content_strategy", {}).get("posts_per_day", 2)
+        
+        # Only generate the days not already covered by an earlier run, including
+        # runs before a restart: the store's latest slot marks existing coverage
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        store = self.store if self.store is not None else agent.store
+        if store is not None:
+            latest = store.last_slot_time()
+            if latest is not None:
+                stored_through = datetime.fromtimestamp(latest).replace(
+                    hour=0, minute=0, second=0, microsecond=0)
+                if self._scheduled_through is None or stored_through > self._scheduled_through:
+                    self._scheduled_through = stored_through
+        start = today
+        if self._scheduled_through is not None:
+            start = max(today, self._scheduled_through + timedelta(days=1))
+        days = (today + timedelta(days=self.pregen_days) - start).days
+        if days <= 0:
+            return
+        
+        agent.research_trends()
+        ideas = agent.generate_content_ideas(num_ideas=posts_per_day * days)
+        agent.create_video_scripts(ideas)
+        schedule = agent.generate_posting_schedule(days=days, posts_per_day=posts_per_day,
+                                                   start_date=start)
+        for slot, idea in zip(schedule, ideas):
+            slot["idea_id"] = idea["id"]
+        agent.save_content_calendar(snapshot=False)
+        self.add_slots(schedule)
+        self._scheduled_through = start + timedelta(days=days - 1)
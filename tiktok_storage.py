@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Content Store
+SQLite (WAL) storage for ideas, scripts, schedule slots and upload results
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ideas (
+    idea_id TEXT PRIMARY KEY,
+    hook TEXT,
+    caption TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    generated_at TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ideas_status ON ideas (status);
+CREATE INDEX IF NOT EXISTS idx_ideas_generated_at ON ideas (generated_at);
+
+CREATE TABLE IF NOT EXISTS scripts (
+    idea_id TEXT PRIMARY KEY,
+    script_text TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS schedule_slots (
+    slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scheduled_time TEXT NOT NULL,
+    scheduled_ts REAL,
+    time_label TEXT,
+    status TEXT NOT NULL DEFAULT 'scheduled',
+    idea_id TEXT,
+    video_path TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_slots_idea_id ON schedule_slots (idea_id);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    publish_id TEXT PRIMARY KEY,
+    idea_id TEXT,
+    slot_id INTEGER,
+    video_path TEXT,
+    title TEXT,
+    status TEXT NOT NULL,
+    uploaded_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_status ON uploads (status);
+CREATE INDEX IF NOT EXISTS idx_uploads_idea_id ON uploads (idea_id);
+"""
+
+# Slot times are compared as UTC epoch seconds (scheduled_ts): the ISO strings
+# carry UTC offsets, so comparing them as text is only right within one offset.
+# Created after the scheduled_ts migration so older stores can be upgraded.
+SLOT_TIME_SCHEMA = """
+DROP INDEX IF EXISTS idx_slots_scheduled_time;
+DROP INDEX IF EXISTS idx_slots_status;
+DROP INDEX IF EXISTS idx_slots_unassigned;
+CREATE INDEX IF NOT EXISTS idx_slots_ts ON schedule_slots (scheduled_ts);
+CREATE INDEX IF NOT EXISTS idx_slots_status_ts ON schedule_slots (status, scheduled_ts);
+CREATE INDEX IF NOT EXISTS idx_slots_open_ts ON schedule_slots (scheduled_ts)
+    WHERE idea_id IS NULL;
+"""
+
+
+def _epoch(value) -> float:
+    """UTC epoch seconds from a datetime or ISO string (naive values are local time)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class ContentStore:
+    def __init__(self, path: str = "content_store.db"):
+        """
+        Open (or create) the content store
+        
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate_slot_times()
+        self._conn.executescript(SLOT_TIME_SCHEMA)
+        self._conn.commit()
+    
+    def _migrate_slot_times(self):
+        """Add and backfill scheduled_ts on stores created before it existed"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(schedule_slots)")}
+        if "scheduled_ts" not in columns:
+            self._conn.execute("ALTER TABLE schedule_slots ADD COLUMN scheduled_ts REAL")
+        rows = self._conn.execute(
+            "SELECT slot_id, scheduled_time FROM schedule_slots WHERE scheduled_ts IS NULL").fetchall()
+        self._conn.executemany(
+            "UPDATE schedule_slots SET scheduled_ts = ? WHERE slot_id = ?",
+            [(_epoch(row["scheduled_time"]), row["slot_id"]) for row in rows])
+    
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+    
+    def _read(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+    
+    # Ideas and scripts
+    
+    def add_ideas(self, ideas: List[Dict]):
+        """Insert ideas, keeping any already stored under the same ID"""
+        rows = [(idea["id"], idea.get("hook"), idea.get("caption"),
+                 idea.get("status", "pending"), idea.get("generated_at"),
+                 json.dumps(idea)) for idea in ideas]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO ideas "
+                "(idea_id, hook, caption, status, generated_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+    
+    def update_idea_status(self, idea_id: str, status: str):
+        self._write("UPDATE ideas SET status = ? WHERE idea_id = ?", (status, idea_id))
+    
+    def get_idea(self, idea_id: str) -> Optional[Dict]:
+        rows = self._read("SELECT payload, status FROM ideas WHERE idea_id = ?", (idea_id,))
+        if not rows:
+            return None
+        idea = json.loads(rows[0]["payload"])
+        idea["status"] = rows[0]["status"]
+        return idea
+    
+    def ideas_since(self, since: str, limit: int = 1000) -> List[Dict]:
+        """Ideas generated at or after an ISO timestamp, oldest first"""
+        ideas = []
+        for row in self._read(
+                "SELECT payload, status FROM ideas WHERE generated_at >= ? "
+                "ORDER BY generated_at LIMIT ?", (since, limit)):
+            idea = json.loads(row["payload"])
+            idea["status"] = row["status"]
+            ideas.append(idea)
+        return ideas
+    
+    def ideas_without_scripts(self, limit: int = 100) -> List[Dict]:
+        """Pending ideas that have no script yet"""
+        rows = self._read(
+            "SELECT i.payload FROM ideas i LEFT JOIN scripts s ON s.idea_id = i.idea_id "
+            "WHERE s.idea_id IS NULL AND i.status = 'pending' ORDER BY i.generated_at LIMIT ?",
+            (limit,))
+        return [json.loads(row["payload"]) for row in rows]
+    
+    def add_script(self, script: Dict):
+        """Insert or replace the script for an idea"""
+        self._write(
+            "INSERT OR REPLACE INTO scripts (idea_id, script_text, created_at) VALUES (?, ?, ?)",
+            (script["idea_id"], script.get("script_text"), script.get("created_at")))
+    
+    def get_script(self, idea_id: str) -> Optional[Dict]:
+        rows = self._read("SELECT * FROM scripts WHERE idea_id = ?", (idea_id,))
+        return rows[0] if rows else None
+    
+    # Schedule slots
+    
+    def add_slots(self, slots: List[Dict]) -> List[int]:
+        """
+        Insert schedule entries
+        
+        Each entry gets a "slot_id" key with its row ID; entries that
+        already have one are skipped so saving twice does not duplicate them.
+        
+        Returns:
+            IDs of the newly inserted slots
+        """
+        slot_ids = []
+        now = datetime.now().isoformat()
+        with self._lock:
+            for slot in slots:
+                if slot.get("slot_id") is not None:
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT INTO schedule_slots "
+                    "(scheduled_time, scheduled_ts, time_label, status, idea_id, video_path, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (slot["scheduled_time"], _epoch(slot["scheduled_time"]), slot.get("time_label"),
+                     slot.get("status", "scheduled"), slot.get("idea_id"),
+                     slot.get("video_path"), now))
+                slot["slot_id"] = cursor.lastrowid
+                slot_ids.append(cursor.lastrowid)
+            self._conn.commit()
+        return slot_ids
+    
+    def assign_slot(self, slot_id: int, idea_id: str, video_path: Optional[str] = None):
+        """Attach an idea (and optionally its rendered video) to a slot"""
+        self._write(
+            "UPDATE schedule_slots SET idea_id = ?, video_path = COALESCE(?, video_path), "
+            "updated_at = ? WHERE slot_id = ?",
+            (idea_id, video_path, datetime.now().isoformat(), slot_id))
+    
+    def update_slot_status(self, slot_id: int, status: str):
+        self._write(
+            "UPDATE schedule_slots SET status = ?, updated_at = ? WHERE slot_id = ?",
+            (status, datetime.now().isoformat(), slot_id))
+    
+    def get_slot(self, slot_id: int) -> Optional[Dict]:
+        rows = self._read("SELECT * FROM schedule_slots WHERE slot_id = ?", (slot_id,))
+        return rows[0] if rows else None
+    
+    def next_unassigned_slots(self, limit: int = 20, after=None) -> List[Dict]:
+        """Earliest slots with no idea assigned, read in order off the partial index
+        
+        after may be a datetime or ISO string (default now).
+        """
+        after_ts = _epoch(after) if after is not None else datetime.now().timestamp()
+        return self._read(
+            "SELECT * FROM schedule_slots INDEXED BY idx_slots_open_ts "
+            "WHERE idea_id IS NULL AND scheduled_ts >= ? "
+            "ORDER BY scheduled_ts LIMIT ?", (after_ts, limit))
+    
+    def upcoming_slots(self, limit: int = 100) -> List[Dict]:
+        """Scheduled slots from today on, earliest first"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return self._read(
+            "SELECT * FROM schedule_slots WHERE status = 'scheduled' AND scheduled_ts >= ? "
+            "ORDER BY scheduled_ts LIMIT ?", (today.timestamp(), limit))
+    
+    def slots_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        return self._read(
+            "SELECT * FROM schedule_slots WHERE status = ? ORDER BY scheduled_ts LIMIT ?",
+            (status, limit))
+    
+    def last_slot_time(self) -> Optional[float]:
+        """Epoch seconds of the latest slot in the store, or None if there are none"""
+        rows = self._read("SELECT MAX(scheduled_ts) AS latest FROM schedule_slots")
+        return rows[0]["latest"] if rows else None
+    
+    def due_slots(self, now: Optional[datetime] = None, limit: int = 1000) -> List[Dict]:
+        """Scheduled slots with a video attached whose time has come"""
+        now_ts = (now or datetime.now()).timestamp()
+        return self._read(
+            "SELECT * FROM schedule_slots WHERE status = 'scheduled' AND scheduled_ts <= ? "
+            "AND video_path IS NOT NULL ORDER BY scheduled_ts LIMIT ?", (now_ts, limit))
+    
+    # Uploads
+    
+    def record_upload(self, result: Dict, idea_id: Optional[str] = None,
+                      slot_id: Optional[int] = None, video_path: Optional[str] = None):
+        """Store an upload_video() result"""
+        now = datetime.now().isoformat()
+        self._write(
+            "INSERT OR REPLACE INTO uploads "
+            "(publish_id, idea_id, slot_id, video_path, title, status, uploaded_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (result["publish_id"], idea_id, slot_id, video_path, result.get("title"),
+             result.get("status", "processing"), result.get("uploaded_at", now), now))
+    
+    def update_upload_status(self, publish_id: str, status: str):
+        self._write(
+            "UPDATE uploads SET status = ?, updated_at = ? WHERE publish_id = ?",
+            (status, datetime.now().isoformat(), publish_id))
+    
+    def uploads_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        return self._read(
+            "SELECT * FROM uploads WHERE status = ? ORDER BY uploaded_at LIMIT ?",
+            (status, limit))
+    
+    def uploads_since(self, since: str, limit: int = 1000) -> List[Dict]:
+        """Uploads made at or after an ISO timestamp, oldest first"""
+        return self._read(
+            "SELECT * FROM uploads WHERE uploaded_at >= ? ORDER BY uploaded_at LIMIT ?",
+            (since, limit))
+    
+    # Snapshots
+    
+    def export_json(self, filename: str, account: str, trending_hashtags) -> Dict:
+        """Write a content_calendar.json-style snapshot of everything stored"""
+        ideas = []
+        for row in self._read("SELECT payload, status FROM ideas ORDER BY generated_at"):
+            idea = json.loads(row["payload"])
+            idea["status"] = row["status"]
+            ideas.append(idea)
+        
+        calendar = {
+            "generated_at": datetime.now().isoformat(),
+            "account": account,
+            "trending_hashtags": trending_hashtags,
+            "content_ideas": ideas,
+            "posting_schedule": self._read("SELECT * FROM schedule_slots ORDER BY scheduled_ts"),
+            "uploads": self._read("SELECT * FROM uploads ORDER BY uploaded_at")
+        }
+        
+        with open(filename, 'w') as f:
+            json.dump(calendar, f, indent=2)
+        return calendar
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Posting Time Optimizer
+Scores every hour of the week from past engagement and picks posting slots
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pytz
+
+HOURS_PER_WEEK = 7 * 24
+
+
+def _time_label(hour: int) -> str:
+    """Human label for a posting hour, e.g. "Evening (5 PM)\""""
+    if hour < 5:
+        part = "Late Night"
+    elif hour < 11:
+        part = "Morning"
+    elif hour < 14:
+        part = "Lunch"
+    elif hour < 17:
+        part = "Afternoon"
+    elif hour < 20:
+        part = "Evening"
+    else:
+        part = "Night"
+    clock = f"{hour % 12 or 12} {'AM' if hour < 12 else 'PM'}"
+    return f"{part} ({clock})"
+
+
+class PostingTimeOptimizer:
+    def __init__(self, timezone: str = "America/New_York",
+                 prior_times: Optional[List[str]] = None,
+                 prior_weight: float = 3.0,
+                 min_spacing_hours: int = 3,
+                 path: Optional[str] = None):
+        """
+        Initialize the optimizer
+        
+        Args:
+            timezone: Account timezone; hours of the week are counted in it
+            prior_times: "HH:MM" times believed to be good before any data arrives
+            prior_weight: How many posts' worth of evidence the prior counts for
+            min_spacing_hours: Minimum gap between two posts
+            path: JSON file the bucket totals are loaded from and saved to
+        """
+        self.timezone = pytz.timezone(timezone)
+        self.prior_weight = prior_weight
+        self.min_spacing_hours = min_spacing_hours
+        self.path = path
+        
+        # Running totals per hour-of-week bucket (Monday 00:00 = bucket 0)
+        self.reach_sums = [0.0] * HOURS_PER_WEEK
+        self.post_counts = [0] * HOURS_PER_WEEK
+        self.total_reach = 0.0
+        self.total_posts = 0
+        # publish_id -> [bucket, reach counted so far], so a video's growing
+        # view count replaces its earlier reading instead of adding a post
+        self.videos: Dict[str, list] = {}
+        self.prior = self._build_prior(prior_times or ["09:00", "12:00", "17:00", "21:00"])
+        self._load()
+        self.scores = self._rescore()
+    
+    @classmethod
+    def from_config(cls, config: Dict, path: Optional[str] = None) -> "PostingTimeOptimizer":
+        strategy = config.get("content_strategy", {})
+        return cls(timezone=strategy.get("timezone", "America/New_York"),
+                   prior_times=strategy.get("optimal_times"), path=path)
+    
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            state = json.load(f)
+        if len(state.get("reach_sums", ())) != HOURS_PER_WEEK:
+            return
+        self.reach_sums = [float(v) for v in state["reach_sums"]]
+        self.post_counts = [int(v) for v in state["post_counts"]]
+        self.videos = state.get("videos", {})
+        self.total_reach = sum(self.reach_sums)
+        self.total_posts = sum(self.post_counts)
+    
+    def save(self):
+        """Write the bucket totals to path so the next run starts from them"""
+        if not self.path:
+            return
+        state = {"reach_sums": self.reach_sums, "post_counts": self.post_counts,
+                 "videos": self.videos}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+    
+    @staticmethod
+    def _build_prior(times: List[str]) -> List[float]:
+        """Relative reach prior: 1.0 at preferred hours, tapering off around them"""
+        hours = {int(t.split(":")[0]) % 24 for t in times}
+        prior = []
+        for bucket in range(HOURS_PER_WEEK):
+            hour = bucket % 24
+            distance = min(min(abs(hour - h), 24 - abs(hour - h)) for h in hours) if hours else 12
+            prior.append(max(0.1, 1.0 - 0.3 * distance))
+        return prior
+    
+    def _score(self, bucket: int, mean_reach: float) -> float:
+        """Mean reach for a bucket, shrunk towards the prior when posts are few"""
+        count = self.post_counts[bucket]
+        if not count:
+            return self.prior[bucket] * mean_reach
+        return ((self.reach_sums[bucket] + self.prior_weight * self.prior[bucket] * mean_reach)
+                / (count + self.prior_weight))
+    
+    def _mean_reach(self) -> float:
+        return self.total_reach / self.total_posts if self.total_posts else 1.0
+    
+    def _rescore(self) -> List[float]:
+        # Priors scale with the global mean, so every score is refreshed, but
+        # the mean comes from running totals: 168 steps per update
+        mean_reach = self._mean_reach()
+        return [self._score(bucket, mean_reach) for bucket in range(HOURS_PER_WEEK)]
+    
+    def _bucket(self, when: datetime) -> int:
+        if when.tzinfo is None:
+            when = self.timezone.localize(when)
+        local = when.astimezone(self.timezone)
+        return local.weekday() * 24 + local.hour
+    
+    def _fold(self, posted_at: datetime, reach: float, publish_id: Optional[str] = None):
+        video = self.videos.get(publish_id) if publish_id is not None else None
+        if video is not None:
+            bucket, delta = video[0], reach - video[1]
+            video[1] = reach
+        else:
+            bucket, delta = self._bucket(posted_at), reach
+            self.post_counts[bucket] += 1
+            self.total_posts += 1
+            if publish_id is not None:
+                self.videos[publish_id] = [bucket, reach]
+        self.reach_sums[bucket] += delta
+        self.total_reach += delta
+    
+    def add_metric(self, posted_at: datetime, reach: float, publish_id: Optional[str] = None):
+        """
+        Fold one post's reach into its bucket without rescanning history
+        
+        With a publish_id, a later reading for the same video replaces the
+        earlier one instead of counting as another post.
+        """
+        self._fold(posted_at, reach, publish_id)
+        self.scores = self._rescore()
+    
+    def ingest(self, metrics: Iterable[Dict]):
+        """
+        Bulk-load {"posted_at": datetime or ISO string, "views": n} records
+        
+        Records may carry a "publish_id"; see add_metric().
+        """
+        for record in metrics:
+            posted_at = record["posted_at"]
+            if isinstance(posted_at, str):
+                posted_at = datetime.fromisoformat(posted_at)
+            self._fold(posted_at, float(record.get("views", 0)), record.get("publish_id"))
+        self.scores = self._rescore()
+    
+    def best_slots(self, days: int, posts_per_day: int,
+                   start_date: Optional[datetime] = None) -> List[Dict]:
+        """
+        Pick the highest scoring hours for each day under the spacing rule
+        
+        Returns:
+            Schedule entries with timezone-aware ISO scheduled_time values
+        """
+        now = datetime.now(self.timezone)
+        if start_date is None:
+            start_local = now
+        elif start_date.tzinfo is None:
+            start_local = self.timezone.localize(start_date)
+        else:
+            start_local = start_date.astimezone(self.timezone)
+        
+        slots = []
+        last_posted = None
+        
+        for day in range(days):
+            date = (start_local + timedelta(days=day)).date()
+            base = date.weekday() * 24
+            ranked = sorted(range(24), key=lambda h: self.scores[base + h], reverse=True)
+            
+            picked = []
+            for hour in ranked:
+                if len(picked) == posts_per_day:
+                    break
+                slot_time = self.timezone.localize(datetime(date.year, date.month, date.day, hour))
+                if slot_time <= now:
+                    continue
+                if any(abs((slot_time - other).total_seconds()) < self.min_spacing_hours * 3600
+                       for other in picked):
+                    continue
+                if last_posted and (slot_time - last_posted).total_seconds() < self.min_spacing_hours * 3600:
+                    continue
+                picked.append(slot_time)
+            
+            picked.sort()
+            for slot_time in picked:
+                slots.append({
+                    "scheduled_time": slot_time.isoformat(),
+                    "time_label": _time_label(slot_time.hour),
+                    "expected_reach": round(self.scores[base + slot_time.hour], 2),
+                    "status": "scheduled",
+                    "idea_id": None  # To be assigned
+                })
+            if picked:
+                last_posted = picked[-1]
+        
+        return slots
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Token Budgeting
+Counts prompt and response tokens and packs work items into model calls
+that stay inside the configured input and output limits
+"""
+
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Local estimate used until (or unless) the SDK's count_tokens calibrates it
+CHARS_PER_TOKEN = 4.0
+
+# Starting response-token estimates per item; refined from real responses
+DEFAULT_ITEM_TOKENS = {"idea": 150, "script": 450}
+
+
+def estimate_tokens(text: str, chars_per_token: float = CHARS_PER_TOKEN) -> int:
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+class TokenBudget:
+    def __init__(self, prompt_budget: int = 8000, response_budget: int = 2048,
+                 max_items: int = 8, headroom: float = 1.25,
+                 item_tokens: Optional[Dict[str, int]] = None):
+        """
+        Per-call token limits and running per-item size estimates
+        
+        Args:
+            prompt_budget: Input tokens allowed per call
+            response_budget: Output tokens allowed per call (the model's output cap)
+            max_items: Items packed into one call at most, whatever the budget
+            headroom: Safety factor on per-item response estimates, so a
+                      longer-than-usual answer is not cut off
+            item_tokens: Starting response tokens per item kind ("idea", "script")
+        """
+        self.prompt_budget = prompt_budget
+        self.response_budget = response_budget
+        self.max_items = max(1, max_items)
+        self.headroom = headroom
+        self.item_tokens = dict(DEFAULT_ITEM_TOKENS, **(item_tokens or {}))
+        self.chars_per_token = CHARS_PER_TOKEN
+        self.calibrated = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> "TokenBudget":
+        """Budget from the config's "generation" block (all keys optional)"""
+        generation = config.get("generation", {})
+        return cls(prompt_budget=generation.get("prompt_token_budget", 8000),
+                   response_budget=generation.get("response_token_budget", 2048),
+                   max_items=generation.get("max_items_per_call", 8),
+                   item_tokens=generation.get("item_tokens"))
+    
+    def calibrate(self, count_tokens: Callable, sample: str):
+        """
+        Fit the local estimator to the model's tokenizer using one sample
+        
+        count_tokens is the SDK's model.count_tokens; the sample should be a
+        real prompt. Only the first call does any work, and a failed count
+        leaves the chars/4 estimate in place.
+        """
+        with self._lock:
+            if self.calibrated:
+                return
+            self.calibrated = True
+        try:
+            total = count_tokens(sample).total_tokens
+        except Exception:
+            return
+        if total and len(sample) >= 200:
+            self.chars_per_token = len(sample) / total
+    
+    def count(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+    
+    def item_cost(self, kind: str) -> int:
+        """Response tokens reserved for one item of kind"""
+        return math.ceil(self.item_tokens[kind] * self.headroom)
+    
+    def observe(self, kind: str, response_tokens: int, items: int):
+        """Fold a real response's size into the per-item estimate"""
+        if items <= 0 or response_tokens <= 0:
+            return
+        with self._lock:
+            self.item_tokens[kind] = 0.7 * self.item_tokens[kind] + 0.3 * response_tokens / items
+    
+    def items_per_call(self, kind: str) -> int:
+        return max(1, min(self.max_items, self.response_budget // self.item_cost(kind)))
+    
+    def shards(self, total: int, kind: str) -> List[int]:
+        """Split a request for total items into per-call counts of near-equal size"""
+        if total <= 0:
+            return []
+        calls = math.ceil(total / self.items_per_call(kind))
+        size, extra = divmod(total, calls)
+        return [size + (1 if i < extra else 0) for i in range(calls)]
+    
+    def pack(self, items: Sequence, kind: str, render: Callable[[object], str],
+             overhead: str = "") -> List[List]:
+        """
+        Group items, in order, into batches that fit one call each
+        
+        Args:
+            items: Work items (e.g. ideas to script)
+            kind: Item kind whose response estimate bounds the batch
+            render: Returns the prompt text an item adds
+            overhead: Prompt text sent once per call (the shared instructions)
+        
+        Returns:
+            Batches; an item too large for any batch still gets one of its own
+        """
+        per_call = self.items_per_call(kind)
+        room = self.prompt_budget - self.count(overhead)
+        batches: List[List] = []
+        batch: List = []
+        used = 0
+        for item in items:
+            cost = self.count(render(item))
+            if batch and (len(batch) >= per_call or used + cost > room):
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(item)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Streaming Trend Engine
+Sliding-window hashtag counts from local observation feeds (JSONL/CSV) in bounded memory
+"""
+
+import csv
+import glob
+import heapq
+import json
+import random
+import re
+import time
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Broad reach tags are filed under the category HashtagIndex caps at one per post
+GENERIC_TAGS = {"#fyp", "#foryou", "#foryoupage", "#viral", "#trending", "#viralvideo"}
+DEFAULT_CATEGORY = "trending"
+
+# Mersenne prime for the sketch's hash family
+_PRIME = (1 << 61) - 1
+
+Observation = Tuple[str, float, int, Optional[str]]
+
+
+def normalize_tag(tag: str) -> str:
+    tag = tag.strip().lower()
+    return tag if tag.startswith("#") else "#" + tag
+
+
+def parse_timestamp(value) -> float:
+    """Epoch seconds from a number, a numeric string or an ISO 8601 string"""
+    if value is None or value == "":
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _observations_from(record: Dict) -> Iterator[Observation]:
+    """One record may carry a single "hashtag" or a post's "hashtags" list"""
+    tags = record.get("hashtags") or record.get("hashtag") or record.get("tag")
+    if not tags:
+        return
+    if isinstance(tags, str):
+        tags = [tag for tag in re.split(r"[\s,]+", tags) if tag]
+    timestamp = parse_timestamp(record.get("timestamp") or record.get("time"))
+    count = int(record.get("count") or 1)
+    category = record.get("category") or None
+    for tag in tags:
+        yield normalize_tag(tag), timestamp, count, category
+
+
+class CountMinSketch:
+    def __init__(self, width: int = 4096, depth: int = 4, seed: int = 7):
+        """
+        Fixed-size frequency sketch; estimates never undercount
+        
+        Args:
+            width: Counters per row (error ~ total / width)
+            depth: Independent rows (failure odds ~ e^-depth)
+            seed: Seed for the row hash parameters
+        """
+        self.width = width
+        self.depth = depth
+        rng = random.Random(seed)
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(depth)]
+        self.table = array("q", bytes(8 * width * depth))
+    
+    def _cells(self, key: str) -> List[int]:
+        h = hash(key)
+        width = self.width
+        return [row * width + ((a * h + b) % _PRIME) % width
+                for row, (a, b) in enumerate(self._params)]
+    
+    def add(self, key: str, count: int = 1):
+        table = self.table
+        for cell in self._cells(key):
+            table[cell] += count
+    
+    def estimate(self, key: str) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(key))
+    
+    def clear(self):
+        self.table = array("q", bytes(8 * self.width * self.depth))
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int = 256):
+        """
+        Heavy-hitter summary keeping at most capacity candidate keys
+        
+        Counts overestimate by at most the largest evicted count, so every
+        key above total / capacity is guaranteed to be monitored.
+        """
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.floor = 0
+    
+    def add_many(self, counts: Dict[str, int]):
+        """Merge a batch of exact counts, pruning once the summary doubles"""
+        monitored = self.counts
+        floor = self.floor
+        for key, count in counts.items():
+            if key in monitored:
+                monitored[key] += count
+            else:
+                monitored[key] = floor + count
+        if len(monitored) > 2 * self.capacity:
+            self._prune()
+    
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        kept = heapq.nlargest(self.capacity + 1, self.counts.items(), key=lambda item: item[1])
+        self.floor = max(self.floor, kept.pop()[1])
+        self.counts = dict(kept)
+    
+    def keys(self) -> List[str]:
+        self._prune()
+        return list(self.counts)
+    
+    def clear(self):
+        self.counts = {}
+        self.floor = 0
+
+
+class TrendEngine:
+    def __init__(self, window_seconds: int = 3600, slices: int = 12,
+                 width: int = 4096, depth: int = 4, capacity: int = 256):
+        """
+        Sliding-window trend tracker
+        
+        The current and previous windows are each split into slices; every
+        slice owns a count-min sketch and a heavy-hitter summary, and a slice
+        is recycled once it falls out of the previous window. Memory is fixed
+        at 2 * slices * (width * depth counters + ~capacity keys).
+        
+        Args:
+            window_seconds: Length of the window trends are measured over
+            slices: Sub-windows per window (the window slides by one slice)
+            width: Count-min counters per row
+            depth: Count-min rows
+            capacity: Heavy-hitter candidates kept per slice
+        """
+        self.window_seconds = window_seconds
+        self.slices = slices
+        self.slice_seconds = window_seconds / slices
+        self.ring_size = 2 * slices
+        
+        self._sketches = [CountMinSketch(width, depth) for _ in range(self.ring_size)]
+        self._heavy = [SpaceSaving(capacity) for _ in range(self.ring_size)]
+        self._slice_ids = [None] * self.ring_size
+        self._categories: Dict[str, str] = {}
+        self._offsets: Dict[str, int] = {}
+        self._headers: Dict[str, List[str]] = {}
+        self.latest = 0.0
+        self.observations = 0
+    
+    def _slot(self, slice_id: int) -> Optional[int]:
+        """Ring slot for a slice, recycling stale slots; None if the slice is too old"""
+        newest = int(self.latest // self.slice_seconds)
+        if slice_id <= newest - self.ring_size:
+            return None
+        slot = slice_id % self.ring_size
+        if self._slice_ids[slot] != slice_id:
+            self._sketches[slot].clear()
+            self._heavy[slot].clear()
+            self._slice_ids[slot] = slice_id
+        return slot
+    
+    def add(self, tag: str, timestamp: Optional[float] = None, count: int = 1,
+            category: Optional[str] = None):
+        """Record a single observation"""
+        self.ingest([(normalize_tag(tag), parse_timestamp(timestamp), count, category)])
+    
+    def ingest(self, observations: Iterable[Observation]) -> int:
+        """
+        Record a batch of (hashtag, timestamp, count, category) observations
+        
+        Counts are aggregated per slice first, so each distinct tag touches
+        the sketch once per batch however often it repeats.
+        
+        Returns:
+            Number of observations consumed
+        """
+        per_slice: Dict[int, Counter] = defaultdict(Counter)
+        categories = self._categories
+        slice_seconds = self.slice_seconds
+        consumed = 0
+        latest = self.latest
+        
+        for tag, timestamp, count, category in observations:
+            per_slice[int(timestamp // slice_seconds)][tag] += count
+            if timestamp > latest:
+                latest = timestamp
+            if category:
+                categories[tag] = category
+            consumed += 1
+        
+        self.latest = latest
+        for slice_id in sorted(per_slice):
+            slot = self._slot(slice_id)
+            if slot is None:
+                continue
+            sketch = self._sketches[slot]
+            for tag, count in per_slice[slice_id].items():
+                sketch.add(tag, count)
+            self._heavy[slot].add_many(per_slice[slice_id])
+        
+        self.observations += consumed
+        if len(categories) > 4 * self.ring_size * self._heavy[0].capacity:
+            self._prune_categories()
+        return consumed
+    
+    def _prune_categories(self):
+        monitored = set()
+        for summary in self._heavy:
+            monitored.update(summary.counts)
+        self._categories = {tag: cat for tag, cat in self._categories.items() if tag in monitored}
+    
+    def ingest_file(self, path: str, batch_size: int = 50000) -> int:
+        """
+        Consume new complete lines of a JSONL or CSV feed
+        
+        The byte offset reached is remembered, so calling this again on a
+        growing file only reads what was appended since.
+        
+        Returns:
+            Number of observations consumed
+        """
+        is_csv = path.lower().endswith(".csv")
+        consumed = 0
+        offset = self._offsets.get(path, 0)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            batch: List[Observation] = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial line still being written
+                offset += len(line)
+                text = line.decode("utf-8", errors="replace").strip()
+                if not text:
+                    continue
+                try:
+                    if is_csv:
+                        row = next(csv.reader([text]))
+                        if path not in self._headers:
+                            self._headers[path] = [name.strip().lower() for name in row]
+                            continue
+                        record = dict(zip(self._headers[path], row))
+                    else:
+                        record = json.loads(text)
+                    batch.extend(_observations_from(record))
+                except (ValueError, TypeError, AttributeError):
+                    continue
+                if len(batch) >= batch_size:
+                    consumed += self.ingest(batch)
+                    batch = []
+            consumed += self.ingest(batch)
+        self._offsets[path] = offset
+        return consumed
+    
+    def ingest_files(self, patterns: Iterable[str]) -> int:
+        """Consume every file matching the given glob patterns"""
+        consumed = 0
+        for pattern in patterns:
+            for path in sorted(glob.glob(pattern)):
+                try:
+                    consumed += self.ingest_file(path)
+                except OSError as e:
+                    print(f"⚠️  Could not read trend feed {path}: {e}")
+        return consumed
+    
+    def _window_count(self, tag: str, newest: int, offset: int) -> int:
+        total = 0
+        for slice_id in range(newest - offset - self.slices + 1, newest - offset + 1):
+            slot = slice_id % self.ring_size
+            if self._slice_ids[slot] == slice_id:
+                total += self._sketches[slot].estimate(tag)
+        return total
+    
+    def trends(self, top_k: int = 50, now: Optional[float] = None) -> List[Dict]:
+        """
+        Rank the current window's heavy hitters
+        
+        Args:
+            top_k: Number of hashtags to return
+            now: End of the current window (defaults to the newest observation)
+        
+        Returns:
+            Dicts with hashtag, category, count, previous_count, velocity
+            (growth vs. the previous window) and score, best first
+        """
+        end = self.latest if now is None else now
+        newest = int(end // self.slice_seconds)
+        
+        candidates = set()
+        for slice_id in range(newest - self.slices + 1, newest + 1):
+            slot = slice_id % self.ring_size
+            if self._slice_ids[slot] == slice_id:
+                candidates.update(self._heavy[slot].keys())
+        
+        ranked = []
+        for tag in candidates:
+            count = self._window_count(tag, newest, 0)
+            if not count:
+                continue
+            previous = self._window_count(tag, newest, self.slices)
+            velocity = (count - previous) / max(previous, 1)
+            ranked.append({
+                "hashtag": tag,
+                "category": self._category(tag),
+                "count": count,
+                "previous_count": previous,
+                "velocity": round(velocity, 3),
+                # Volume, boosted (or damped) by acceleration, capped so a brand-new
+                # tag with a handful of posts cannot outrank established ones
+                "score": count * min(10.0, (count + 1) / (previous + 1))
+            })
+        return heapq.nlargest(top_k, ranked, key=lambda trend: trend["score"])
+    
+    def _category(self, tag: str) -> str:
+        if tag in self._categories:
+            return self._categories[tag]
+        return "general_viral" if tag in GENERIC_TAGS else DEFAULT_CATEGORY
+    
+    def trending_hashtags(self, top_k: int = 50,
+                          now: Optional[float] = None) -> Tuple[Dict[str, List[str]], Dict[str, float]]:
+        """Current trends in the agent's shape; see group_trends"""
+        return group_trends(self.trends(top_k, now))
+
+
+def group_trends(trends: List[Dict]) -> Tuple[Dict[str, List[str]], Dict[str, float]]:
+    """
+    Regroup ranked trends by category
+    
+    Returns:
+        (category -> hashtags best first, hashtag -> score) ready for HashtagIndex
+    """
+    trending: Dict[str, List[str]] = {}
+    weights: Dict[str, float] = {}
+    for trend in trends:
+        trending.setdefault(trend["category"], []).append(trend["hashtag"])
+        weights[trend["hashtag"]] = trend["score"]
+    return trending, weights
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Upload Dedup Index
+Content-addressed record of uploaded videos so identical files are not posted twice
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# Bytes hashed from each end of the file for the quick fingerprint
+SAMPLE_SIZE = 64 * 1024
+HASH_BLOCK = 4 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploaded_videos (
+    sha256 TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    publish_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    title TEXT,
+    video_path TEXT,
+    uploaded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_uploaded_fingerprint ON uploaded_videos (fingerprint);
+CREATE INDEX IF NOT EXISTS idx_uploaded_publish_id ON uploaded_videos (publish_id);
+
+CREATE TABLE IF NOT EXISTS upload_claims (
+    fingerprint TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+"""
+
+
+def fingerprint(video_path: str, size: int) -> str:
+    """Cheap content key: file size plus a hash of the first and last 64 KB"""
+    digest = hashlib.sha256(str(size).encode("ascii"))
+    with open(video_path, "rb") as f:
+        digest.update(f.read(SAMPLE_SIZE))
+        if size > SAMPLE_SIZE:
+            f.seek(max(SAMPLE_SIZE, size - SAMPLE_SIZE))
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def file_sha256(video_path: str) -> str:
+    """Full content hash, read in blocks"""
+    digest = hashlib.sha256()
+    with open(video_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadIndex:
+    def __init__(self, path: str = "upload_index.db", claim_timeout: float = 60 * 60):
+        """
+        Open (or create) the index
+        
+        Args:
+            path: SQLite database shared by every uploader process
+            claim_timeout: Seconds after which another process's claim on
+                           the same content is considered abandoned
+        """
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+    
+    @property
+    def owner(self) -> str:
+        """Claim owner: per thread, so concurrent batch uploads in one process exclude each other"""
+        return f"{os.getpid()}-{id(self)}-{threading.get_ident()}"
+    
+    def find(self, video_path: str, size: int, key: str) -> Optional[Dict]:
+        """
+        Return the earlier upload of identical content, if any
+        
+        The full file is only hashed when the fingerprint already matches a
+        past upload, so new content costs no extra read pass.
+        """
+        with self._lock:
+            known = self._conn.execute(
+                "SELECT 1 FROM uploaded_videos WHERE fingerprint = ? AND status != 'FAILED' LIMIT 1",
+                (key,)).fetchone()
+        if not known:
+            return None
+        
+        sha256 = file_sha256(video_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM uploaded_videos WHERE sha256 = ? AND status != 'FAILED'",
+                (sha256,)).fetchone()
+        return dict(row) if row else None
+    
+    def claim(self, key: str, owner: Optional[str] = None) -> bool:
+        """
+        Reserve content for upload so other processes do not post it concurrently
+        
+        Args:
+            key: Content fingerprint
+            owner: Claim owner (defaults to this thread); a caller that
+                   retries after a crash, such as a queued job, passes a
+                   stable name so it can take back its own claim
+        
+        Returns:
+            False if another live uploader holds the claim
+        """
+        owner = owner or self.owner
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, claimed_at FROM upload_claims WHERE fingerprint = ?",
+                    (key,)).fetchone()
+                if row and row["owner"] != owner and now - row["claimed_at"] < self.claim_timeout:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO upload_claims (fingerprint, owner, claimed_at) "
+                    "VALUES (?, ?, ?)", (key, owner, now))
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def release(self, key: str, owner: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM upload_claims WHERE fingerprint = ? AND owner = ?",
+                (key, owner or self.owner))
+    
+    def record(self, sha256: str, key: str, size: int, result: Dict, video_path: str):
+        """Remember a finished upload under its content hash"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploaded_videos "
+                "(sha256, fingerprint, size, publish_id, status, title, video_path, uploaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (sha256, key, size, result["publish_id"], result.get("status", "processing"),
+                 result.get("title"), video_path,
+                 result.get("uploaded_at", datetime.now().isoformat())))
+    
+    def update_status(self, publish_id: str, status: str):
+        """Track publish status; FAILED uploads no longer block re-uploading the content"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploaded_videos SET status = ? WHERE publish_id = ?",
+                (status, publish_id))
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -5,39 +5,122 @@ Handles OAuth authentication and video upload to TikTok via Content Posting API
 """
 
 import os
-import json
+import hashlib
+import inspect
 import requests
-import time
 from datetime import datetime
-from typing import Dict, Optional
-from urllib.parse import urlencode
-import webbrowser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+import secrets
+import threading
+from requests.adapters import HTTPAdapter
+import tiktok_metrics as metrics
+from tiktok_auth import OAuthCallbackServer, TokenManager
+from tiktok_mp4 import check_video
+from tiktok_ratelimit import TIKTOK_RATE_LIMITS, RateGovernor
+from tiktok_upload_index import UploadIndex, fingerprint
+
+# TikTok chunk limits for FILE_UPLOAD: every chunk but the last must be
+# 5-64 MB, the last one may grow up to 128 MB, files under 5 MB go whole.
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+
 
 class TikTokUploader:
-    def __init__(self, client_key: str, client_secret: str):
+    def __init__(self, client_key: str, client_secret: str,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_chunk_retries: int = 3,
+                 pool_size: int = 10,
+                 token_path: str = "tiktok_tokens.json",
+                 api_base: str = "https://open.tiktokapis.com",
+                 upload_index_path: Optional[str] = "upload_index.db",
+                 video_length: Optional[str] = None,
+                 preflight: bool = True,
+                 governor: Optional[RateGovernor] = None):
         """
         Initialize TikTok Uploader with API credentials
         
         Args:
             client_key: Your TikTok App Client Key
             client_secret: Your TikTok App Client Secret
+            chunk_size: Bytes sent per PUT request (clamped to 5-64 MB)
+            max_chunk_retries: Attempts per chunk before the upload fails
+            pool_size: Keep-alive connections kept per host
+            token_path: File the OAuth tokens are persisted to
+            api_base: Content Posting API host (override for local stand-ins)
+            upload_index_path: Shared index of uploaded content; None allows re-uploads
+            video_length: Allowed duration range in seconds, e.g. "15-60"
+            preflight: Inspect MP4 headers locally before spending an init call
+            governor: Shared rate limiter/retry policy (defaults to TikTok's quotas)
         """
         self.client_key = client_key
         self.client_secret = client_secret
         self.redirect_uri = "http://localhost:8000/callback"
-        self.access_token = None
-        self.open_id = None
+        self.chunk_size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+        self.max_chunk_retries = max_chunk_retries
+        self.video_length = video_length
+        self.preflight = preflight
+        
+        # One pooled session for every call so TCP+TLS handshakes are reused
+        self.pool_size = pool_size
+        self.session = self._create_session(pool_size)
+        
+        # Every call goes through one governor so all worker threads share the quotas
+        self.governor = governor or RateGovernor(TIKTOK_RATE_LIMITS)
         
         # TikTok API endpoints
         self.auth_url = "https://www.tiktok.com/v2/auth/authorize/"
-        self.token_url = "https://open.tiktokapis.com/v2/oauth/token/"
-        self.upload_init_url = "https://open.tiktokapis.com/v2/post/publish/inbox/video/init/"
-        self.upload_url = "https://open.tiktokapis.com/v2/post/publish/video/init/"
+        self.token_url = f"{api_base}/v2/oauth/token/"
+        self.upload_init_url = f"{api_base}/v2/post/publish/inbox/video/init/"
+        self.upload_url = f"{api_base}/v2/post/publish/video/init/"
+        self.status_url = f"{api_base}/v2/post/publish/status/fetch/"
+        
+        self.tokens = TokenManager(client_key, client_secret, self.token_url,
+                                   self.session, token_path=token_path,
+                                   governor=self.governor)
+        self.upload_index = UploadIndex(upload_index_path) if upload_index_path else None
+    
+    @property
+    def access_token(self) -> Optional[str]:
+        """Current access token, refreshed ahead of expiry when needed"""
+        return self.tokens.get_access_token()
+    
+    @property
+    def open_id(self) -> Optional[str]:
+        return self.tokens.open_id
+    
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """Build a requests session with a connection pool of the given size"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _request(self, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send one HTTP request through the rate governor
         
-    def get_authorization_url(self) -> str:
+        Transient failures (429, 5xx, connection errors) are retried with the
+        governor's backoff; the final error is raised like raise_for_status().
+        """
+        def send():
+            with metrics.stage(endpoint):
+                response = self.session.request(method, url, **kwargs)
+                response.raise_for_status()
+            return response
+        return self.governor.call(endpoint, send, host=urlparse(url).netloc)
+    
+    def get_authorization_url(self, state: str = "tiktok_oauth_state") -> str:
         """
         Generate OAuth authorization URL for user to grant permissions
         
+        Args:
+            state: Opaque value TikTok echoes back on the redirect
+            
         Returns:
             Authorization URL string
         """
@@ -46,7 +129,7 @@ class TikTokUploader:
             "scope": "user.info.basic,video.upload,video.publish",
             "response_type": "code",
             "redirect_uri": self.redirect_uri,
-            "state": "tiktok_oauth_state"
+            "state": state
         }
         
         auth_url = f"{self.auth_url}?{urlencode(params)}"
@@ -55,26 +138,47 @@ class TikTokUploader:
         
         return auth_url
     
-    def authorize(self) -> bool:
+    def authorize(self, timeout: float = 300) -> bool:
         """
         Start OAuth flow and get access token
         
+        The authorization code is captured by a local listener on
+        redirect_uri; pasting it by hand is only needed if the port is busy
+        or no redirect arrives within timeout seconds.
+        
         Returns:
             True if authorization successful
         """
         # Step 1: Get authorization URL
-        auth_url = self.get_authorization_url()
+        state = secrets.token_urlsafe(16)
+        auth_url = self.get_authorization_url(state)
+        
+        try:
+            callback = OAuthCallbackServer(self.redirect_uri, expected_state=state)
+            callback.start()
+        except OSError as e:
+            print(f"⚠️  Could not listen on {self.redirect_uri}: {e}")
+            callback = None
         
         # Open browser for user to authorize
         try:
+            import webbrowser
             webbrowser.open(auth_url)
         except:
             print("Could not open browser automatically. Please open the URL manually.")
         
-        # Step 2: User manually enters authorization code
-        print("\n📋 After authorizing, you'll be redirected to a URL.")
-        print("Copy the 'code' parameter from the URL and paste it here:")
-        auth_code = input("Authorization code: ").strip()
+        # Step 2: Wait for the redirect, falling back to a pasted code
+        auth_code = None
+        if callback is not None:
+            print(f"\n⏳ Waiting for authorization on {self.redirect_uri}...")
+            auth_code = callback.wait_for_code(timeout)
+            if not auth_code and callback.error:
+                print(f"❌ Authorization callback failed: {callback.error}")
+        
+        if not auth_code:
+            print("\n📋 After authorizing, you'll be redirected to a URL.")
+            print("Copy the 'code' parameter from the URL and paste it here:")
+            auth_code = input("Authorization code: ").strip()
         
         # Step 3: Exchange code for access token
         return self.get_access_token(auth_code)
@@ -103,15 +207,12 @@ class TikTokUploader:
         }
         
         try:
-            response = requests.post(self.token_url, data=data, headers=headers)
-            response.raise_for_status()
+            response = self._request("oauth_token", "POST", self.token_url,
+                                     data=data, headers=headers)
             
             token_data = response.json()
             
             if "data" in token_data:
-                self.access_token = token_data["data"]["access_token"]
-                self.open_id = token_data["data"]["open_id"]
-                
                 # Save tokens for future use
                 self._save_tokens(token_data["data"])
                 
@@ -127,38 +228,42 @@ class TikTokUploader:
             return False
     
     def _save_tokens(self, token_data: Dict):
-        """Save tokens to file for reuse"""
-        with open("tiktok_tokens.json", "w") as f:
-            json.dump(token_data, f, indent=2)
-        print("💾 Tokens saved to tiktok_tokens.json")
+        """Save tokens to file for reuse and start refreshing them ahead of expiry"""
+        self.tokens.set_tokens(token_data)
+        self.tokens.start_auto_refresh()
+        print(f"💾 Tokens saved to {self.tokens.token_path}")
     
     def load_tokens(self) -> bool:
         """
         Load saved tokens from file
         
+        Tokens are kept in memory afterwards and refreshed in the background
+        before they expire.
+        
         Returns:
             True if tokens loaded successfully
         """
-        try:
-            with open("tiktok_tokens.json", "r") as f:
-                token_data = json.load(f)
-                self.access_token = token_data.get("access_token")
-                self.open_id = token_data.get("open_id")
-                
-                if self.access_token and self.open_id:
-                    print("✅ Loaded saved tokens")
-                    return True
-                return False
-        except FileNotFoundError:
+        if not self.tokens.load():
             print("⚠️  No saved tokens found. Please authorize first.")
             return False
+        
+        if not (self.access_token and self.open_id):
+            return False
+        
+        self.tokens.start_auto_refresh()
+        print("✅ Loaded saved tokens")
+        return True
     
+    @metrics.timed("upload_video")
     def upload_video(self, video_path: str, title: str, 
                      description: str = "", 
                      privacy_level: str = "PUBLIC_TO_EVERYONE",
                      disable_duet: bool = False,
                      disable_comment: bool = False,
-                     disable_stitch: bool = False) -> Optional[Dict]:
+                     disable_stitch: bool = False,
+                     on_init: Optional[Callable[[str], None]] = None,
+                     cancel: Optional[threading.Event] = None,
+                     claim_owner: Optional[str] = None) -> Optional[Dict]:
         """
         Upload video to TikTok
         
@@ -170,14 +275,77 @@ class TikTokUploader:
             disable_duet: Disable duet feature
             disable_comment: Disable comments
             disable_stitch: Disable stitch feature
+            on_init: Called with the publish_id as soon as init succeeds,
+                     before any bytes are sent (e.g. to persist it); raising
+                     aborts the upload
+            cancel: Aborts the upload before the next chunk once set
+            claim_owner: Upload index claim owner (defaults to the calling
+                         thread); pass a stable name to take over a claim
+                         left behind by a crashed earlier attempt
             
         Returns:
             Upload response data or None if failed
         """
+        # Reject broken or out-of-range files before any network call
+        if self.preflight:
+            report = check_video(video_path, self.video_length)
+            if not report["ok"]:
+                metrics.inc("tiktok_preflight_rejections_total")
+                print(f"❌ Pre-flight check failed for {os.path.basename(video_path)}: "
+                      f"{'; '.join(report['problems'])}")
+                return None
+        
         if not self.access_token:
-            print("❌ Not authorized. Please run authorize() first.")
+            if self.tokens.refresh_error:
+                print(f"❌ Access token expired and could not be refreshed: {self.tokens.refresh_error}")
+            else:
+                print("❌ Not authorized. Please run authorize() first.")
             return None
         
+        # Get video file info
+        video_size = os.path.getsize(video_path)
+        chunk_size, total_chunk_count = self._plan_chunks(video_size)
+        
+        # Identical content that was already posted is not sent again. The
+        # index is searched only once the claim is held: a process that
+        # finished the same content just before would otherwise be missed
+        content_key = None
+        if self.upload_index is not None:
+            content_key = fingerprint(video_path, video_size)
+            if not self.upload_index.claim(content_key, claim_owner):
+                print(f"⚠️  {os.path.basename(video_path)} is being uploaded by another process")
+                return None
+        
+        try:
+            existing = None
+            if content_key is not None:
+                existing = self.upload_index.find(video_path, video_size, content_key)
+            if existing:
+                print(f"♻️  {os.path.basename(video_path)} was already uploaded "
+                      f"(Publish ID: {existing['publish_id']}), skipping")
+                return {
+                    "publish_id": existing["publish_id"],
+                    "status": existing["status"],
+                    "title": existing["title"],
+                    "uploaded_at": existing["uploaded_at"],
+                    "duplicate": True
+                }
+            return self._upload_new_video(video_path, video_size, chunk_size, total_chunk_count,
+                                          content_key, title, description, privacy_level,
+                                          disable_duet, disable_comment, disable_stitch,
+                                          on_init, cancel)
+        finally:
+            if content_key is not None:
+                self.upload_index.release(content_key, claim_owner)
+    
+    def _upload_new_video(self, video_path: str, video_size: int, chunk_size: int,
+                          total_chunk_count: int, content_key: Optional[str],
+                          title: str, description: str, privacy_level: str,
+                          disable_duet: bool, disable_comment: bool,
+                          disable_stitch: bool,
+                          on_init: Optional[Callable[[str], None]] = None,
+                          cancel: Optional[threading.Event] = None) -> Optional[Dict]:
+        """Run init and the chunked PUTs for content not uploaded before"""
         # Step 1: Initialize upload
         print(f"\n📤 Initializing upload for: {os.path.basename(video_path)}")
         
@@ -186,9 +354,6 @@ class TikTokUploader:
             "Content-Type": "application/json; charset=UTF-8"
         }
         
-        # Get video file info
-        video_size = os.path.getsize(video_path)
-        
         init_data = {
             "post_info": {
                 "title": title,
@@ -201,21 +366,20 @@ class TikTokUploader:
             "source_info": {
                 "source": "FILE_UPLOAD",
                 "video_size": video_size,
-                "chunk_size": video_size,  # Upload in one chunk
-                "total_chunk_count": 1
+                "chunk_size": chunk_size,
+                "total_chunk_count": total_chunk_count
             }
         }
         
         try:
             # Initialize upload
-            response = requests.post(self.upload_init_url, 
-                                    headers=headers, 
-                                    json=init_data)
-            response.raise_for_status()
+            response = self._request("upload_init", "POST", self.upload_init_url,
+                                     headers=headers, json=init_data)
             
             init_result = response.json()
             
-            if init_result.get("error"):
+            # TikTok always sends an error object; code "ok" means success
+            if init_result.get("error", {}).get("code", "ok") != "ok":
                 print(f"❌ Upload initialization failed: {init_result['error']}")
                 return None
             
@@ -223,38 +387,151 @@ class TikTokUploader:
             publish_id = init_result["data"]["publish_id"]
             
             print(f"✅ Upload initialized. Publish ID: {publish_id}")
+            if on_init is not None:
+                on_init(publish_id)
             
             # Step 2: Upload video file
-            print("⬆️  Uploading video file...")
-            
-            with open(video_path, "rb") as video_file:
-                video_data = video_file.read()
-                
-            upload_headers = {
-                "Content-Type": "video/mp4",
-                "Content-Length": str(video_size)
-            }
+            print(f"⬆️  Uploading video file in {total_chunk_count} chunk(s)...")
             
-            upload_response = requests.put(upload_url, 
-                                          headers=upload_headers, 
-                                          data=video_data)
-            upload_response.raise_for_status()
+            content_hash = self._upload_chunks(upload_url, video_path, video_size,
+                                               chunk_size, total_chunk_count, cancel)
             
             print("✅ Video uploaded successfully!")
             print(f"📊 Publish ID: {publish_id}")
             print(f"⏰ Video will be processed and published shortly.")
             
-            return {
+            result = {
                 "publish_id": publish_id,
                 "status": "processing",
                 "title": title,
                 "uploaded_at": datetime.now().isoformat()
             }
+            if self.upload_index is not None:
+                self.upload_index.record(content_hash, content_key, video_size,
+                                         result, video_path)
+            return result
             
         except Exception as e:
+            metrics.inc("tiktok_stage_errors_total", stage="upload_video")
             print(f"❌ Upload failed: {e}")
             return None
     
+    def upload_batch(self, jobs: Iterable[Dict], max_workers: int = 4,
+                     check_status: bool = True) -> Iterator[Dict]:
+        """
+        Upload many videos concurrently over the shared session
+        
+        Args:
+            jobs: Dicts of upload_video() keyword arguments
+                  (video_path and title are required); other keys, such as
+                  a slot_id, are not passed on but come back with the job
+            max_workers: Number of uploads running at the same time
+            check_status: Fetch the publish status right after each upload
+            
+        Yields:
+            {"job": job, "result": upload result or None, "status": status data
+            or None} as each upload finishes
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        
+        # Every worker needs its own pooled connection to each host
+        if self.pool_size < max_workers:
+            self.pool_size = max_workers
+            self.session = self._create_session(max_workers)
+            self.tokens.session = self.session
+        
+        print(f"\n📦 Uploading {len(jobs)} videos with {max_workers} workers...")
+        
+        accepted = set(inspect.signature(self.upload_video).parameters)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._run_batch_job,
+                                       {key: value for key, value in job.items() if key in accepted},
+                                       check_status): job
+                       for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result, status = future.result()
+                except Exception as e:
+                    print(f"❌ Upload failed for {job.get('video_path')}: {e}")
+                    result, status = None, None
+                yield {"job": job, "result": result, "status": status}
+    
+    def _run_batch_job(self, job: Dict, check_status: bool) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Upload one batch job and optionally fetch its status on the same worker"""
+        result = self.upload_video(**job)
+        status = None
+        if result and check_status:
+            status = self.check_upload_status(result["publish_id"])
+        return result, status
+    
+    def _plan_chunks(self, video_size: int) -> Tuple[int, int]:
+        """
+        Work out chunk size and count for a file
+        
+        Args:
+            video_size: Size of the video in bytes
+            
+        Returns:
+            (chunk_size, total_chunk_count); the remainder rides on the last chunk
+        """
+        if video_size <= self.chunk_size:
+            return video_size, 1
+        return self.chunk_size, video_size // self.chunk_size
+    
+    def _upload_chunks(self, upload_url: str, video_path: str, video_size: int,
+                       chunk_size: int, total_chunk_count: int,
+                       cancel: Optional[threading.Event] = None):
+        """
+        Stream the file to the upload URL one chunk at a time
+        
+        Only the current chunk is held in memory. A failed chunk is retried
+        on its own; chunks already accepted are never resent. Setting cancel
+        stops the upload before the next chunk.
+        
+        Returns:
+            SHA-256 of the file, computed from the chunks as they are sent
+        """
+        content_hash = hashlib.sha256()
+        with open(video_path, "rb") as video_file:
+            for index in range(total_chunk_count):
+                if cancel is not None and cancel.is_set():
+                    raise RuntimeError(f"cancelled after {index}/{total_chunk_count} chunk(s)")
+                
+                first_byte = index * chunk_size
+                if index == total_chunk_count - 1:
+                    last_byte = video_size - 1
+                else:
+                    last_byte = first_byte + chunk_size - 1
+                
+                video_file.seek(first_byte)
+                chunk = video_file.read(last_byte - first_byte + 1)
+                content_hash.update(chunk)
+                
+                upload_headers = {
+                    "Content-Type": "video/mp4",
+                    "Content-Length": str(len(chunk)),
+                    "Content-Range": f"bytes {first_byte}-{last_byte}/{video_size}"
+                }
+                
+                self.governor.call("upload_put", self._put_chunk, upload_url,
+                                   upload_headers, chunk,
+                                   host=urlparse(upload_url).netloc,
+                                   attempts=self.max_chunk_retries)
+                metrics.inc("tiktok_upload_bytes_total", len(chunk))
+                
+                print(f"   Chunk {index + 1}/{total_chunk_count} uploaded")
+        
+        return content_hash.hexdigest()
+    
+    def _put_chunk(self, upload_url: str, headers: Dict, chunk: bytes):
+        with metrics.stage("upload_put"):
+            response = self.session.put(upload_url, headers=headers, data=chunk)
+            response.raise_for_status()
+    
+    @metrics.timed("check_upload_status")
     def check_upload_status(self, publish_id: str) -> Optional[Dict]:
         """
         Check status of uploaded video
@@ -277,15 +554,13 @@ class TikTokUploader:
         params = {"publish_id": publish_id}
         
         try:
-            response = requests.post(
-                "https://open.tiktokapis.com/v2/post/publish/status/fetch/",
-                headers=headers,
-                json=params
-            )
-            response.raise_for_status()
+            response = self._request("status_fetch", "POST", self.status_url,
+                                     headers=headers, json=params)
             
-            status_data = response.json()
-            return status_data.get("data")
+            status_data = response.json().get("data")
+            if self.upload_index is not None and status_data and status_data.get("status"):
+                self.upload_index.update_status(publish_id, status_data["status"])
+            return status_data
             
         except Exception as e:
             print(f"❌ Status check failed: {e}")